@@ -0,0 +1,219 @@
+# admission.py - Controle de admissão por modelo: concorrência limitada, fila finita e deadlines
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from metrics import REGISTRY
+
+# Requisições usando o modelo ao mesmo tempo (0 = sem limite); por modelo com <NOME>_MAX_CONCURRENT
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+# Requisições esperando vaga; acima disso responde 429 na hora
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+# Espera máxima na fila sem deadline do cliente; estourou -> 503
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "10000"))
+# Deadline aplicado quando o cliente não manda o header (0 = sem deadline)
+REQUEST_DEFAULT_DEADLINE_MS = float(os.getenv("REQUEST_DEFAULT_DEADLINE_MS", "0"))
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+
+def _env_override(name: str, key: str, default):
+    value = os.getenv(f"{name.upper()}_{key}")
+    return type(default)(value) if value is not None else default
+
+
+class Overloaded(Exception):
+    """Fila cheia (429) ou espera esgotada (503); ``retry_after`` em segundos"""
+
+    def __init__(self, model: str, status_code: int, retry_after: int):
+        super().__init__(f"modelo '{model}' sobrecarregado")
+        self.model = model
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """O deadline do cliente passou (ou não dá para cumpri-lo com o modelo)"""
+
+
+class Deadline:
+    """Instante limite (relógio monotônico) a partir do orçamento em ms enviado pelo cliente"""
+
+    __slots__ = ("at", "degraded")
+
+    def __init__(self, budget_seconds: float):
+        self.at = time.monotonic() + budget_seconds
+        # True quando algum serviço trocou o modelo pelo fallback por causa do prazo
+        self.degraded = False
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> Optional["Deadline"]:
+        if value:
+            try:
+                return cls(float(value) / 1000)
+            except ValueError:
+                pass
+        return cls(REQUEST_DEFAULT_DEADLINE_MS / 1000) if REQUEST_DEFAULT_DEADLINE_MS > 0 else None
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Deadline da requisição visível para os serviços chamados dentro do bloco"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+class AdmissionController:
+    """Semáforo com fila limitada na frente de um modelo.
+
+    Além de limitar a concorrência, mantém uma média móvel do tempo de uso do
+    modelo: se o deadline restante não cobre a espera estimada mais uma execução,
+    a requisição nem entra na fila (``DeadlineExceeded``) e o chamador usa o
+    fallback programático.
+    """
+
+    def __init__(self, name: str, max_concurrent: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout_ms: Optional[float] = None):
+        self.name = name
+        self.max_concurrent = (max_concurrent if max_concurrent is not None
+                               else _env_override(name, "MAX_CONCURRENT", ADMISSION_MAX_CONCURRENT))
+        self.max_queue = max_queue if max_queue is not None else _env_override(name, "MAX_QUEUE", ADMISSION_MAX_QUEUE)
+        self.queue_timeout = (queue_timeout_ms if queue_timeout_ms is not None else ADMISSION_QUEUE_TIMEOUT_MS) / 1000
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.avg_seconds: Optional[float] = None
+        self.counters = {"admitted": 0, "rejected": 0, "timedOut": 0, "deadlineSkipped": 0}
+
+    def _count(self, event: str):
+        # Chamado com o lock tomado
+        self.counters[event] += 1
+        if event != "admitted":
+            ADMISSION_REJECTIONS.inc(model=self.name, reason=event)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def estimated_wait(self) -> float:
+        """Espera estimada até conseguir uma vaga, com a fila atual"""
+        if not self.avg_seconds or self.active < self.max_concurrent:
+            return 0.0
+        return self.avg_seconds * (self.waiting + 1) / self.max_concurrent
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait() or (self.avg_seconds or 1.0)))
+
+    def check(self):
+        """Recusa na hora (429) se a fila já está cheia; usado antes de abrir um stream"""
+        with self._cond:
+            if self.enabled and self.active >= self.max_concurrent and self.waiting >= self.max_queue:
+                self._count("rejected")
+                raise Overloaded(self.name, 429, self.retry_after())
+
+    def _can_meet(self, deadline: Optional[Deadline]) -> bool:
+        if deadline is None:
+            return True
+        return deadline.remaining() > self.estimated_wait() + (self.avg_seconds or 0.0)
+
+    @contextmanager
+    def admit(self, deadline: Optional[Deadline] = None) -> Iterator[None]:
+        if deadline is not None and not self._can_meet(deadline):
+            with self._cond:
+                self._count("deadlineSkipped")
+            raise DeadlineExceeded(f"deadline insuficiente para '{self.name}'")
+        if not self.enabled:
+            yield
+            return
+
+        with self._cond:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self._count("rejected")
+                    raise Overloaded(self.name, 429, self.retry_after())
+                self.waiting += 1
+                try:
+                    limit = self.queue_timeout
+                    if deadline is not None:
+                        limit = min(limit, max(0.0, deadline.remaining()))
+                    end = time.monotonic() + limit
+                    while self.active >= self.max_concurrent:
+                        remaining = end - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                if self.active >= self.max_concurrent:
+                    if deadline is not None and deadline.expired:
+                        self._count("deadlineSkipped")
+                        raise DeadlineExceeded(f"deadline expirou na fila de '{self.name}'")
+                    self._count("timedOut")
+                    raise Overloaded(self.name, 503, self.retry_after())
+            self.active += 1
+            self._count("admitted")
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self.active -= 1
+                self.avg_seconds = elapsed if self.avg_seconds is None else 0.8 * self.avg_seconds + 0.2 * elapsed
+                self._cond.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "maxConcurrent": self.max_concurrent,
+                "maxQueue": self.max_queue,
+                "active": self.active,
+                "waiting": self.waiting,
+                "avgMs": round(self.avg_seconds * 1000, 1) if self.avg_seconds is not None else None,
+                **self.counters,
+            }
+
+
+ADMISSION_CONTROLLERS: Dict[str, AdmissionController] = {}
+
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "ai_admission_rejections_total", "Requisições recusadas (rejected=429, timedOut=503) ou desviadas por deadline",
+    ["model", "reason"])
+
+
+def admission_controller(name: str) -> AdmissionController:
+    controller = ADMISSION_CONTROLLERS.get(name)
+    if controller is None:
+        controller = ADMISSION_CONTROLLERS[name] = AdmissionController(name)
+    return controller
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: controller.stats() for name, controller in ADMISSION_CONTROLLERS.items()}
+
+
+REGISTRY.gauge("ai_admission_active", "Requisições usando o modelo", ["model"],
+               lambda: {(name,): c.active for name, c in ADMISSION_CONTROLLERS.items()})
+REGISTRY.gauge("ai_admission_waiting", "Requisições esperando vaga no modelo", ["model"],
+               lambda: {(name,): c.waiting for name, c in ADMISSION_CONTROLLERS.items()})
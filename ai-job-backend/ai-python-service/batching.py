@@ -0,0 +1,300 @@
+# batching.py - Micro-batching dinâmico para os pipelines de modelo
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from admission import Deadline, DeadlineExceeded
+from logger import get_logger
+from metrics import stage_timer
+from tokenization import TokenizedInput, accepts_token_ids, generate_from_ids
+
+logger = get_logger("batching")
+
+# Valores padrão; podem ser sobrescritos por modelo com <NOME>_BATCH_MAX_SIZE etc.
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+# Reaproveita os input_ids calculados no truncamento em vez de o pipeline tokenizar de novo
+PRETOKENIZED_INPUTS = os.getenv("PRETOKENIZED_INPUTS", "1") == "1"
+# Prazos que aceitam saída parcial (orçamento de latência): folga para o passo de geração em andamento
+PARTIAL_RESULT_GRACE_MS = float(os.getenv("PARTIAL_RESULT_GRACE_MS", "500"))
+
+
+def _env_override(name: str, key: str, default):
+    value = os.getenv(f"{name.upper()}_{key}")
+    return type(default)(value) if value is not None else default
+
+
+def wait_result(future: Future, deadline: Optional[Deadline] = None) -> Any:
+    """Resultado do item; com deadline, desiste (``DeadlineExceeded``) quando o prazo vence"""
+    if deadline is None:
+        return future.result()
+    timeout = max(0.0, deadline.remaining())
+    if getattr(deadline, "accepts_partial", False):
+        # A geração para sozinha no prazo (max_time) e devolve o que já produziu
+        timeout += PARTIAL_RESULT_GRACE_MS / 1000
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # Ainda na fila: o worker pula o item; já rodando: o resultado é ignorado
+        future.cancel()
+        raise DeadlineExceeded("deadline expirou esperando o modelo")
+
+
+def _fail_futures(futures: Iterable[Future], error: BaseException):
+    """Falha os itens ainda sem resultado (os cancelados ou já resolvidos ficam como estão)"""
+    for future in futures:
+        if not future.done():
+            try:
+                future.set_exception(error)
+            except InvalidStateError:
+                pass
+
+
+class MicroBatcher:
+    """Fila por modelo que agrupa chamadas concorrentes em um único batch.
+
+    Cada chamador bloqueia em ``submit()`` até o seu resultado ficar pronto. Uma
+    thread dedicada junta itens por até ``max_wait_ms`` (ou ``max_batch_size``
+    itens), agrupa os que têm os mesmos parâmetros de geração e executa
+    ``runner(inputs, kwargs)``, que deve devolver um resultado por entrada.
+    """
+
+    def __init__(self, name: str, runner: Callable[[List[Any], Dict[str, Any]], List[Any]],
+                 max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self.name = name
+        self._runner = runner
+        self.max_batch_size = max_batch_size or _env_override(name, "BATCH_MAX_SIZE", BATCH_MAX_SIZE)
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else _env_override(name, "BATCH_MAX_WAIT_MS", BATCH_MAX_WAIT_MS)
+        # Batches executando ao mesmo tempo (>1 quando o runner despacha para workers)
+        self.max_in_flight = 1
+        self._slots = threading.Semaphore(1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: "queue.Queue[Tuple[Any, Tuple, Future, Optional[Deadline]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.dropped = 0
+        self.batch_size_histogram: Dict[int, int] = {}
+
+    @property
+    def runner(self) -> Callable[[List[Any], Dict[str, Any]], List[Any]]:
+        return self._runner
+
+    def set_runner(self, runner: Callable[[List[Any], Dict[str, Any]], List[Any]], max_in_flight: int = 1):
+        """Troca o runner (ex.: pool de processos) permitindo vários batches em paralelo"""
+        self._runner = runner
+        self.max_in_flight = max(1, max_in_flight)
+        self._slots = threading.Semaphore(self.max_in_flight)
+        if self.max_in_flight > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                thread_name_prefix=f"batcher-{self.name}")
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, item: Any, deadline: Optional[Deadline] = None, **kwargs) -> Any:
+        """Enfileira um item e espera o resultado (propaga a exceção do runner).
+
+        Com ``deadline``, o item é descartado se o prazo vencer na fila e a geração
+        recebe ``max_time`` para parar no meio; em ambos os casos: ``DeadlineExceeded``.
+        Prazos com ``accepts_partial`` (orçamento de latência) recebem a saída cortada.
+        """
+        if self.max_batch_size <= 1:
+            # Batching desligado: executa direto na thread do chamador
+            self._record(1)
+            return self._run_with_deadline([item], kwargs, [deadline])[0]
+
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, tuple(sorted(kwargs.items())), future, deadline))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return wait_result(future, deadline)
+
+    def submit_many(self, items: List[Any], deadline: Optional[Deadline] = None, **kwargs) -> List[Future]:
+        """Enfileira vários itens de uma vez (viram batches cheios) e devolve um Future por item"""
+        futures: List[Future] = []
+        if self.max_batch_size <= 1:
+            for item in items:
+                future: Future = Future()
+                try:
+                    self._record(1)
+                    future.set_result(self._run_with_deadline([item], kwargs, [deadline])[0])
+                except Exception as e:
+                    future.set_exception(e)
+                futures.append(future)
+            return futures
+
+        self._ensure_worker()
+        key = tuple(sorted(kwargs.items()))
+        for item in items:
+            future = Future()
+            self._queue.put((item, key, future, deadline))
+            futures.append(future)
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return futures
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name=f"batcher-{self.name}", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[Any, Tuple, Future, Optional[Deadline]]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            # Espera um slot livre antes de montar o batch: enquanto os workers estão
+            # ocupados a fila continua acumulando e o próximo batch sai mais cheio
+            self._slots.acquire()
+            slot_held = True
+            pending: Set[Future] = set()
+            try:
+                batch = self._collect()
+                pending = {future for _, _, future, _ in batch}
+                # Só itens com os mesmos parâmetros de geração podem ir no mesmo forward
+                groups: Dict[Tuple, List[Tuple[Any, Future, Optional[Deadline]]]] = {}
+                for item, key, future, deadline in batch:
+                    groups.setdefault(key, []).append((item, future, deadline))
+                for position, (key, entries) in enumerate(groups.items()):
+                    if position > 0:
+                        self._slots.acquire()
+                        slot_held = True
+                    if self._executor is not None:
+                        self._executor.submit(self._run_group_and_release, dict(key), entries)
+                    else:
+                        self._run_group_and_release(dict(key), entries)
+                    # Daqui em diante o slot e os futures são do grupo
+                    slot_held = False
+                    pending.difference_update(future for _, future, _ in entries)
+            except Exception as e:
+                # A thread segue viva: só os itens deste batch ainda não despachados falham
+                logger.exception("Erro montando batch em '%s'", self.name)
+                if slot_held:
+                    self._slots.release()
+                _fail_futures(pending, e)
+
+    def _run_group_and_release(self, kwargs: Dict[str, Any], entries: List[Tuple[Any, Future, Optional[Deadline]]]):
+        try:
+            self._run_group(kwargs, entries)
+        except Exception as e:
+            logger.exception("Erro executando batch em '%s'", self.name)
+            _fail_futures((future for _, future, _ in entries), e)
+        finally:
+            self._slots.release()
+
+    def _run_group(self, kwargs: Dict[str, Any], entries: List[Tuple[Any, Future, Optional[Deadline]]]):
+        live = []
+        for item, future, deadline in entries:
+            # Chamador desistiu (cancelou) ou prazo vencido na fila: não gasta o modelo com ele
+            if not future.set_running_or_notify_cancel():
+                self._count_dropped()
+                continue
+            if deadline is not None and deadline.expired:
+                self._count_dropped()
+                future.set_exception(DeadlineExceeded(f"deadline expirou na fila de '{self.name}'"))
+                continue
+            live.append((item, future, deadline))
+        if not live:
+            return
+
+        inputs = [item for item, _, _ in live]
+        self._record(len(inputs))
+        try:
+            results = self._run_with_deadline(inputs, kwargs, [deadline for _, _, deadline in live])
+        except Exception as e:
+            for _, future, _ in live:
+                future.set_exception(e)
+            return
+        for (_, future, deadline), result in zip(live, results):
+            if deadline is not None and deadline.expired and not getattr(deadline, "accepts_partial", False):
+                # Geração cortada pelo max_time: saída parcial não serve ao chamador
+                future.set_exception(DeadlineExceeded(f"deadline expirou durante a geração em '{self.name}'"))
+            else:
+                future.set_result(result)
+
+    def _run_with_deadline(self, inputs: List[Any], kwargs: Dict[str, Any],
+                           deadlines: List[Optional[Deadline]]) -> List[Any]:
+        remaining = [deadline.remaining() for deadline in deadlines if deadline is not None]
+        if remaining and max(remaining) <= 0:
+            raise DeadlineExceeded(f"deadline expirou antes da geração em '{self.name}'")
+        if remaining and len(remaining) == len(deadlines):
+            # O batch para quando o prazo mais longo vence (os mais curtos são descartados depois);
+            # com algum item sem prazo no batch, ninguém é cortado
+            kwargs = {**kwargs, "max_time": max(remaining)}
+        results = self._run(inputs, kwargs)
+        if len(results) != len(inputs):
+            raise RuntimeError(f"runner devolveu {len(results)} resultados para {len(inputs)} entradas")
+        return results
+
+    def _run(self, inputs: List[Any], kwargs: Dict[str, Any]) -> List[Any]:
+        with stage_timer("generate", self.name):
+            return self._runner(inputs, kwargs)
+
+    def _count_dropped(self):
+        with self._stats_lock:
+            self.dropped += 1
+
+    def _record(self, size: int):
+        with self._stats_lock:
+            self.batches += 1
+            self.items += size
+            self.batch_size_histogram[size] = self.batch_size_histogram.get(size, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "maxBatchSize": self.max_batch_size,
+                "maxWaitMs": self.max_wait_ms,
+                "maxInFlight": self.max_in_flight,
+                "queueDepth": self.queue_depth,
+                "maxQueueDepth": self.max_queue_depth,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "items": self.items,
+                "batchSizeHistogram": dict(sorted(self.batch_size_histogram.items())),
+            }
+
+
+def pipeline_runner(get_pipeline: Callable[[], Any], output_key: Optional[str] = None,
+                    generate_params: Optional[Dict[str, Any]] = None) -> Callable[[List[Any], Dict[str, Any]], List[Any]]:
+    """Runner que passa a lista inteira ao pipeline HF (padding feito pelo próprio pipeline).
+
+    Se todos os itens já vierem tokenizados (``TokenizedInput``) e o modelo aceitar,
+    os input_ids vão direto para ``generate`` sem nova tokenização.
+    """
+    def run(inputs: List[Any], kwargs: Dict[str, Any]) -> List[Any]:
+        pipe = get_pipeline()
+        if pipe is None:
+            raise RuntimeError("modelo indisponível")
+        pretokenized = all(isinstance(item, TokenizedInput) and item.input_ids for item in inputs)
+        if PRETOKENIZED_INPUTS and pretokenized and output_key and accepts_token_ids(pipe):
+            return generate_from_ids(pipe, inputs, output_key, **{**(generate_params or {}), **kwargs})
+        texts = [item.text if isinstance(item, TokenizedInput) else item for item in inputs]
+        results = pipe(texts, batch_size=len(texts), **kwargs)
+        # Algumas versões devolvem [[{...}], ...] para entradas em lista
+        return [r[0] if isinstance(r, list) else r for r in results]
+    return run
@@ -0,0 +1,75 @@
+# bench/asgi.py - Cliente ASGI mínimo: chama o app FastAPI em processo, sem servidor nem httpx
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    seconds: float
+    # Tempo até o primeiro pedaço do corpo (relevante para NDJSON/SSE)
+    first_byte_seconds: Optional[float]
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+async def request(app, method: str, path: str, payload: Any = None,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    raw_headers: List[Tuple[bytes, bytes]] = [(b"content-type", b"application/json"),
+                                              (b"content-length", str(len(body)).encode())]
+    raw_headers += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": raw_headers,
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+    finished = asyncio.Event()
+    sent_body = False
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Só desconecta depois da resposta completa (o SSE consulta is_disconnected)
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    status = 0
+    response_headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+    first_byte: Optional[float] = None
+    start = time.perf_counter()
+
+    async def send(message):
+        nonlocal status, first_byte
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update((k.decode(), v.decode()) for k, v in message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            if chunk and first_byte is None:
+                first_byte = time.perf_counter() - start
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return Response(status, response_headers, b"".join(chunks), time.perf_counter() - start, first_byte)
+
+
+async def startup(app):
+    await app.router.startup()
+
+
+async def shutdown(app):
+    await app.router.shutdown()
@@ -0,0 +1,72 @@
+# bench/compare.py - Diferença entre dois resultados do bench.run
+#
+# Uso: python -m bench.compare base.json novo.json [--threshold 10] [--fail-on-regression]
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+# Métrica -> True se maior é melhor
+METRICS = {"p50Ms": False, "p95Ms": False, "p99Ms": False, "throughputRps": True}
+
+
+def _delta(base: Optional[float], new: Optional[float]) -> Optional[float]:
+    if not base or new is None:
+        return None
+    return (new - base) / base * 100
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> List[Dict]:
+    """Uma linha por (benchmark, métrica); ``regression`` quando piora além do limite (%)"""
+    rows = []
+    base_benchmarks = base.get("benchmarks", {})
+    new_benchmarks = new.get("benchmarks", {})
+    for key in sorted(set(base_benchmarks) | set(new_benchmarks)):
+        before, after = base_benchmarks.get(key, {}), new_benchmarks.get(key, {})
+        for metric, higher_is_better in METRICS.items():
+            if metric not in before and metric not in after:
+                continue
+            delta = _delta(before.get(metric), after.get(metric))
+            worse = delta is not None and (-delta if higher_is_better else delta) > threshold
+            rows.append({"benchmark": key, "metric": metric, "base": before.get(metric),
+                         "new": after.get(metric), "deltaPct": None if delta is None else round(delta, 1),
+                         "regression": worse})
+    peak_before = base.get("memory", {}).get("end", {}).get("peakRssMb")
+    peak_after = new.get("memory", {}).get("end", {}).get("peakRssMb")
+    delta = _delta(peak_before, peak_after)
+    rows.append({"benchmark": "memory", "metric": "peakRssMb", "base": peak_before, "new": peak_after,
+                 "deltaPct": None if delta is None else round(delta, 1),
+                 "regression": delta is not None and delta > threshold})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="variação (%%) considerada regressão")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"base: {base['meta'].get('commit')} ({base['meta'].get('models')})  "
+          f"novo: {new['meta'].get('commit')} ({new['meta'].get('models')})")
+    rows = compare(base, new, args.threshold)
+    width = max(len(row["benchmark"]) for row in rows)
+    for row in rows:
+        delta = "   n/a" if row["deltaPct"] is None else f"{row['deltaPct']:+6.1f}%"
+        flag = "  <-- regressão" if row["regression"] else ""
+        print(f"{row['benchmark']:<{width}}  {row['metric']:<13} {row['base']!s:>10} -> {row['new']!s:>10}  {delta}{flag}")
+
+    regressions = sum(1 for row in rows if row["regression"])
+    print(f"{regressions} regressões acima de {args.threshold}%")
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
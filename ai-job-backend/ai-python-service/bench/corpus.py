@@ -0,0 +1,112 @@
+# bench/corpus.py - Currículos e vagas sintéticos (PT/EN) de tamanho controlado
+import random
+from typing import List
+
+# ~1 página de currículo ≈ 45 linhas
+LINES_PER_PAGE = 45
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Felipe", "Gabriela", "Henrique", "Isabela", "João"]
+LAST_NAMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Costa", "Almeida", "Ribeiro", "Carvalho", "Lima"]
+TECHS = ["Python", "JavaScript", "TypeScript", "React", "Node.js", "AWS", "Docker", "Kubernetes", "PostgreSQL",
+         "MongoDB", "Redis", "FastAPI", "Django", "PyTorch", "TensorFlow", "LangChain", "Go", "Java", "Terraform",
+         "GraphQL", "Kafka", "Spark", "Airflow", "S3", "DynamoDB", "Next.js", "Vue.js", "Hugging Face"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Wonka", "Tyrell", "Cyberdyne"]
+
+TEXT = {
+    "pt": {
+        "roles": ["Engenheiro de Machine Learning", "Desenvolvedor Backend", "Desenvolvedora Full Stack",
+                  "Analista de Dados", "Cientista de Dados", "Engenheiro DevOps"],
+        "summary": "{role} com {years} anos de experiência em {t1}, {t2} e {t3}. Foco em NLP, pipelines e APIs escaláveis.",
+        "bullet": ["Desenvolvi pipeline de dados com {t1} e {t2}, reduzindo o tempo de processamento.",
+                   "Construí APIs REST em {t1} integradas a {t2}.",
+                   "Liderei a migração para {t1} com monitoramento contínuo.",
+                   "Implementei modelos de NLP em produção usando {t1}.",
+                   "Automatizei deploys com {t1} e {t2} na AWS."],
+        "sections": ("Resumo", "Experiência Profissional", "Projetos Relevantes", "Formação", "Certificações", "Habilidades"),
+        "present": "presente",
+        "education": "Bacharel em Ciência da Computação - Universidade de São Paulo {year}",
+        "project": "- {name}: sistema de {what} com {t1} e {t2}",
+        "what": ["recomendação", "classificação de documentos", "chatbot", "detecção de fraude", "busca semântica"],
+        "cert": "- {t1} Certified {level}",
+        "job": "Vaga {seniority} {area}: buscamos profissional com experiência em {t1}, {t2} e {t3}. "
+               "Desejável conhecimento em {t4}. Atuação com APIs, pipeline de dados e cloud.",
+        "areas": ["backend", "fullstack", "frontend", "devops", "data scientist"],
+    },
+    "en": {
+        "roles": ["Machine Learning Engineer", "Backend Developer", "Full Stack Developer", "Data Analyst",
+                  "Data Scientist", "DevOps Engineer"],
+        "summary": "{role} with {years} years of experience in {t1}, {t2} and {t3}. Focused on NLP, pipelines and scalable APIs.",
+        "bullet": ["Built a data pipeline with {t1} and {t2}, cutting processing time.",
+                   "Developed REST APIs in {t1} integrated with {t2}.",
+                   "Led the migration to {t1} with continuous monitoring.",
+                   "Shipped NLP models to production using {t1}.",
+                   "Automated deployments with {t1} and {t2} on AWS."],
+        "sections": ("Summary", "Experience", "Projetos Relevantes", "Education", "Certificações", "Skills"),
+        "present": "presente",
+        "education": "Bachelor in Computer Science - Universidade Federal {year}",
+        "project": "- {name}: {what} system with {t1} and {t2}",
+        "what": ["recommendation", "document classification", "chatbot", "fraud detection", "semantic search"],
+        "cert": "- {t1} Certified {level}",
+        "job": "{seniority} {area} position: we are looking for experience with {t1}, {t2} and {t3}. "
+               "Nice to have: {t4}. Work with APIs, data pipelines and cloud.",
+        "areas": ["backend", "fullstack", "frontend", "devops", "data scientist"],
+    },
+}
+
+
+def _techs(rng: random.Random, n: int) -> List[str]:
+    return rng.sample(TECHS, n)
+
+
+def make_resume(pages: int = 1, lang: str = "pt", seed: int = 0) -> str:
+    """Currículo com cabeçalho, resumo, experiências datadas, projetos, formação e certificações"""
+    rng = random.Random(f"{seed}-{pages}-{lang}")
+    t = TEXT[lang]
+    sections = t["sections"]
+    role = rng.choice(t["roles"])
+    lines = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", role, "", sections[0]]
+    t1, t2, t3 = _techs(rng, 3)
+    lines.append(t["summary"].format(role=role, years=rng.randint(2, 15), t1=t1, t2=t2, t3=t3))
+    lines += ["", sections[1]]
+
+    target = max(1, pages) * LINES_PER_PAGE
+    # Reserva ~12 linhas para projetos, formação, certificações e habilidades
+    year = 2024
+    while len(lines) < target - 12:
+        start = year - rng.randint(1, 3)
+        end = t["present"] if year == 2024 else str(year)
+        lines.append(f"{start}–{end}: {rng.choice(t['roles'])} @ {rng.choice(COMPANIES)}")
+        for _ in range(rng.randint(3, 6)):
+            a, b = _techs(rng, 2)
+            lines.append("- " + rng.choice(t["bullet"]).format(t1=a, t2=b))
+        lines.append("")
+        year = start
+
+    lines.append(sections[2])
+    for i in range(rng.randint(2, 4)):
+        a, b = _techs(rng, 2)
+        lines.append(t["project"].format(name=f"Projeto {i + 1}", what=rng.choice(t["what"]), t1=a, t2=b))
+    lines += ["", sections[3], t["education"].format(year=rng.randint(2005, 2020)), "", sections[4]]
+    for _ in range(rng.randint(1, 3)):
+        lines.append(t["cert"].format(t1=rng.choice(["AWS", "Kubernetes", "Azure", "GCP"]),
+                                      level=rng.choice(["Developer", "Architect", "Associate"])))
+    lines += ["", sections[5], ", ".join(_techs(rng, 8))]
+    return "\n".join(lines)
+
+
+def make_job(lang: str = "pt", seed: int = 0) -> str:
+    rng = random.Random(f"job-{seed}-{lang}")
+    t = TEXT[lang]
+    t1, t2, t3, t4 = _techs(rng, 4)
+    return t["job"].format(seniority=rng.choice(["Pleno", "Sênior", "Senior", "Junior"]),
+                           area=rng.choice(t["areas"]), t1=t1, t2=t2, t3=t3, t4=t4)
+
+
+def corpus(pages: List[int], langs=("pt", "en"), per_size: int = 3):
+    """Lista de (rótulo, currículo, vaga) para cada tamanho e idioma"""
+    items = []
+    for lang in langs:
+        for size in pages:
+            for seed in range(per_size):
+                items.append((f"{lang}-{size}p", make_resume(size, lang, seed), make_job(lang, seed)))
+    return items
@@ -0,0 +1,281 @@
+# bench/run.py - Benchmark dos extratores, do gerador programático, do truncamento e dos endpoints
+#
+# Uso (na pasta ai-python-service):
+#   python -m bench.run --models tiny --out bench-base.json
+#   python -m bench.compare bench-base.json bench-novo.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# O benchmark controla o carregamento: modelos prontos antes da primeira requisição medida
+os.environ.setdefault("MODEL_LOAD_MODE", "eager")
+# Sem workers da fila de jobs: não disputam CPU com as requisições medidas
+os.environ.setdefault("JOB_WORKERS", "0")
+
+import services  # noqa: E402
+from bench import asgi  # noqa: E402
+from bench.corpus import corpus  # noqa: E402
+from bench.stub_models import MODEL_MODES, install_models  # noqa: E402
+from resume_parser import parse_resume  # noqa: E402
+
+EXTRACTORS = ["_sentences", "_extract_techs", "_extract_roles", "_extract_projects", "_extract_years_experience",
+              "_extract_experience_lines", "_extract_education", "_extract_certifications"]
+
+BATCH_JOBS = 8
+# (nome, caminho, tipo do payload)
+ENDPOINTS = [
+    ("summarize", "/summarize", "resume"),
+    ("generate_resume", "/generate/resume", "pair"),
+    ("cover", "/cover", "pair"),
+    ("simulate_interview", "/simulate/interview", "pair"),
+    ("batch_generate_resume", "/batch/generate/resume", "batch"),
+    ("batch_cover", "/batch/cover", "batch"),
+    ("batch_simulate_interview", "/batch/simulate/interview", "batch"),
+    ("cover_stream", "/cover/stream", "pair"),
+    ("generate_resume_stream", "/generate/resume/stream", "pair"),
+]
+
+# Variáveis de ambiente que mudam o desempenho e entram nos metadados do resultado
+ENV_PREFIXES = ("MODEL_", "BATCH_", "GENERATOR_", "SUMMARIZER_", "SUMMARY_", "WORKER_", "RESULT_CACHE_",
+                "INFERENCE_", "QUANTIZATION_", "PRETOKENIZED_", "TOKEN_", "RESUME_PARSE_", "STREAM_",
+                "OMP_", "MKL_")
+
+
+# -------------------------
+# Estatísticas
+# -------------------------
+def _percentile(ordered: List[float], q: float) -> float:
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    ordered = sorted(seconds)
+    ms = lambda value: round(value * 1000, 3)  # noqa: E731
+    return {
+        "n": len(ordered),
+        "meanMs": ms(sum(ordered) / len(ordered)),
+        "p50Ms": ms(_percentile(ordered, 0.50)),
+        "p95Ms": ms(_percentile(ordered, 0.95)),
+        "p99Ms": ms(_percentile(ordered, 0.99)),
+        "minMs": ms(ordered[0]),
+        "maxMs": ms(ordered[-1]),
+    }
+
+
+def memory_snapshot() -> Dict[str, float]:
+    """Pico de RSS (ru_maxrss, KB no Linux) do processo e dos workers, e o RSS atual"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    snapshot = {
+        "peakRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "childrenPeakRssMb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+    try:
+        with open("/proc/self/statm") as f:
+            snapshot["rssMb"] = round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except OSError:
+        pass
+    return snapshot
+
+
+def measure(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# -------------------------
+# Micro-benchmarks (funções do serviço, sem HTTP)
+# -------------------------
+def _cold():
+    """Descarta os caches de parsing para medir o custo real de cada chamada"""
+    parse_resume.cache_clear()
+    services._job_techs.cache_clear()
+
+
+def run_micro(items, repeat: int) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    tokenizer = services.summ_tokenizer_handle.get()
+    for label, resume, job in items:
+        groups = {
+            "parse_resume": lambda: parse_resume(resume),
+            "_generate_resume_markdown_programmatic": lambda: services._generate_resume_markdown_programmatic(resume, job),
+        }
+        for name in EXTRACTORS:
+            groups[name] = (lambda fn: lambda: fn(resume))(getattr(services, name))
+        for name, fn in groups.items():
+            key = f"micro {name} [{label}]"
+            results.setdefault(key, []).extend(measure(fn, repeat, setup=_cold))
+        results.setdefault(f"micro parse_resume:cached [{label}]", []).extend(
+            measure(lambda: parse_resume(resume), repeat))
+        for max_tokens in (400, 1000):
+            results.setdefault(f"micro truncate_text:{max_tokens} [{label}]", []).extend(
+                measure(lambda: services.truncate_text(resume, tokenizer, max_tokens=max_tokens), repeat))
+    return {key: latency_stats(samples) for key, samples in results.items()}
+
+
+# -------------------------
+# Endpoints ponta a ponta pelo app ASGI
+# -------------------------
+def _payload(kind: str, resume: str, job: str, jobs: List[str]) -> Dict[str, Any]:
+    if kind == "resume":
+        return {"resumeText": resume}
+    if kind == "batch":
+        return {"resumeText": resume, "jobDescriptions": jobs}
+    return {"resumeText": resume, "jobDescription": job}
+
+
+async def _load(app, path: str, payloads: List[Dict], concurrency: int, total: int,
+                headers: Dict[str, str]) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    first_bytes: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def one(i: int):
+        async with semaphore:
+            response = await asgi.request(app, "POST", path, payloads[i % len(payloads)], headers)
+        if response.status >= 400:
+            errors[str(response.status)] = errors.get(str(response.status), 0) + 1
+            return
+        latencies.append(response.seconds)
+        if response.first_byte_seconds is not None:
+            first_bytes.append(response.first_byte_seconds)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - start
+
+    result: Dict[str, Any] = latency_stats(latencies) if latencies else {"n": 0}
+    result["throughputRps"] = round(len(latencies) / wall, 3) if wall else None
+    result["errors"] = errors
+    if first_bytes:
+        result["firstByte"] = latency_stats(first_bytes)
+    return result
+
+
+async def run_endpoints(app, items, endpoints: List[str], levels: List[int], total: int, warmup: int,
+                        use_cache: bool, memory: Dict[str, Dict]) -> Dict[str, Dict]:
+    headers = {} if use_cache else {"Cache-Control": "no-store"}
+    results: Dict[str, Dict] = {}
+    by_label: Dict[str, List] = {}
+    for label, resume, job in items:
+        by_label.setdefault(label.split("-", 1)[1], []).append((resume, job))
+
+    jobs = list(dict.fromkeys(job for _, _, job in items))[:BATCH_JOBS]
+    for name, path, kind in ENDPOINTS:
+        if endpoints and name not in endpoints:
+            continue
+        for size, pairs in by_label.items():
+            payloads = [_payload(kind, resume, job, jobs) for resume, job in pairs]
+            for i in range(warmup):
+                await asgi.request(app, "POST", path, payloads[i % len(payloads)], headers)
+            for level in levels:
+                key = f"endpoint {name} [{size}, c={level}]"
+                results[key] = await _load(app, path, payloads, level, max(total, level), headers)
+                print(f"[INFO] {key}: p50 {results[key].get('p50Ms')} ms, "
+                      f"{results[key]['throughputRps']} req/s")
+        memory[f"after {name}"] = memory_snapshot()
+    return results
+
+
+# -------------------------
+# CLI
+# -------------------------
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do ai-python-service")
+    parser.add_argument("--models", choices=MODEL_MODES, default="tiny",
+                        help="tiny: T5 aleatório local; echo: sem torch; real: modelos configurados")
+    parser.add_argument("--echo-latency-ms", type=float, default=50.0)
+    parser.add_argument("--pages", default="1,5,20", help="tamanhos dos currículos em páginas")
+    parser.add_argument("--per-size", type=int, default=3, help="currículos por tamanho e idioma")
+    parser.add_argument("--repeat", type=int, default=5, help="repetições por micro-benchmark")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=24, help="requisições por nível de concorrência")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--endpoints", default="", help="subconjunto separado por vírgula (padrão: todos)")
+    parser.add_argument("--use-cache", action="store_true", help="não envia Cache-Control: no-store")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--out", default="bench-results.json")
+    return parser.parse_args(argv)
+
+
+async def _main(args) -> Dict[str, Any]:
+    from main import app
+
+    memory: Dict[str, Dict] = {"start": memory_snapshot()}
+    install_models(args.models, args.echo_latency_ms)
+    await asgi.startup(app)
+    memory["models loaded"] = memory_snapshot()
+
+    items = corpus(_ints(args.pages), per_size=args.per_size)
+    benchmarks: Dict[str, Dict] = {}
+    try:
+        if not args.skip_micro:
+            benchmarks.update(run_micro(items, args.repeat))
+            memory["after micro"] = memory_snapshot()
+        if not args.skip_endpoints:
+            endpoints = [name for name in args.endpoints.split(",") if name]
+            benchmarks.update(await run_endpoints(app, items, endpoints, _ints(args.concurrency), args.requests,
+                                                  args.warmup, args.use_cache, memory))
+    finally:
+        await asgi.shutdown(app)
+    memory["end"] = memory_snapshot()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "models": args.models,
+            "modelNames": {handle.name: handle.model_name for handle in services.MODEL_HANDLES},
+            "args": vars(args),
+            "env": {k: v for k, v in sorted(os.environ.items()) if k.startswith(ENV_PREFIXES)},
+        },
+        "benchmarks": benchmarks,
+        "memory": memory,
+        "batching": services.batching_stats(),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(_main(args))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    print(f"[INFO] Resultado salvo em {args.out} (pico de RSS {report['memory']['end']['peakRssMb']} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# bench/stub_models.py - Troca os modelos do serviço por versões locais (sem download)
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import services
+from bench.corpus import corpus
+
+MODEL_MODES = ("tiny", "echo", "real")
+
+TINY_VOCAB_SIZE = 2000
+TINY_MODEL_NAME = "bench/tiny-t5-random"
+
+
+# -------------------------
+# tiny: T5 minúsculo com pesos aleatórios e tokenizer BPE treinado no corpus sintético
+# -------------------------
+def _tiny_tokenizer():
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=TINY_VOCAB_SIZE, special_tokens=["<pad>", "</s>", "<unk>"],
+                                  initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    texts = [text for _, resume, job in corpus([1, 5], per_size=2) for text in (resume, job)]
+    tokenizer.train_from_iterator(texts, trainer=trainer)
+    eos_id = tokenizer.token_to_id("</s>")
+    tokenizer.post_processor = processors.TemplateProcessing(single="$A </s>", special_tokens=[("</s>", eos_id)])
+
+    fast = PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token="<pad>", eos_token="</s>",
+                                   unk_token="<unk>", model_max_length=1024)
+    fast.name_or_path = TINY_MODEL_NAME
+    return fast
+
+
+def install_tiny_models(seed: int = 0):
+    """Mesmo caminho de código do serviço (pipeline HF + generate), com um modelo de ~1 MB"""
+    import torch
+    from transformers import T5Config, T5ForConditionalGeneration, pipeline
+
+    torch.manual_seed(seed)
+    tokenizer = _tiny_tokenizer()
+    config = T5Config(vocab_size=len(tokenizer), d_model=64, d_kv=16, d_ff=128, num_layers=2,
+                      num_decoder_layers=2, num_heads=4, pad_token_id=tokenizer.pad_token_id,
+                      eos_token_id=tokenizer.eos_token_id, decoder_start_token_id=tokenizer.pad_token_id)
+    config._name_or_path = TINY_MODEL_NAME
+    model = T5ForConditionalGeneration(config).eval()
+
+    summarizer = pipeline("summarization", model=model, tokenizer=tokenizer, device=-1)
+    generator = pipeline("text2text-generation", model=model, tokenizer=tokenizer, device=-1)
+    _replace(summarizer, generator, tokenizer)
+
+
+# -------------------------
+# echo: sem torch; devolve parte da entrada após uma latência fixa por item
+# -------------------------
+class EchoTokenizer:
+    """Tokenizer por espaços (sem offsets, como um tokenizer "lento")"""
+    name_or_path = "bench/echo"
+    is_fast = False
+    model_max_length = 1024
+
+    def num_special_tokens_to_add(self, pair: bool = False) -> int:
+        return 1
+
+    def encode(self, text: str, add_special_tokens: bool = True, truncation: bool = False,
+               max_length: int = None, **kwargs) -> List[int]:
+        ids = [hash(word) % 30000 for word in text.split()]
+        if add_special_tokens:
+            ids.append(1)
+        return ids[:max_length] if truncation and max_length else ids
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = True, **kwargs) -> str:
+        return " ".join(f"t{i}" for i in ids if not (skip_special_tokens and i == 1))
+
+    def __call__(self, text: str, **kwargs) -> Dict[str, Any]:
+        return {"input_ids": self.encode(text, **kwargs)}
+
+
+class EchoPipeline:
+    # Sem tokenizer próprio: o batcher usa sempre o caminho por texto
+    tokenizer = None
+
+    def __init__(self, output_key: str, latency_ms: float, words: int = 60):
+        self.output_key = output_key
+        self.latency_ms = latency_ms
+        self.words = words
+        self.model = SimpleNamespace(name_or_path="bench/echo", config=SimpleNamespace(prefix=None))
+
+    def __call__(self, inputs, **kwargs):
+        items = [inputs] if isinstance(inputs, str) else list(inputs)
+        time.sleep(self.latency_ms * len(items) / 1000)
+        return [{self.output_key: " ".join(str(item).split()[:self.words])} for item in items]
+
+
+def install_echo_models(latency_ms: float = 50.0):
+    _replace(EchoPipeline("summary_text", latency_ms), EchoPipeline("generated_text", latency_ms), EchoTokenizer())
+
+
+# -------------------------
+# Instalação nos handles do serviço
+# -------------------------
+def _replace(summarizer, generator, tokenizer):
+    services.summarizer_handle.replace(lambda: summarizer)
+    services.generator_handle.replace(lambda: generator)
+    services.summ_tokenizer_handle.replace(lambda: tokenizer)
+    services.generation_tokenizer_handle.replace(lambda: tokenizer)
+
+
+def install_models(mode: str, echo_latency_ms: float = 50.0):
+    """tiny/echo trocam os loaders; real mantém os modelos configurados (baixa do Hub)"""
+    if mode == "tiny":
+        install_tiny_models()
+    elif mode == "echo":
+        install_echo_models(echo_latency_ms)
+    elif mode != "real":
+        raise ValueError(f"modo de modelo desconhecido: {mode}")
@@ -0,0 +1,207 @@
+# bulk.py - Processamento offline de candidaturas em JSONL, com checkpoint para retomar
+#
+# Uso (na pasta ai-python-service):
+#   python bulk.py candidaturas.jsonl --out resultados.jsonl --kinds resume,cover --processes 4
+#
+# Entrada: uma linha JSON por candidatura com resumeText, jobDescription e, opcional, id.
+# Saída: uma linha por candidatura, na ordem da entrada, com um bloco por tipo pedido
+# ({"result", "model", "error"}). O checkpoint (<out>.checkpoint) guarda até onde a
+# entrada foi lida e o tamanho da saída já confirmado; rodar de novo o mesmo comando
+# continua dali, descartando o pedaço escrito depois do último checkpoint (linhas
+# acrescentadas à entrada depois de uma execução completa também são processadas).
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from logger import get_logger, set_level
+
+# Modelos prontos antes do primeiro bloco (sem fallback programático por carregamento em andamento)
+os.environ.setdefault("MODEL_LOAD_MODE", "eager")
+# O CLI não drena a fila de jobs da API
+os.environ.setdefault("JOB_WORKERS", "0")
+
+logger = get_logger("bulk")
+
+# Candidaturas lidas por vez: limita a memória e define a granularidade do checkpoint
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "64"))
+BULK_KINDS = ("resume", "cover", "interview")
+
+# (número da linha na entrada, a partir de 1; registro ou None; erro de leitura)
+InputRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+# -------------------------
+# Checkpoint
+# -------------------------
+def _checkpoint_path(out_path: str) -> str:
+    return out_path + ".checkpoint"
+
+
+def load_checkpoint(out_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_checkpoint_path(out_path), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(out_path: str, checkpoint: Dict[str, Any]):
+    """Grava de forma atômica: um kill no meio deixa o checkpoint anterior intacto"""
+    path = _checkpoint_path(out_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# -------------------------
+# Leitura em blocos
+# -------------------------
+def _parse_line(raw: bytes) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    try:
+        record = json.loads(raw)
+    except ValueError as e:
+        return None, f"JSON inválido: {e}"
+    if not isinstance(record, dict) or not isinstance(record.get("resumeText"), str) or not record["resumeText"].strip():
+        return None, "registro sem resumeText"
+    return record, None
+
+
+def read_chunks(f, line: int, chunk_size: int) -> Iterator[Tuple[List[InputRecord], int, int]]:
+    """Blocos de até ``chunk_size`` registros com (registros, linhas lidas, offset em bytes após o bloco)"""
+    chunk: List[InputRecord] = []
+    while True:
+        raw = f.readline()
+        if not raw:
+            break
+        line += 1
+        if raw.strip():
+            chunk.append((line, *_parse_line(raw)))
+        if len(chunk) >= chunk_size:
+            yield chunk, line, f.tell()
+            chunk = []
+    if chunk:
+        yield chunk, line, f.tell()
+
+
+# -------------------------
+# Processamento
+# -------------------------
+def _batch_functions(model: Optional[str]) -> Dict[str, Callable[[List[Tuple[str, str]]], Iterator]]:
+    # Importado só aqui: WORKER_PROCESSES vem da linha de comando e precisa estar no ambiente antes
+    from services import generate_cover_letters_batch, generate_optimized_resumes_batch, simulate_interviews_batch
+
+    return {
+        "resume": lambda pairs: generate_optimized_resumes_batch(pairs, model),
+        # Todos os prompts do bloco vão juntos para a fila do gerador (batches cheios nos workers)
+        "cover": lambda pairs: generate_cover_letters_batch(pairs, model=model),
+        "interview": simulate_interviews_batch,
+    }
+
+
+def process_chunk(chunk: List[InputRecord], kinds: List[str], functions: Dict[str, Callable]) -> List[Dict[str, Any]]:
+    """Linhas de saída do bloco, na ordem da entrada"""
+    outputs = []
+    valid = []
+    for line, record, error in chunk:
+        output: Dict[str, Any] = {"line": line}
+        if record is not None and "id" in record:
+            output["id"] = record["id"]
+        if error:
+            output["error"] = error
+        else:
+            valid.append(output)
+        outputs.append(output)
+    pairs = [(record["resumeText"], record.get("jobDescription") or "") for _, record, error in chunk if not error]
+    for kind in kinds:
+        if kind != "resume":
+            # Carta e entrevista precisam da vaga
+            for output, (_, job) in zip(valid, pairs):
+                if not job.strip():
+                    output[kind] = {"result": None, "model": None, "error": "jobDescription ausente"}
+        indexes = [i for i, (_, job) in enumerate(pairs) if kind == "resume" or job.strip()]
+        if not indexes:
+            continue
+        for index, result, error, model in functions[kind]([pairs[i] for i in indexes]):
+            valid[indexes[index]][kind] = {"result": result, "model": model, "error": error}
+    return outputs
+
+
+def run(input_path: str, out_path: str, kinds: List[str], chunk_size: int = BULK_CHUNK_SIZE,
+        model: Optional[str] = None, restart: bool = False) -> Dict[str, Any]:
+    """Processa ``input_path`` inteiro (ou o que falta, pelo checkpoint) e devolve os contadores finais"""
+    from services import start_model_loading, worker_pool
+
+    checkpoint = None if restart else load_checkpoint(out_path)
+    if checkpoint is not None and (checkpoint["input"] != os.path.abspath(input_path) or checkpoint["kinds"] != kinds):
+        raise SystemExit(f"checkpoint de {_checkpoint_path(out_path)} é de outra execução "
+                         f"({checkpoint['input']}, {','.join(checkpoint['kinds'])}); use --restart")
+    if checkpoint is None:
+        checkpoint = {"input": os.path.abspath(input_path), "kinds": kinds, "offset": 0, "line": 0,
+                      "outputBytes": 0, "records": 0, "errors": 0}
+
+    start_model_loading()
+    functions = _batch_functions(model)
+    started = time.perf_counter()
+    processed = 0
+    try:
+        with open(input_path, "rb") as f_in, open(out_path, "ab") as f_out:
+            # Descarta o que foi escrito depois do último checkpoint (bloco interrompido)
+            f_out.truncate(checkpoint["outputBytes"])
+            f_out.seek(checkpoint["outputBytes"])
+            f_in.seek(checkpoint["offset"])
+            for chunk, next_line, offset in read_chunks(f_in, checkpoint["line"], chunk_size):
+                outputs = process_chunk(chunk, kinds, functions)
+                for output in outputs:
+                    f_out.write(json.dumps(output, ensure_ascii=False).encode("utf-8") + b"\n")
+                f_out.flush()
+                os.fsync(f_out.fileno())
+                errors = sum(1 for output in outputs if "error" in output or
+                             any(output.get(kind, {}).get("error") for kind in kinds))
+                processed += len(outputs)
+                checkpoint.update(offset=offset, line=next_line, outputBytes=f_out.tell(),
+                                  records=checkpoint["records"] + len(outputs), errors=checkpoint["errors"] + errors)
+                save_checkpoint(out_path, checkpoint)
+                logger.info("%d registros (%d com erro), %.1f/s", checkpoint["records"], checkpoint["errors"],
+                            processed / (time.perf_counter() - started))
+    finally:
+        if worker_pool.started:
+            worker_pool.stop()
+    return checkpoint
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Currículos otimizados, cartas e entrevistas em lote a partir de JSONL")
+    parser.add_argument("input", help="JSONL com resumeText, jobDescription e id opcional por linha")
+    parser.add_argument("--out", required=True, help="JSONL de saída (o checkpoint fica em <out>.checkpoint)")
+    parser.add_argument("--kinds", default="resume,cover", help=f"tipos separados por vírgula: {', '.join(BULK_KINDS)}")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="processos de inferência (WORKER_PROCESSES); 0 roda no próprio processo")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument("--model", default=None, help="gerador registrado (GENERATOR_MODELS); vazio = padrão")
+    parser.add_argument("--restart", action="store_true", help="ignora o checkpoint e reescreve a saída")
+    parser.add_argument("--log-level", choices=("off", "error", "warning", "info", "debug"),
+                        help="padrão: LOG_LEVEL, ou info (progresso a cada bloco)")
+    args = parser.parse_args(argv)
+    set_level(args.log_level or os.getenv("LOG_LEVEL", "info"))
+
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in BULK_KINDS]
+    if unknown or not kinds:
+        parser.error(f"tipos desconhecidos: {', '.join(unknown) or '(nenhum)'}")
+    if args.processes is not None:
+        os.environ["WORKER_PROCESSES"] = str(args.processes)
+    if args.restart and os.path.exists(args.out):
+        os.remove(args.out)
+
+    summary = run(args.input, args.out, kinds, max(1, args.chunk_size), args.model, args.restart)
+    print(json.dumps({key: summary[key] for key in ("records", "errors", "line")}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# decoding.py - Perfis de decodificação por endpoint e ajuste ao orçamento de latência do cliente
+import contextvars
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+from admission import Deadline
+from logger import get_logger
+from metrics import REGISTRY
+
+logger = get_logger("decoding")
+
+# Parâmetros de geração por endpoint (também entram na chave do cache de resultados).
+# num_beams/do_sample são o modo "com folga"; sob orçamento apertado o plano reduz.
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "summarize": {"max_new_tokens": 150, "min_new_tokens": 50, "do_sample": False, "num_beams": 1},
+    "resume": {"max_new_tokens": 512, "do_sample": True, "temperature": 0.7, "num_beams": 1},
+    "cover": {"max_new_tokens": 512, "do_sample": True, "temperature": 0.7, "num_beams": 1},
+}
+# JSON com sobrescritas por endpoint, ex.: '{"cover": {"num_beams": 4, "max_new_tokens": 384}}'
+DECODING_PROFILES_JSON = os.getenv("DECODING_PROFILES", "")
+# Custo de cada beam extra por passo, relativo a um passo guloso (beams rodam juntos no batch)
+DECODING_BEAM_STEP_COST = float(os.getenv("DECODING_BEAM_STEP_COST", "0.5"))
+# Amostras de tokens/s necessárias antes de o plano confiar na estimativa
+DECODING_MIN_SAMPLES = int(os.getenv("DECODING_MIN_SAMPLES", "3"))
+# Peso das amostras antigas na regressão tempo x tokens (decaimento por amostra)
+DECODING_RATE_DECAY = float(os.getenv("DECODING_RATE_DECAY", "0.95"))
+# Fração do orçamento usada no plano; o resto cobre fila e variação
+DECODING_BUDGET_SAFETY = float(os.getenv("DECODING_BUDGET_SAFETY", "0.85"))
+# Abaixo disso não vale a pena gerar: o plano ainda roda, mas já com o mínimo
+DECODING_MIN_NEW_TOKENS = int(os.getenv("DECODING_MIN_NEW_TOKENS", "16"))
+LATENCY_BUDGET_HEADER = "X-Latency-Budget-Ms"
+
+
+def _load_profiles() -> Dict[str, Dict[str, Any]]:
+    profiles = {name: dict(params) for name, params in DEFAULT_PROFILES.items()}
+    if DECODING_PROFILES_JSON:
+        try:
+            for name, params in json.loads(DECODING_PROFILES_JSON).items():
+                profiles.setdefault(name, {}).update(params)
+        except (ValueError, AttributeError) as e:
+            logger.error("DECODING_PROFILES inválido (%s), usando os padrões", e)
+    return profiles
+
+
+DECODING_PROFILES = _load_profiles()
+
+
+def decoding_params(profile: str) -> Dict[str, Any]:
+    """Parâmetros de geração do perfil; sem beams e sem amostragem, as chaves ociosas ficam de fora"""
+    params = dict(DECODING_PROFILES[profile])
+    if not params.get("do_sample"):
+        params.pop("temperature", None)
+    if params.get("num_beams", 1) <= 1:
+        params.pop("num_beams", None)
+    return params
+
+
+# -------------------------
+# Tokens por segundo medidos online, por modelo
+# -------------------------
+class ThroughputEstimator:
+    """Regressão linear com decaimento: segundos = overhead + tokens / tokens_por_segundo.
+
+    O overhead (encoder, primeiro passo, fila do batcher) separa-se da taxa de
+    decodificação quando as amostras têm comprimentos de saída variados.
+    """
+
+    def __init__(self, decay: float = DECODING_RATE_DECAY):
+        self.decay = decay
+        self.samples = 0
+        self._lock = threading.Lock()
+        # Somas ponderadas: n, x, y, x², xy (x = tokens, y = segundos)
+        self._sums = [0.0] * 5
+
+    def observe(self, tokens: int, seconds: float):
+        if tokens <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            n, sx, sy, sxx, sxy = (value * self.decay for value in self._sums)
+            self._sums = [n + 1, sx + tokens, sy + seconds, sxx + tokens * tokens, sxy + tokens * seconds]
+            self.samples += 1
+
+    def fit(self) -> Optional[tuple]:
+        """(overhead em s, segundos por token) ou None sem amostras suficientes"""
+        with self._lock:
+            if self.samples < DECODING_MIN_SAMPLES:
+                return None
+            n, sx, sy, sxx, sxy = self._sums
+        variance = n * sxx - sx * sx
+        if variance > 1e-9 * n * n:
+            per_token = (n * sxy - sx * sy) / variance
+            overhead = (sy - per_token * sx) / n
+            if per_token > 0 and overhead >= 0:
+                return overhead, per_token
+        # Comprimentos parecidos (ou ajuste sem sentido físico): tudo vira custo por token
+        return 0.0, sy / sx
+
+    def stats(self) -> Dict[str, Any]:
+        fitted = self.fit()
+        return {
+            "samples": self.samples,
+            "tokensPerSecond": round(1.0 / fitted[1], 1) if fitted else None,
+            "overheadMs": round(fitted[0] * 1000, 1) if fitted else None,
+        }
+
+
+_estimators: Dict[str, ThroughputEstimator] = {}
+_estimators_lock = threading.Lock()
+
+
+def throughput(model: str) -> ThroughputEstimator:
+    with _estimators_lock:
+        estimator = _estimators.get(model)
+        if estimator is None:
+            estimator = _estimators[model] = ThroughputEstimator()
+        return estimator
+
+
+# -------------------------
+# Orçamento de latência da requisição
+# -------------------------
+class LatencyBudget(Deadline):
+    """Como o ``Deadline``, mas o modelo é ajustado para caber e a saída cortada no prazo é aceita.
+
+    ``degraded`` marca qualquer resposta fora do perfil completo (não entra no cache);
+    ``partial`` marca a geração interrompida no meio pelo prazo.
+    """
+
+    __slots__ = ("partial",)
+    # O batcher entrega a saída parcial em vez de DeadlineExceeded
+    accepts_partial = True
+
+    def __init__(self, budget_seconds: float):
+        super().__init__(budget_seconds)
+        self.partial = False
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> Optional["LatencyBudget"]:
+        if not value:
+            return None
+        try:
+            return cls(float(value) / 1000)
+        except ValueError:
+            return None
+
+
+_current_budget: contextvars.ContextVar = contextvars.ContextVar("latency_budget", default=None)
+
+
+@contextmanager
+def budget_scope(budget: Optional[LatencyBudget]) -> Iterator[Optional[LatencyBudget]]:
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def current_budget() -> Optional[LatencyBudget]:
+    return _current_budget.get()
+
+
+class DecodingPlan(NamedTuple):
+    params: Dict[str, Any]
+    # full: perfil completo; reduced: menos beams, sem amostragem e/ou menos tokens
+    kind: str
+
+
+def plan_decoding(profile: str, model: str, budget: Optional[LatencyBudget] = None) -> DecodingPlan:
+    """Parâmetros do perfil ajustados para a geração caber no orçamento restante.
+
+    Ordem de corte: beams extras, depois max_new_tokens (com decodificação gulosa,
+    que tem duração previsível e saída reaproveitável). Sem estimativa de tokens/s
+    ainda, roda o perfil completo e o ``max_time`` do batcher corta no prazo.
+    """
+    params = decoding_params(profile)
+    fitted = throughput(model).fit() if budget is not None else None
+    if fitted is None:
+        return DecodingPlan(params, "full")
+    overhead, per_token = fitted
+    available = budget.remaining() * DECODING_BUDGET_SAFETY - overhead
+    max_new_tokens = params.get("max_new_tokens", 0)
+    beams = params.get("num_beams", 1)
+
+    def step_cost(num_beams: int) -> float:
+        return per_token * (1 + DECODING_BEAM_STEP_COST * (num_beams - 1))
+
+    if max_new_tokens * step_cost(beams) <= available:
+        return DecodingPlan(params, "full")
+    if beams > 1:
+        params.pop("num_beams")
+        if max_new_tokens * step_cost(1) <= available:
+            return DecodingPlan(params, "reduced")
+    fits = max(DECODING_MIN_NEW_TOKENS, int(available / step_cost(1))) if available > 0 else DECODING_MIN_NEW_TOKENS
+    params["max_new_tokens"] = min(max_new_tokens, fits)
+    if "min_new_tokens" in params:
+        params["min_new_tokens"] = min(params["min_new_tokens"], params["max_new_tokens"] // 2)
+    params["do_sample"] = False
+    params.pop("temperature", None)
+    return DecodingPlan(params, "reduced")
+
+
+def record_plan(profile: str, plan: DecodingPlan, partial: bool = False):
+    DECODING_PLANS.inc(profile=profile, plan="partial" if partial else plan.kind)
+
+
+def decoding_stats() -> Dict[str, Any]:
+    with _estimators_lock:
+        estimators = dict(_estimators)
+    return {
+        "profiles": DECODING_PROFILES,
+        "models": {model: estimator.stats() for model, estimator in estimators.items()},
+    }
+
+
+DECODING_PLANS = REGISTRY.counter("ai_decoding_plans_total",
+                                  "Gerações por perfil e plano: full, reduced (orçamento) ou partial (cortada no prazo)",
+                                  ["profile", "plan"])
+
+
+def _tokens_per_second() -> Dict[tuple, float]:
+    values = {}
+    for model, stats in decoding_stats()["models"].items():
+        if stats["tokensPerSecond"] is not None:
+            values[(model,)] = stats["tokensPerSecond"]
+    return values
+
+
+REGISTRY.gauge("ai_generation_tokens_per_second", "Tokens de saída por segundo estimados online", ["model"],
+               _tokens_per_second)
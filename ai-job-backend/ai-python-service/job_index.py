@@ -0,0 +1,314 @@
+# job_index.py - Índice vetorial das vagas (TF-IDF de termos + habilidades) para ranquear currículos
+import json
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from logger import get_logger
+from metrics import REGISTRY, stage_timer
+from resume_parser import extract_techs, parse_resume
+
+logger = get_logger("job_index")
+
+# Pasta com as matrizes .npy (carregadas com mmap); vazio = índice só em memória
+JOB_INDEX_DIR = os.getenv("JOB_INDEX_DIR", "")
+# Grava o índice compactado depois das alterações (add/remove)
+JOB_INDEX_AUTOSAVE = os.getenv("JOB_INDEX_AUTOSAVE", "1") == "1"
+# Espera após a primeira alteração antes de gravar: uma rajada de add/remove vira uma gravação só (0 = imediato)
+JOB_INDEX_SAVE_DELAY_SECONDS = float(os.getenv("JOB_INDEX_SAVE_DELAY_SECONDS", "5"))
+# Peso das habilidades (taxonomia) em relação aos termos livres da descrição
+JOB_INDEX_SKILL_WEIGHT = float(os.getenv("JOB_INDEX_SKILL_WEIGHT", "2.0"))
+
+SKILL_PREFIX = "skill:"
+TERM_RE = re.compile(r"[a-zà-ÿ][a-zà-ÿ0-9+#]{2,}")
+STOPWORDS = frozenset("""
+    the and for with you our are will from that this have has your their who can all not but
+    com para uma por que dos das nos nas ser sua seu mais como sobre entre pela pelo ter são
+    vaga vagas experiência experience conhecimento knowledge trabalho work equipe team
+""".split())
+
+
+class JobMatch(NamedTuple):
+    id: str
+    title: Optional[str]
+    score: float
+    matched_skills: List[str]
+    missing_skills: List[str]
+
+
+def _features(text: str, skills: Optional[List[str]] = None) -> Dict[str, float]:
+    """Frequência (log) dos termos e das habilidades canônicas do texto"""
+    counts: Dict[str, int] = {}
+    for term in TERM_RE.findall(text.lower()):
+        if term not in STOPWORDS:
+            counts[term] = counts.get(term, 0) + 1
+    features = {term: 1.0 + math.log(count) for term, count in counts.items()}
+    for skill in (skills if skills is not None else extract_techs(text)):
+        features[SKILL_PREFIX + skill] = JOB_INDEX_SKILL_WEIGHT
+    return features
+
+
+class JobIndex:
+    """Matriz esparsa vagas x features no layout CSR (data/indices/indptr em NumPy).
+
+    As linhas guardam só o TF; o IDF é aplicado no momento da consulta, então
+    adicionar ou remover vagas não reprocessa as demais: o vocabulário só cresce,
+    remoções viram lápides (``alive``) e as linhas novas são anexadas ao CSR.
+    Os mesmos arrays podem ser embrulhados por ``scipy.sparse.csr_matrix`` sem cópia.
+    """
+
+    def __init__(self, directory: str = JOB_INDEX_DIR):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self.vocab: List[str] = []
+        self._feature_ids: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.titles: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self.data = np.zeros(0, dtype=np.float32)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.df = np.zeros(0, dtype=np.int32)
+        # Linhas adicionadas desde a última consulta (anexadas ao CSR de uma vez)
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._norms: Optional[np.ndarray] = None
+        self._save_timer: Optional[threading.Timer] = None
+        if directory and os.path.exists(os.path.join(directory, "meta.json")):
+            self.load()
+
+    # -------------------------
+    # Vocabulário
+    # -------------------------
+    def _feature_id(self, feature: str) -> int:
+        feature_id = self._feature_ids.get(feature)
+        if feature_id is None:
+            feature_id = self._feature_ids[feature] = len(self.vocab)
+            self.vocab.append(feature)
+        return feature_id
+
+    def _grow_df(self):
+        if len(self.df) < len(self.vocab):
+            self.df = np.concatenate([self.df, np.zeros(len(self.vocab) - len(self.df), dtype=np.int32)])
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return int(self.alive.sum()) + len(self._pending)
+
+    # -------------------------
+    # Alterações incrementais
+    # -------------------------
+    def add(self, job_id: str, description: str, title: Optional[str] = None):
+        """Indexa (ou substitui) uma vaga"""
+        features = _features(description)
+        with self._lock:
+            if job_id in self._rows:
+                self._remove_locked(job_id)
+            columns = np.array([self._feature_id(name) for name in features], dtype=np.int32)
+            values = np.array(list(features.values()), dtype=np.float32)
+            order = np.argsort(columns)
+            self._grow_df()
+            np.add.at(self.df, columns, 1)
+            self._rows[job_id] = len(self.ids)
+            self.ids.append(job_id)
+            self.titles.append(title)
+            self._pending.append((columns[order], values[order]))
+            self._norms = None
+
+    def add_many(self, jobs: List[Tuple[str, str, Optional[str]]]):
+        with self._lock:
+            for job_id, description, title in jobs:
+                self.add(job_id, description, title)
+            self._autosave()
+
+    def remove(self, job_id: str) -> bool:
+        with self._lock:
+            if job_id not in self._rows:
+                return False
+            self._remove_locked(job_id)
+            self._autosave()
+            return True
+
+    def _remove_locked(self, job_id: str):
+        self._flush()
+        row = self._rows.pop(job_id)
+        start, end = self.indptr[row], self.indptr[row + 1]
+        np.subtract.at(self.df, self.indices[start:end], 1)
+        self.alive = np.array(self.alive)
+        self.alive[row] = False
+        self._norms = None
+
+    def _flush(self):
+        """Anexa as linhas pendentes ao CSR (uma concatenação por lote de adds)"""
+        if not self._pending:
+            return
+        lengths = np.array([len(columns) for columns, _ in self._pending], dtype=np.int64)
+        self.indices = np.concatenate([self.indices] + [columns for columns, _ in self._pending])
+        self.data = np.concatenate([self.data] + [values for _, values in self._pending])
+        self.indptr = np.concatenate([self.indptr, self.indptr[-1] + np.cumsum(lengths)])
+        self.alive = np.concatenate([self.alive, np.ones(len(self._pending), dtype=bool)])
+        self._pending = []
+
+    # -------------------------
+    # Consulta
+    # -------------------------
+    def _idf(self) -> np.ndarray:
+        n = max(1, int(self.alive.sum()))
+        return (np.log((1 + n) / (1 + self.df.astype(np.float32))) + 1).astype(np.float32)
+
+    def _row_sums(self, values: np.ndarray) -> np.ndarray:
+        """Soma por linha do CSR; linhas vazias (vaga sem features) somam 0"""
+        n_rows = len(self.indptr) - 1
+        row_ids = np.repeat(np.arange(n_rows), np.diff(self.indptr))
+        return np.bincount(row_ids, weights=values, minlength=n_rows).astype(np.float32)
+
+    def _row_norms(self, idf: np.ndarray) -> np.ndarray:
+        if self._norms is None:
+            self._norms = np.sqrt(self._row_sums((self.data * idf[self.indices]) ** 2))
+        return self._norms
+
+    def match(self, resume_text: str, top_k: int = 10) -> List[JobMatch]:
+        """Cosseno TF-IDF do currículo contra todas as vagas num único produto matriz-vetor"""
+        resume = parse_resume(resume_text)
+        features = _features(resume_text, list(resume.techs))
+        with self._lock:
+            self._flush()
+            if not self.ids or not self.alive.any():
+                return []
+            idf = self._idf()
+            query = np.zeros(len(self.vocab), dtype=np.float32)
+            for name, value in features.items():
+                feature_id = self._feature_ids.get(name)
+                if feature_id is not None:
+                    query[feature_id] = value
+            query *= idf
+            query_norm = float(np.linalg.norm(query))
+            if query_norm == 0:
+                return []
+            with stage_timer("match", "job_index"):
+                # Cada linha: soma de tf * idf * q[coluna]; depois divide pelas normas
+                products = self.data * idf[self.indices] * query[self.indices]
+                scores = self._row_sums(products)
+                norms = self._row_norms(idf)
+                scores = np.divide(scores, norms * query_norm, out=np.zeros_like(scores), where=norms > 0)
+                scores[~self.alive] = -np.inf
+
+                k = min(top_k, len(scores))
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+            resume_skills = set(resume.techs)
+            # Vagas sem nenhum termo em comum ficam de fora
+            return [self._result(int(row), float(scores[row]), resume_skills) for row in top if scores[row] > 0]
+
+    def _result(self, row: int, score: float, resume_skills) -> JobMatch:
+        start, end = self.indptr[row], self.indptr[row + 1]
+        job_skills = [self.vocab[i][len(SKILL_PREFIX):] for i in self.indices[start:end]
+                      if self.vocab[i].startswith(SKILL_PREFIX)]
+        matched = [skill for skill in job_skills if skill in resume_skills]
+        missing = [skill for skill in job_skills if skill not in resume_skills]
+        return JobMatch(self.ids[row], self.titles[row], round(score, 4), matched, missing)
+
+    # -------------------------
+    # Persistência (.npy + mmap)
+    # -------------------------
+    def _compact(self):
+        """Remove as linhas mortas (só na gravação; a consulta ignora as lápides)"""
+        self._flush()
+        if self.alive.all():
+            return
+        keep = np.flatnonzero(self.alive)
+        lengths = (self.indptr[1:] - self.indptr[:-1])[keep]
+        spans = [np.arange(self.indptr[row], self.indptr[row + 1]) for row in keep]
+        positions = np.concatenate(spans) if spans else np.zeros(0, dtype=np.int64)
+        self.indices = self.indices[positions]
+        self.data = self.data[positions]
+        self.indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.ids = [self.ids[row] for row in keep]
+        self.titles = [self.titles[row] for row in keep]
+        self._rows = {job_id: row for row, job_id in enumerate(self.ids)}
+        self.alive = np.ones(len(keep), dtype=bool)
+        self._norms = None
+
+    def _autosave(self):
+        if not (self.directory and JOB_INDEX_AUTOSAVE):
+            return
+        if JOB_INDEX_SAVE_DELAY_SECONDS <= 0:
+            self.save()
+        elif self._save_timer is None:
+            self._save_timer = threading.Timer(JOB_INDEX_SAVE_DELAY_SECONDS, self._scheduled_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _scheduled_save(self):
+        with self._lock:
+            self._save_timer = None
+        self.save()
+
+    def save_pending(self):
+        """Grava agora as alterações que aguardam o autosave (chamado no shutdown)"""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    def save(self, directory: Optional[str] = None):
+        directory = directory or self.directory
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._compact()
+            self._grow_df()
+            arrays = {"data": self.data, "indices": self.indices, "indptr": self.indptr, "df": self.df}
+            for name, array in arrays.items():
+                # Grava num temporário e troca: leitores com mmap do arquivo antigo não quebram
+                tmp_path = os.path.join(directory, f"{name}.tmp.npy")
+                np.save(tmp_path, np.ascontiguousarray(array))
+                os.replace(tmp_path, os.path.join(directory, f"{name}.npy"))
+            meta = {"vocab": self.vocab, "ids": self.ids, "titles": self.titles}
+            tmp_meta = os.path.join(directory, "meta.tmp.json")
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp_meta, os.path.join(directory, "meta.json"))
+        logger.info("índice de vagas gravado em %s (%d vagas, %d features)", directory, len(self.ids), len(self.vocab))
+
+    def load(self, directory: Optional[str] = None):
+        directory = directory or self.directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with self._lock:
+            # mmap: várias réplicas da API compartilham as páginas do índice
+            self.data = np.load(os.path.join(directory, "data.npy"), mmap_mode="r")
+            self.indices = np.load(os.path.join(directory, "indices.npy"), mmap_mode="r")
+            self.indptr = np.load(os.path.join(directory, "indptr.npy"), mmap_mode="r")
+            self.df = np.array(np.load(os.path.join(directory, "df.npy")))
+            self.vocab = meta["vocab"]
+            self._feature_ids = {feature: i for i, feature in enumerate(self.vocab)}
+            self.ids = meta["ids"]
+            self.titles = meta["titles"]
+            self._rows = {job_id: row for row, job_id in enumerate(self.ids)}
+            self.alive = np.ones(len(self.ids), dtype=bool)
+            self._pending = []
+            self._norms = None
+        logger.info("índice de vagas carregado de %s (%d vagas, mmap)", directory, len(self.ids))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "jobs": self.size,
+                "deleted": int((~self.alive).sum()),
+                "features": len(self.vocab),
+                "nonZeros": int(len(self.data)) + sum(len(columns) for columns, _ in self._pending),
+                "matrixKb": round((self.data.nbytes + self.indices.nbytes + self.indptr.nbytes) / 1024, 1),
+                "memoryMapped": isinstance(self.data, np.memmap),
+                "directory": self.directory or None,
+            }
+
+
+job_index = JobIndex()
+
+REGISTRY.gauge("ai_job_index_size", "Vagas ativas no índice de matching", [], lambda: {(): job_index.size})
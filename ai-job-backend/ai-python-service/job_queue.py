@@ -0,0 +1,385 @@
+# job_queue.py - Fila persistente (SQLite) de gerações assíncronas, drenada por threads worker
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anyio
+
+from logger import get_logger
+from metrics import REGISTRY
+
+logger = get_logger("jobs")
+
+# Arquivo da fila; sobrevive a reinícios (jobs "running" com lease vencido voltam para "queued")
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs.sqlite3"))
+# Threads que drenam a fila; 0 desliga os workers (a API só enfileira)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Tentativas por job: um job que derruba o processo não volta para a fila para sempre
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Um job "running" pertence à réplica que renova o lease; sem renovação (processo caiu) volta para a fila
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Modelo ocupado (Overloaded) ou prazo esgotado: o job volta para a fila com espera exponencial
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "300"))
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", "20"))
+# Jobs terminados ficam consultáveis (e servem de dedup) por este tempo
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "604800"))
+# Teto do long-poll de GET /jobs/{id}?wait=
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", "60"))
+# Intervalo com que o long-poll assíncrono confere se algum job desta instância mudou
+JOB_POLL_INTERVAL_MS = float(os.getenv("JOB_POLL_INTERVAL_MS", "50"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+# (kind, payload) -> (resultado, modelo que o produziu)
+JobRunner = Callable[[str, Dict[str, Any]], Tuple[Any, str]]
+
+_COLUMNS = ("id", "kind", "input_hash", "payload", "status", "result", "model", "error",
+            "attempts", "created", "started", "finished", "owner", "lease_until", "not_before", "retries")
+# Colunas adicionadas depois da primeira versão da tabela (migradas com ALTER TABLE)
+_LEASE_COLUMNS = {"owner": "TEXT", "lease_until": "REAL", "not_before": "REAL", "retries": "INTEGER NOT NULL DEFAULT 0"}
+
+
+class RetryLater(Exception):
+    """Falha passageira (modelo ocupado, prazo): o job volta para a fila em vez de falhar"""
+
+    def __init__(self, message: str, delay: float = 0.0):
+        super().__init__(message)
+        self.delay = delay
+
+
+class JobQueue:
+    """Fila de jobs em SQLite (WAL) com deduplicação pelo hash da entrada.
+
+    O claim usa ``BEGIN IMMEDIATE``: várias réplicas da API apontando para o
+    mesmo arquivo nunca pegam o mesmo job. O job em execução leva o ``owner`` e
+    um lease renovado pela réplica dona; só leases vencidos são recuperados.
+    """
+
+    def __init__(self, db_path: str = JOB_QUEUE_DB, workers: int = JOB_WORKERS):
+        self.db_path = db_path
+        self.workers = workers
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # Acorda workers (novo job) e long-polls (job mudou de estado)
+        self._changed = threading.Condition()
+        # Incrementado a cada notificação: o long-poll assíncrono compara sem bloquear o event loop
+        self._version = 0
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._runner: Optional[JobRunner] = None
+        self._last_purge = 0.0
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Jobs que os workers desta instância estão executando (o heartbeat renova só estes)
+        self._running: set = set()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, input_hash TEXT NOT NULL, payload TEXT NOT NULL,"
+                " status TEXT NOT NULL, result TEXT, model TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL, started REAL, finished REAL)"
+            )
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, ddl in _LEASE_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {ddl}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs(status, created)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_input_hash ON jobs(input_hash)")
+            self._conn = conn
+        return self._conn
+
+    def _notify(self):
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    # -------------------------
+    # API
+    # -------------------------
+    def submit(self, kind: str, payload: Dict[str, Any], input_hash: str) -> Tuple[Dict[str, Any], bool]:
+        """Enfileira o job; com um job igual pendente ou concluído devolve esse (deduplicado=True)"""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE input_hash = ? AND status != ?"
+                    " ORDER BY created DESC LIMIT 1", (input_hash, FAILED)).fetchone()
+                if row is None:
+                    job_id = uuid.uuid4().hex
+                    db.execute(
+                        "INSERT INTO jobs (id, kind, input_hash, payload, status, created) VALUES (?, ?, ?, ?, ?, ?)",
+                        (job_id, kind, input_hash, json.dumps(payload, ensure_ascii=False), QUEUED, time.time()))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        if row is not None:
+            JOBS_TOTAL.inc(kind=kind, event="deduplicated")
+            return _job(row), True
+        JOBS_TOTAL.inc(kind=kind, event="submitted")
+        self._notify()
+        return self.get(job_id), False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row is not None else None
+
+    def wait(self, job_id: str, timeout: float, changed_from: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Long-poll: espera o job terminar (ou sair do status ``changed_from``) por até ``timeout`` s"""
+        end = time.monotonic() + min(max(timeout, 0.0), JOB_MAX_WAIT_SECONDS)
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            if (job["status"] != changed_from) if changed_from else (job["status"] in FINISHED):
+                return job
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return job
+            # Sem notificação (worker de outra réplica) relê o banco a cada segundo
+            with self._changed:
+                self._changed.wait(min(remaining, 1.0))
+
+    async def wait_async(self, job_id: str, timeout: float,
+                         changed_from: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """``wait`` para o event loop: espera com ``anyio.sleep`` em vez de prender uma thread do pool"""
+        end = time.monotonic() + min(max(timeout, 0.0), JOB_MAX_WAIT_SECONDS)
+        while True:
+            version = self._version
+            job = await anyio.to_thread.run_sync(self.get, job_id)
+            if job is None:
+                return None
+            if (job["status"] != changed_from) if changed_from else (job["status"] in FINISHED):
+                return job
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return job
+            # Relê o banco quando um worker local notifica ou, no máximo, a cada segundo
+            tick = time.monotonic() + min(remaining, 1.0)
+            while self._version == version and time.monotonic() < tick:
+                await anyio.sleep(JOB_POLL_INTERVAL_MS / 1000)
+
+    def depth(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE status IN (?, ?) GROUP BY status", (QUEUED, RUNNING)).fetchall()
+        counts = {QUEUED: 0, RUNNING: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def oldest_age(self) -> float:
+        """Idade (s) do job mais antigo esperando: cresce quando faltam workers"""
+        with self._lock:
+            oldest = self._db().execute("SELECT MIN(created) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+        return time.time() - oldest if oldest is not None else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._threads),
+            "depth": self.depth(),
+            "oldestQueuedSeconds": round(self.oldest_age(), 1),
+            "db": self.db_path,
+        }
+
+    # -------------------------
+    # Workers
+    # -------------------------
+    def start(self, runner: JobRunner):
+        self._runner = runner
+        if self.workers <= 0:
+            # Só enfileira: outra réplica (ou processo dedicado) drena a fila
+            logger.info("Fila de jobs em '%s' sem workers neste processo (JOB_WORKERS=0)", self.db_path)
+            return
+        self._recover()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+        logger.info("Fila de jobs em '%s' com %d workers", self.db_path, self.workers)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._notify()
+        for thread in self._threads + ([self._heartbeat_thread] if self._heartbeat_thread else []):
+            thread.join(timeout)
+        self._threads = []
+        self._heartbeat_thread = None
+
+    def _recover(self):
+        """Jobs cujo dono parou de renovar o lease (processo caiu) voltam para a fila.
+
+        Jobs de outras réplicas vivas têm lease em dia e não são tocados; linhas sem
+        lease (gravadas antes da coluna existir) são tratadas como vencidas.
+        """
+        with self._lock:
+            recovered = self._db().execute(
+                "UPDATE jobs SET status = ?, started = NULL, owner = NULL, lease_until = NULL"
+                " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, RUNNING, time.time())).rowcount
+        if recovered:
+            logger.warning("%d jobs interrompidos (lease vencido) voltaram para a fila", recovered)
+
+    def _heartbeat(self):
+        """Renova o lease dos jobs em execução nesta instância"""
+        while not self._stop.wait(JOB_LEASE_SECONDS / 3):
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                with self._lock:
+                    self._db().execute(
+                        f"UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?"
+                        f" AND id IN ({', '.join('?' * len(running))})",
+                        (time.time() + JOB_LEASE_SECONDS, self.owner, RUNNING, *running))
+            except sqlite3.Error:
+                logger.exception("Erro renovando o lease dos jobs")
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = db.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = ? AND (not_before IS NULL OR not_before <= ?)"
+                    " ORDER BY created LIMIT 1", (QUEUED, now)).fetchone()
+                if row is not None:
+                    db.execute("UPDATE jobs SET status = ?, started = ?, attempts = attempts + 1, owner = ?,"
+                               " lease_until = ? WHERE id = ?",
+                               (RUNNING, now, self.owner, now + JOB_LEASE_SECONDS, row[0]))
+                    row = db.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (row[0],)).fetchone()
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return _job(row) if row is not None else None
+
+    def _finish(self, job_id: str, status: str, result: Any = None, model: Optional[str] = None,
+                error: Optional[str] = None) -> bool:
+        """Grava o resultado se o job ainda é desta instância; False se o lease venceu e outra o pegou"""
+        with self._lock:
+            updated = self._db().execute(
+                "UPDATE jobs SET status = ?, result = ?, model = ?, error = ?, finished = ?"
+                " WHERE id = ? AND status = ? AND owner = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 model, error, time.time(), job_id, RUNNING, self.owner)).rowcount
+        if not updated:
+            logger.warning("Job %s não pertence mais a esta instância (lease vencido): resultado descartado", job_id)
+            return False
+        self._notify()
+        return True
+
+    def _retry(self, job: Dict[str, Any], delay: float):
+        """Devolve o job à fila; a tentativa não conta para JOB_MAX_ATTEMPTS"""
+        delay = min(JOB_RETRY_MAX_SECONDS, max(delay, JOB_RETRY_BASE_SECONDS * 2 ** job["retries"]))
+        with self._lock:
+            self._db().execute(
+                "UPDATE jobs SET status = ?, started = NULL, owner = NULL, lease_until = NULL, not_before = ?,"
+                " retries = retries + 1, attempts = attempts - 1 WHERE id = ? AND status = ? AND owner = ?",
+                (QUEUED, time.time() + delay, job["id"], RUNNING, self.owner))
+        self._notify()
+
+    def _purge(self):
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        with self._lock:
+            removed = self._db().execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+                                         (DONE, FAILED, now - JOB_RETENTION_SECONDS)).rowcount
+        if removed:
+            logger.info("%d jobs expirados removidos da fila", removed)
+        # Jobs de réplicas que caíram são retomados pelas que continuam vivas
+        self._recover()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                self._purge()
+                job = self._claim()
+            except sqlite3.Error:
+                logger.exception("Erro lendo a fila de jobs")
+                job = None
+            if job is None:
+                with self._changed:
+                    self._changed.wait(1.0)
+                continue
+            with self._lock:
+                self._running.add(job["id"])
+            try:
+                self._run(job)
+            except Exception:
+                # Falha gravando o resultado: o lease vence e o job é retomado
+                logger.exception("Erro gravando o job %s", job["id"])
+            finally:
+                with self._lock:
+                    self._running.discard(job["id"])
+
+    def _run(self, job: Dict[str, Any]):
+        kind = job["kind"]
+        JOB_WAIT_SECONDS.observe(job["queueSeconds"], kind=kind)
+        if job["attempts"] > JOB_MAX_ATTEMPTS:
+            # attempts conta o claim atual: o job já foi iniciado JOB_MAX_ATTEMPTS vezes sem terminar
+            if self._finish(job["id"], FAILED, error=f"abandonado após {job['attempts'] - 1} tentativas"):
+                JOBS_TOTAL.inc(kind=kind, event=FAILED)
+            return
+        self._notify()
+        try:
+            result, model = self._runner(kind, job["payload"])
+        except RetryLater as e:
+            if job["retries"] < JOB_MAX_RETRIES:
+                logger.info("Job %s (%s) volta para a fila: %s", job["id"], kind, e)
+                self._retry(job, e.delay)
+                JOBS_TOTAL.inc(kind=kind, event="retried")
+                return
+            if self._finish(job["id"], FAILED, error=f"{e} (após {job['retries']} reenfileiramentos)"):
+                JOBS_TOTAL.inc(kind=kind, event=FAILED)
+            return
+        except Exception as e:
+            logger.exception("Job %s (%s) falhou", job["id"], kind)
+            if self._finish(job["id"], FAILED, error=str(e) or e.__class__.__name__):
+                JOBS_TOTAL.inc(kind=kind, event=FAILED)
+            return
+        if self._finish(job["id"], DONE, result, model):
+            JOBS_TOTAL.inc(kind=kind, event=DONE)
+
+
+def _job(row) -> Dict[str, Any]:
+    job = dict(zip(_COLUMNS, row))
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    started, finished = job["started"], job["finished"]
+    job["queueSeconds"] = round((started or time.time()) - job["created"], 3)
+    job["runSeconds"] = round((finished or time.time()) - started, 3) if started else None
+    return job
+
+
+job_queue = JobQueue()
+
+JOBS_TOTAL = REGISTRY.counter("ai_jobs_total", "Jobs assíncronos por tipo: submitted, deduplicated, retried, done ou failed",
+                              ["kind", "event"])
+JOB_WAIT_SECONDS = REGISTRY.histogram("ai_job_queue_wait_seconds", "Espera na fila até um worker pegar o job", ["kind"])
+REGISTRY.gauge("ai_job_queue_depth", "Jobs esperando (queued) e em execução (running)", ["status"],
+               lambda: {(status,): count for status, count in job_queue.depth().items()})
+REGISTRY.gauge("ai_job_queue_oldest_seconds", "Idade do job mais antigo ainda na fila", [],
+               lambda: {(): job_queue.oldest_age()})
@@ -0,0 +1,35 @@
+# logger.py - Logger com níveis para o serviço (desligado por padrão)
+import logging
+import os
+import sys
+
+# off (padrão), error, warning, info ou debug
+LOG_LEVEL = os.getenv("LOG_LEVEL", "off").upper()
+
+_ROOT_NAME = "ai_service"
+_OFF = logging.CRITICAL + 10
+
+
+def _configure() -> logging.Logger:
+    root = logging.getLogger(_ROOT_NAME)
+    if root.handlers:
+        return root
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(_OFF if LOG_LEVEL == "OFF" else logging.getLevelName(LOG_LEVEL))
+    # Não duplica as mensagens no logger raiz do uvicorn
+    root.propagate = False
+    return root
+
+
+def set_level(level: str):
+    """Troca o nível em tempo de execução (ex.: flag --log-level de um CLI)"""
+    level = level.upper()
+    _configure().setLevel(_OFF if level == "OFF" else logging.getLevelName(level))
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger filho de ``ai_service``; use %-formatação para não formatar com o log desligado"""
+    _configure()
+    return logging.getLogger(f"{_ROOT_NAME}.{name}")
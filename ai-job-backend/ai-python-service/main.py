@@ -1,25 +1,362 @@
-from fastapi import FastAPI
+import json
+import threading
+from typing import Optional
+from fastapi import FastAPI, Header, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from admission import Deadline, DeadlineExceeded, Overloaded, admission_stats, deadline_scope
+from decoding import LatencyBudget, budget_scope, decoding_stats
+from job_index import job_index
+from job_queue import FINISHED, job_queue
+from metrics import render_prometheus, stage_timer
+from model_registry import UnknownModel, model_scope
 from models import *
+from near_duplicates import near_duplicate_report, near_duplicates
+from profiling import install_profiling
 from services import *
 
-app = FastAPI(title="AI Job Assistant")
+class TimedJSONResponse(JSONResponse):
+    # Serialização das respostas JSON entra na métrica de etapas
+    def render(self, content) -> bytes:
+        with stage_timer("serialize", "json"):
+            return super().render(content)
 
+app = FastAPI(title="AI Job Assistant", default_response_class=TimedJSONResponse)
+# PROFILING_ENABLED=1: X-Profile (ou PROFILE_SAMPLE_RATE) grava um cProfile da requisição e, com PROFILING_TOKEN,
+# registra /admin/profiles; precisa vir antes das rotas
+install_profiling(app)
+
+@app.exception_handler(Overloaded)
+def overloaded_handler(request: Request, exc: Overloaded):
+    # 429: fila do modelo cheia; 503: espera na fila esgotada
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(DeadlineExceeded)
+def deadline_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(UnknownModel)
+def unknown_model_handler(request: Request, exc: UnknownModel):
+    return JSONResponse(status_code=400, content={"detail": str(exc), "available": exc.available})
+
+def _request_deadline(x_deadline_ms: Optional[str]) -> Optional[Deadline]:
+    """Deadline do header X-Deadline-Ms (orçamento restante em ms); vencido na chegada -> 504"""
+    deadline = Deadline.from_header(x_deadline_ms)
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded("deadline expirou antes do processamento")
+    return deadline
+
+def _mark_degraded(response: Response, deadline: Optional[Deadline], budget: Optional[LatencyBudget] = None) -> bool:
+    """Sinaliza respostas fora do normal (não entram no cache); True se a saída foi cortada no prazo"""
+    # Modelo trocado pelo fallback programático para cumprir o prazo
+    if deadline is not None and deadline.degraded:
+        response.headers["X-Degraded"] = "deadline"
+    # Decodificação reduzida (menos tokens/beams, gulosa) para caber no orçamento de latência
+    elif budget is not None and budget.degraded:
+        response.headers["X-Degraded"] = "latency-budget"
+    partial = budget is not None and budget.partial
+    if partial:
+        response.headers["X-Partial"] = "latency-budget"
+    return partial
+
+@app.on_event("startup")
+def load_models_on_startup():
+    start_model_loading()
+    job_queue.start(run_job)
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: o processo está de pé e aceitando conexões
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: modelos carregados e aquecidos; falha de um handle obrigatório (ou de todos) = 503
+    ready, failed = readiness()
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"ready": ready, "failed": failed, "models": models_status(),
+                                 "warmup": warmup_report.state})
+
+@app.get("/stats/warmup")
+def warmup_stats_endpoint():
+    # Perfil de threads aplicado e tempos frio x estável por modelo, tamanho de entrada e batch
+    return warmup_report.stats()
+
+@app.get("/stats/quantization")
+def quantization_stats_endpoint():
+    # Tamanho antes/depois e check de acurácia contra fp32, por modelo
+    return QUANTIZATION_REPORTS
+
+@app.get("/stats/workers")
+def worker_stats_endpoint():
+    return worker_pool.stats()
+
+@app.on_event("shutdown")
+def stop_workers_on_shutdown():
+    job_queue.stop()
+    job_index.save_pending()
+    if worker_pool.started:
+        worker_pool.stop()
+
+@app.get("/stats/batching")
+def batching_stats_endpoint():
+    # Profundidade das filas e histograma de tamanhos de batch por modelo
+    return batching_stats()
+
+@app.get("/stats/models")
+def model_registry_stats_endpoint():
+    # Modelos registrados por papel: estado, memória estimada, uso recente e evicções
+    return MODEL_REGISTRY.stats()
+
+@app.get("/stats/memory")
+def memory_stats_endpoint():
+    # RSS residente e pico de carregamento por modelo (compara LEAN_MODEL_LOADING=0/1)
+    return memory_report()
+
+@app.get("/stats/admission")
+def admission_stats_endpoint():
+    # Concorrência, fila e recusas (429/503/deadline) por modelo
+    return admission_stats()
+
+@app.get("/stats/decoding")
+def decoding_stats_endpoint():
+    # Perfis de decodificação por endpoint e tokens/s medidos por modelo
+    return decoding_stats()
+
+@app.get("/stats/streaming")
+def streaming_stats_endpoint():
+    return stream_stats.stats()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    # Formato texto do Prometheus: tempos por etapa, fallbacks, tokens e filas
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/cache")
+def cache_stats_endpoint():
+    return {"results": result_cache.stats(), "summaryChunks": chunk_cache.stats(), "tokenCounts": token_cache_stats(),
+            "nearDuplicates": near_duplicates.stats()}
+
+# Cache-Control: no-cache (recalcula e atualiza) ou no-store (ignora o cache) fazem o bypass
+# X-Deadline-Ms: orçamento do cliente; sem tempo para o modelo a resposta vem do fallback programático
+# X-Cache: NEAR em /summarize e /simulate/interview = resultado de um currículo quase idêntico (reusedSimilarity)
+# X-Latency-Budget-Ms: a decodificação se ajusta para caber e, se o tempo acabar, a saída vem cortada (partial)
 @app.post("/summarize", response_model=SummarizeResponse)
-def summarize_endpoint(request: SummarizeRequest):
-    summary = summarize_resume(request.resumeText)
-    return SummarizeResponse(summary=summary)
+def summarize_endpoint(request: SummarizeRequest, response: Response,
+                       cache_control: Optional[str] = Header(None), x_deadline_ms: Optional[str] = Header(None),
+                       x_latency_budget_ms: Optional[str] = Header(None)):
+    with deadline_scope(_request_deadline(x_deadline_ms)) as deadline, \
+            budget_scope(LatencyBudget.from_header(x_latency_budget_ms)) as budget, model_scope(summarizer=request.model), \
+            near_duplicate_report() as reuse:
+        summary, model, response.headers["X-Cache"] = cached_result(
+            "summarize", request.resumeText, "", lambda: summarize_resume_served(request.resumeText), cache_control)
+    return SummarizeResponse(summary=summary, model=model, partial=_mark_degraded(response, deadline, budget),
+                             reusedSimilarity=reuse.get("similarity"))
 
 @app.post("/generate/resume", response_model=GenerateResumeResponse)
-def generate_resume_endpoint(request: GenerateResumeRequest):
-    optimized = generate_optimized_resume(request.resumeText, request.jobDescription)
-    return GenerateResumeResponse(optimizedResumeMarkdown=optimized, model="sshleifer/distilbart-cnn-12-6")
+def generate_resume_endpoint(request: GenerateResumeRequest, response: Response,
+                             cache_control: Optional[str] = Header(None), x_deadline_ms: Optional[str] = Header(None),
+                             x_latency_budget_ms: Optional[str] = Header(None)):
+    with deadline_scope(_request_deadline(x_deadline_ms)) as deadline, \
+            budget_scope(LatencyBudget.from_header(x_latency_budget_ms)) as budget, model_scope(generator=request.model):
+        optimized, model, response.headers["X-Cache"] = cached_result(
+            "resume", request.resumeText, request.jobDescription,
+            lambda: generate_optimized_resume_served(request.resumeText, request.jobDescription), cache_control)
+    return GenerateResumeResponse(optimizedResumeMarkdown=optimized, model=model,
+                                  partial=_mark_degraded(response, deadline, budget))
 
 @app.post("/cover", response_model=CoverLetterResponse)
-def cover_letter_endpoint(request: CoverLetterRequest):
-    cover = generate_cover_letter(request.resumeText, request.jobDescription)
-    return CoverLetterResponse(coverLetterMarkdown=cover, model="sshleifer/distilbart-cnn-12-6")
+def cover_letter_endpoint(request: CoverLetterRequest, response: Response,
+                          cache_control: Optional[str] = Header(None), x_deadline_ms: Optional[str] = Header(None),
+                          x_latency_budget_ms: Optional[str] = Header(None)):
+    with deadline_scope(_request_deadline(x_deadline_ms)) as deadline, \
+            budget_scope(LatencyBudget.from_header(x_latency_budget_ms)) as budget, model_scope(generator=request.model):
+        cover, model, response.headers["X-Cache"] = cached_result(
+            "cover", request.resumeText, request.jobDescription,
+            lambda: generate_cover_letter_served(request.resumeText, request.jobDescription), cache_control)
+    return CoverLetterResponse(coverLetterMarkdown=cover, model=model, partial=_mark_degraded(response, deadline, budget))
 
 @app.post("/simulate/interview", response_model=SimulateInterviewResponse)
-def simulate_interview_endpoint(request: SimulateInterviewRequest):
-    qa = simulate_interview(request.resumeText, request.jobDescription)
-    return SimulateInterviewResponse(qa=qa, model="sshleifer/distilbart-cnn-12-6")
+def simulate_interview_endpoint(request: SimulateInterviewRequest, response: Response,
+                                cache_control: Optional[str] = Header(None)):
+    with near_duplicate_report() as reuse:
+        qa, model, response.headers["X-Cache"] = cached_result(
+            "interview", request.resumeText, request.jobDescription,
+            lambda: simulate_interview_served(request.resumeText, request.jobDescription), cache_control)
+    return SimulateInterviewResponse(qa=qa, model=model, reusedSimilarity=reuse.get("similarity"))
+
+@app.post("/application", response_model=ApplicationResponse)
+def application_endpoint(request: ApplicationRequest, response: Response, x_deadline_ms: Optional[str] = Header(None),
+                         x_latency_budget_ms: Optional[str] = Header(None)):
+    # Resumo, currículo, carta e entrevista com um parse só; status e tempo de cada parte
+    with deadline_scope(_request_deadline(x_deadline_ms)) as deadline, \
+            budget_scope(LatencyBudget.from_header(x_latency_budget_ms)) as budget, \
+            model_scope(summarizer=request.summarizerModel, generator=request.generatorModel):
+        application = generate_application(request.resumeText, request.jobDescription)
+    _mark_degraded(response, deadline, budget)
+    return ApplicationResponse(**application)
+
+# -------------------------
+# Lote: resultados em NDJSON, uma linha por item assim que fica pronto
+# -------------------------
+def _ndjson(items, build):
+    for index, result, error, model in items:
+        with stage_timer("serialize", "ndjson"):
+            line = build(index, result, error, model).model_dump_json() + "\n"
+        yield line
+
+@app.post("/batch/generate/resume")
+def batch_generate_resume_endpoint(request: BatchRequest):
+    # Nome inválido vira 400 antes do streaming começar
+    MODEL_REGISTRY.resolve("generator", request.model)
+    items = generate_optimized_resumes_batch(request.pairs(), request.model)
+    return StreamingResponse(_ndjson(items, lambda index, result, error, model: BatchGenerateResumeItem(
+        index=index, optimizedResumeMarkdown=result, model=model, error=error)),
+        media_type="application/x-ndjson")
+
+@app.post("/batch/cover")
+def batch_cover_letter_endpoint(request: BatchRequest, x_deadline_ms: Optional[str] = Header(None)):
+    deadline = _request_deadline(x_deadline_ms)
+    MODEL_REGISTRY.resolve("generator", request.model).admission.check()
+    items = generate_cover_letters_batch(request.pairs(), deadline, request.model)
+    return StreamingResponse(_ndjson(items, lambda index, result, error, model: BatchCoverLetterItem(
+        index=index, coverLetterMarkdown=result, model=model, error=error)),
+        media_type="application/x-ndjson")
+
+@app.post("/batch/simulate/interview")
+def batch_simulate_interview_endpoint(request: BatchRequest):
+    items = simulate_interviews_batch(request.pairs())
+    return StreamingResponse(_ndjson(items, lambda index, result, error, model: BatchSimulateInterviewItem(
+        index=index, qa=result, model=model, error=error)),
+        media_type="application/x-ndjson")
+
+# -------------------------
+# Streaming via Server-Sent Events: eventos "token" e um "done" final com o texto completo
+# -------------------------
+async def _sse(events, cancel: threading.Event, http_request: Request):
+    try:
+        while True:
+            event = await run_in_threadpool(next, events, None)
+            if event is None:
+                break
+            kind, text = event
+            yield f"event: {kind}\ndata: {json.dumps({'text': text}, ensure_ascii=False)}\n\n"
+            if await http_request.is_disconnected():
+                break
+    finally:
+        # Cliente saiu (ou terminamos): interrompe a geração no próximo token
+        cancel.set()
+
+@app.post("/cover/stream")
+async def cover_letter_stream_endpoint(request: CoverLetterRequest, http_request: Request,
+                                       x_deadline_ms: Optional[str] = Header(None)):
+    # Depois do primeiro evento o status já foi enviado: a recusa (429) tem de vir antes
+    deadline = _request_deadline(x_deadline_ms)
+    MODEL_REGISTRY.resolve("generator", request.model).admission.check()
+    cancel = threading.Event()
+    events = stream_cover_letter(request.resumeText, request.jobDescription, cancel, deadline, request.model)
+    return StreamingResponse(_sse(events, cancel, http_request), media_type="text/event-stream")
+
+@app.post("/generate/resume/stream")
+async def generate_resume_stream_endpoint(request: GenerateResumeRequest, http_request: Request,
+                                          x_deadline_ms: Optional[str] = Header(None)):
+    # O gerador programático vem primeiro (como em /generate/resume): normalmente um único "done",
+    # sem eventos "token"; o modelo só transmite tokens se o programático falhar
+    deadline = _request_deadline(x_deadline_ms)
+    MODEL_REGISTRY.resolve("generator", request.model)
+    cancel = threading.Event()
+    events = stream_optimized_resume(request.resumeText, request.jobDescription, cancel, deadline, request.model)
+    return StreamingResponse(_sse(events, cancel, http_request), media_type="text/event-stream")
+
+# -------------------------
+# Catálogo de vagas: indexado uma vez, cada currículo é ranqueado contra todas as vagas
+# -------------------------
+@app.post("/catalog/jobs")
+def catalog_add_endpoint(request: CatalogAddRequest):
+    # Inclui ou substitui (mesmo id) vagas sem reconstruir o índice
+    job_index.add_many([(job.id, job.description, job.title) for job in request.jobs])
+    return {"indexed": len(request.jobs), "indexSize": job_index.size}
+
+@app.delete("/catalog/jobs/{job_id}")
+def catalog_remove_endpoint(job_id: str):
+    if not job_index.remove(job_id):
+        return JSONResponse(status_code=404, content={"detail": f"vaga '{job_id}' não está no catálogo"})
+    return {"removed": job_id, "indexSize": job_index.size}
+
+@app.get("/stats/catalog")
+def catalog_stats_endpoint():
+    return job_index.stats()
+
+@app.post("/match", response_model=MatchResponse)
+def match_endpoint(request: MatchRequest):
+    matches = job_index.match(request.resumeText, request.topK)
+    return MatchResponse(indexSize=job_index.size, matches=[
+        MatchItem(id=m.id, title=m.title, score=m.score, matchedSkills=m.matched_skills, missingSkills=m.missing_skills)
+        for m in matches])
+
+# -------------------------
+# Jobs assíncronos: a geração roda fora da requisição HTTP (sem timeout de proxy)
+# -------------------------
+def _job_response(job, deduplicated: bool = False) -> JobResponse:
+    return JobResponse(id=job["id"], kind=job["kind"], status=job["status"], deduplicated=deduplicated,
+                       result=job["result"], model=job["model"], error=job["error"], attempts=job["attempts"],
+                       queueSeconds=job["queueSeconds"], runSeconds=job["runSeconds"])
+
+def _job_not_found(job_id: str) -> JSONResponse:
+    return JSONResponse(status_code=404, content={"detail": f"job '{job_id}' não encontrado"})
+
+@app.post("/jobs/{kind}", response_model=JobResponse, status_code=202)
+def submit_job_endpoint(kind: str, request: JobRequest, response: Response):
+    # Mesma entrada (normalizada) e mesmo modelo -> o mesmo job, pendente ou já concluído
+    if kind not in JOB_KINDS:
+        return JSONResponse(status_code=404, content={"detail": f"tipo de job '{kind}' desconhecido",
+                                                      "available": list(JOB_KINDS)})
+    if kind != "summarize" and not request.jobDescription:
+        return JSONResponse(status_code=422, content={"detail": f"jobDescription é obrigatório para '{kind}'"})
+    role = JOB_KINDS[kind][0]
+    if role:
+        MODEL_REGISTRY.resolve(role, request.model)
+    job, deduplicated = job_queue.submit(kind, request.model_dump(),
+                                         job_input_hash(kind, request.resumeText, request.jobDescription, request.model))
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return _job_response(job, deduplicated)
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_endpoint(job_id: str, wait: float = Query(0, ge=0)):
+    # wait > 0: long-poll até o job terminar (limitado por JOB_MAX_WAIT_SECONDS), sem prender thread do pool
+    job = await job_queue.wait_async(job_id, wait) if wait else await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        return _job_not_found(job_id)
+    return _job_response(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events_endpoint(job_id: str, http_request: Request):
+    # SSE: um evento "status" a cada mudança de estado e "done" com o job terminado
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        return _job_not_found(job_id)
+
+    async def events(job):
+        while True:
+            kind = "done" if job["status"] in FINISHED else "status"
+            yield f"event: {kind}\ndata: {_job_response(job).model_dump_json()}\n\n"
+            if kind == "done":
+                break
+            status = job["status"]
+            while job is not None and job["status"] == status:
+                if await http_request.is_disconnected():
+                    return
+                job = await job_queue.wait_async(job_id, 15, status)
+                if job is not None and job["status"] == status:
+                    # Comentário SSE: mantém a conexão viva através de proxies
+                    yield ": keep-alive\n\n"
+            if job is None:
+                return
+
+    return StreamingResponse(events(job), media_type="text/event-stream")
+
+@app.get("/stats/jobs")
+def job_stats_endpoint():
+    # Profundidade por estado e idade do job mais antigo na fila (base para escalar workers)
+    return job_queue.stats()
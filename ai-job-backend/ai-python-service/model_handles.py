@@ -0,0 +1,210 @@
+# model_handles.py - Carregamento preguiçoso / em background dos modelos
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from logger import get_logger
+
+logger = get_logger("models")
+
+# Intervalo de amostragem da RSS durante um carregamento (pico transitório)
+RSS_SAMPLE_INTERVAL_MS = float(os.getenv("RSS_SAMPLE_INTERVAL_MS", "20"))
+
+# Estados possíveis de um handle
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Memória residente atual do processo (Linux; None onde /proc não existe)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssSampler:
+    """Amostra a RSS numa thread enquanto o bloco roda: crescimento estável e pico transitório"""
+
+    def __init__(self, interval_ms: float = RSS_SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.start: Optional[int] = None
+        self.peak: Optional[int] = None
+        self.end: Optional[int] = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def __enter__(self) -> "RssSampler":
+        self.start = self.peak = current_rss_bytes()
+        if self.start is not None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.end = current_rss_bytes()
+        if self.end is not None and self.peak is not None:
+            self.peak = max(self.peak, self.end)
+        return False
+
+    @property
+    def delta(self) -> Optional[int]:
+        """RSS que ficou depois do bloco (estado estável)"""
+        return max(0, self.end - self.start) if self.start is not None and self.end is not None else None
+
+    @property
+    def peak_delta(self) -> Optional[int]:
+        """Maior crescimento durante o bloco (ex.: pesos duplicados na inicialização)"""
+        return max(0, self.peak - self.start) if self.start is not None and self.peak is not None else None
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / 2 ** 20, 1) if value is not None else None
+
+
+class ModelHandle:
+    """Referência a um modelo (pipeline ou tokenizer) carregado sob demanda.
+
+    O ``loader`` só é executado na primeira chamada a ``load()``/``get()``;
+    o resultado (ou a falha) fica memorizado para as próximas chamadas.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._value: Any = None
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        # Crescimento da RSS com o carregamento: o que fica e o pico durante a carga
+        # (aproximados se outra carga roda ao mesmo tempo)
+        self.rss_delta_bytes: Optional[int] = None
+        self.peak_rss_delta_bytes: Optional[int] = None
+        # Chamado após cada carga bem-sucedida (registro de modelos: orçamento de memória)
+        self.on_loaded: Optional[Callable[["ModelHandle"], None]] = None
+        # True depois de unload(): o próximo uso precisa recarregar
+        self.unloaded = False
+        self._async_lock = threading.Lock()
+        self._async_started = False
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    @property
+    def settled(self) -> bool:
+        """True quando o carregamento terminou (com sucesso ou falha)"""
+        return self._done.is_set()
+
+    def load(self) -> Any:
+        """Carrega o modelo (bloqueante). Chamadas concorrentes esperam a mesma carga."""
+        if self._done.is_set():
+            return self._value
+        with self._lock:
+            if self._done.is_set():
+                return self._value
+            self.state = LOADING
+            start = time.perf_counter()
+            with RssSampler() as rss:
+                try:
+                    value = self._loader()
+                except Exception as e:
+                    value = None
+                    self.error = str(e)
+            if value is None and self.error is None:
+                self.error = "carregamento falhou (ver logs)"
+            self.rss_delta_bytes = rss.delta
+            self.peak_rss_delta_bytes = rss.peak_delta
+            self._value = value
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self.state = READY if value is not None else FAILED
+            self.unloaded = False
+            self._done.set()
+            logger.info("Modelo '%s': %s em %ss (RSS +%s MB estável, pico +%s MB)", self.name, self.state,
+                        self.load_seconds, _mb(self.rss_delta_bytes), _mb(self.peak_rss_delta_bytes))
+        if self.on_loaded is not None and self.ready:
+            self.on_loaded(self)
+        return self._value
+
+    def get(self, wait: bool = True) -> Any:
+        """Retorna o modelo; com ``wait=False`` devolve None enquanto não estiver pronto"""
+        if self._done.is_set():
+            return self._value
+        if not wait:
+            return None
+        return self.load()
+
+    def load_async(self) -> None:
+        """Dispara ``load()`` numa thread daemon (uma vez por ciclo de carregamento)"""
+        with self._async_lock:
+            if self._done.is_set() or self._async_started:
+                return
+            self._async_started = True
+        threading.Thread(target=self.load, name=f"model-loader-{self.name}", daemon=True).start()
+
+    def replace(self, loader: Callable[[], Any]) -> None:
+        """Troca o loader e descarta o que já foi carregado (usado pelo benchmark com modelos stub)"""
+        with self._lock:
+            self._loader = loader
+            self._value = None
+            self.state = PENDING
+            self.error = None
+            self.load_seconds = None
+            self.rss_delta_bytes = None
+            self.peak_rss_delta_bytes = None
+            self._done.clear()
+            with self._async_lock:
+                self._async_started = False
+
+    def unload(self) -> None:
+        """Descarta o modelo carregado (evicção); o próximo ``load()`` carrega de novo"""
+        self.replace(self._loader)
+        self.unloaded = True
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """Nome do modelo efetivamente carregado (pode ser o fallback)"""
+        value = self._value
+        if value is None:
+            return None
+        model = getattr(value, "model", None)
+        return getattr(model, "name_or_path", None) or getattr(value, "name_or_path", None)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "model": self.model_name,
+            "loadSeconds": self.load_seconds,
+            "rssDeltaMb": _mb(self.rss_delta_bytes),
+            "peakRssDeltaMb": _mb(self.peak_rss_delta_bytes),
+            "error": self.error,
+        }
+
+
+def load_in_background(handles: List[ModelHandle], on_done: Optional[Callable[[], None]] = None) -> threading.Thread:
+    """Carrega os handles em sequência numa thread daemon, sem bloquear o servidor;
+    ``on_done`` roda na mesma thread depois da última carga (ex.: aquecimento)"""
+    def _run():
+        for handle in handles:
+            handle.load()
+        if on_done is not None:
+            on_done()
+
+    thread = threading.Thread(target=_run, name="model-loader", daemon=True)
+    thread.start()
+    return thread
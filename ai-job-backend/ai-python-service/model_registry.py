@@ -0,0 +1,229 @@
+# model_registry.py - Registro de modelos por papel (sumarizador/gerador) com orçamento de memória
+import contextvars
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from admission import AdmissionController, Deadline
+from batching import MicroBatcher
+from logger import get_logger
+from metrics import REGISTRY
+from model_handles import ModelHandle
+
+logger = get_logger("registry")
+
+# Soma da memória dos modelos carregados; acima disso os menos usados recentemente saem (0 = sem limite)
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+
+
+class UnknownModel(ValueError):
+    """Modelo pedido na requisição não está registrado para o papel"""
+
+    def __init__(self, role: str, name: str, available: List[str]):
+        super().__init__(f"modelo '{name}' não disponível para '{role}' (opções: {', '.join(available)})")
+        self.role = role
+        self.name = name
+        self.available = available
+
+
+def _model_bytes(value: Any) -> Optional[int]:
+    """Tamanho dos pesos (parâmetros + buffers) do pipeline, quando é um modelo torch"""
+    model = getattr(value, "model", None)
+    if model is None or not callable(getattr(model, "parameters", None)):
+        return None
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+
+class ModelEntry:
+    """Um modelo selecionável: handle do pipeline, tokenizer, fila de batching e admissão próprios"""
+
+    def __init__(self, name: str, role: str, task: str, handle: ModelHandle, tokenizer_handle: ModelHandle,
+                 batcher: MicroBatcher, admission: AdmissionController, default: bool = False):
+        self.name = name
+        self.role = role
+        self.task = task
+        self.handle = handle
+        self.tokenizer_handle = tokenizer_handle
+        self.batcher = batcher
+        self.admission = admission
+        self.default = default
+        # Fixado: nunca sai por orçamento. Os padrões respondem ao /readyz e aos pedidos sem
+        # modelo (e no modo workers seus pesos são herdados no fork): descarregá-los só os
+        # faria recarregar de forma síncrona na thread do batcher
+        self.pinned = default
+        self.last_used = 0.0
+        self.in_use = 0
+        self._use_lock = threading.Lock()
+        self.memory_bytes: Optional[int] = None
+        self.evictions = 0
+
+    @property
+    def served_name(self) -> str:
+        """Modelo efetivamente carregado (o padrão do sumarizador pode ter caído no fallback)"""
+        return self.handle.model_name or self.name
+
+    @property
+    def loaded(self) -> bool:
+        return self.handle.ready
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    @contextmanager
+    def admit(self, deadline: Optional[Deadline] = None) -> Iterator[None]:
+        """Admissão no modelo; enquanto em uso ele não é escolhido para evicção"""
+        with self._use_lock:
+            self.in_use += 1
+            self.touch()
+        try:
+            with self.admission.admit(deadline):
+                yield
+        finally:
+            with self._use_lock:
+                self.in_use -= 1
+                self.touch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "role": self.role,
+            "default": self.default,
+            "pinned": self.pinned,
+            "state": self.handle.state,
+            "model": self.served_name,
+            "memoryMb": round(self.memory_bytes / 2 ** 20, 1) if self.memory_bytes is not None else None,
+            "idleSeconds": round(time.monotonic() - self.last_used, 1) if self.last_used else None,
+            "inUse": self.in_use,
+            "evictions": self.evictions,
+        }
+
+
+class ModelRegistry:
+    """Modelos por papel, carregados no primeiro uso e descarregados em ordem LRU.
+
+    Depois de cada carga a memória do modelo (pesos, ou o crescimento da RSS) é
+    somada às dos demais carregados; passando de ``budget_mb``, os menos usados
+    recentemente que não estão em uso são descarregados até caber. Os modelos
+    padrão de cada papel ficam fixados e não entram na conta de quem sai.
+    """
+
+    def __init__(self, budget_mb: float = MODEL_MEMORY_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 2 ** 20)
+        self._entries: Dict[str, ModelEntry] = {}
+        self._defaults: Dict[str, ModelEntry] = {}
+        self._lock = threading.RLock()
+
+    def register(self, entry: ModelEntry) -> ModelEntry:
+        with self._lock:
+            existing = self._entries.get(entry.name)
+            if existing is not None:
+                return existing
+            self._entries[entry.name] = entry
+            if entry.default:
+                self._defaults[entry.role] = entry
+        entry.handle.on_loaded = lambda handle, entry=entry: self._on_loaded(entry)
+        return entry
+
+    def entries(self, role: Optional[str] = None) -> List[ModelEntry]:
+        with self._lock:
+            return [entry for entry in self._entries.values() if role is None or entry.role == role]
+
+    def batchers(self) -> List[MicroBatcher]:
+        return [entry.batcher for entry in self.entries()]
+
+    def default(self, role: str) -> ModelEntry:
+        return self._defaults[role]
+
+    def resolve(self, role: str, name: Optional[str] = None) -> ModelEntry:
+        """Entrada do modelo pedido (pelo nome configurado ou pelo carregado); None = padrão"""
+        if not name:
+            return self.default(role)
+        for entry in self.entries(role):
+            if name in (entry.name, entry.served_name):
+                return entry
+        raise UnknownModel(role, name, [entry.name for entry in self.entries(role)])
+
+    # -------------------------
+    # Orçamento de memória
+    # -------------------------
+    def _on_loaded(self, entry: ModelEntry):
+        entry.memory_bytes = _model_bytes(entry.handle.get(wait=False)) or entry.handle.rss_delta_bytes
+        entry.touch()
+        logger.info("Modelo '%s' carregado (%s MB)", entry.name, entry.stats()["memoryMb"])
+        self._enforce_budget(keep=entry)
+
+    def resident_bytes(self) -> int:
+        return sum(entry.memory_bytes or 0 for entry in self.entries() if entry.loaded)
+
+    def _enforce_budget(self, keep: Optional[ModelEntry] = None):
+        if self.budget_bytes <= 0:
+            return
+        with self._lock:
+            candidates = sorted((entry for entry in self.entries()
+                                 if entry.loaded and entry is not keep and not entry.pinned),
+                                key=lambda entry: entry.last_used)
+            for entry in candidates:
+                if self.resident_bytes() <= self.budget_bytes:
+                    return
+                # Sob o lock de uso: nenhuma admissão entra entre a checagem e o descarregamento
+                with entry._use_lock:
+                    # Em uso ou com itens na fila: evictar agora só faria recarregar em seguida
+                    if entry.in_use or entry.batcher.queue_depth:
+                        continue
+                    self.evict(entry)
+            if self.resident_bytes() > self.budget_bytes:
+                logger.warning("Orçamento de memória excedido (%.0f MB carregados, limite %.0f MB)",
+                               self.resident_bytes() / 2 ** 20, self.budget_bytes / 2 ** 20)
+
+    def evict(self, entry: ModelEntry):
+        logger.info("Descarregando '%s' (LRU, orçamento de memória)", entry.name)
+        entry.handle.unload()
+        # Com carregamento enxuto o tokenizer é o do pipeline descartado: sai junto
+        entry.tokenizer_handle.unload()
+        entry.evictions += 1
+        MODEL_EVICTIONS.inc(model=entry.name)
+        gc.collect()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budgetMb": round(self.budget_bytes / 2 ** 20, 1) if self.budget_bytes else None,
+            "residentMb": round(self.resident_bytes() / 2 ** 20, 1),
+            "models": {entry.name: entry.stats() for entry in self.entries()},
+        }
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+MODEL_EVICTIONS = REGISTRY.counter("ai_model_evictions_total", "Modelos descarregados pelo orçamento de memória", ["model"])
+REGISTRY.gauge("ai_model_memory_bytes", "Memória estimada de cada modelo carregado", ["model"],
+               lambda: {(entry.name,): entry.memory_bytes for entry in MODEL_REGISTRY.entries() if entry.loaded})
+
+# -------------------------
+# Seleção por requisição
+# -------------------------
+_selected_models: contextvars.ContextVar = contextvars.ContextVar("selected_models", default=None)
+
+
+@contextmanager
+def model_scope(**names: Optional[str]) -> Iterator[Dict[str, ModelEntry]]:
+    """Modelos pedidos pela requisição (papel=nome) visíveis para os serviços; nome inválido -> UnknownModel"""
+    selected = {role: MODEL_REGISTRY.resolve(role, name) for role, name in names.items() if name}
+    token = _selected_models.set(selected)
+    try:
+        yield selected
+    finally:
+        _selected_models.reset(token)
+
+
+def selected_model(role: str) -> ModelEntry:
+    """Modelo do papel para a requisição atual (o padrão fora de um ``model_scope``)"""
+    selected = _selected_models.get()
+    if selected and role in selected:
+        return selected[role]
+    return MODEL_REGISTRY.default(role)
@@ -1,27 +1,38 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, List, Optional, Tuple
 
+# model: nome de um modelo registrado (SUMMARIZER_MODELS/GENERATOR_MODELS); vazio = padrão
+# partial: a geração foi cortada pelo orçamento de latência (X-Latency-Budget-Ms)
+# reusedSimilarity: resultado de uma entrada quase idêntica (Jaccard estimado); None = calculado para esta
 class SummarizeRequest(BaseModel):
     resumeText: str
+    model: Optional[str] = None
 
 class SummarizeResponse(BaseModel):
     summary: str
+    model: Optional[str] = None
+    partial: bool = False
+    reusedSimilarity: Optional[float] = None
 
 class GenerateResumeRequest(BaseModel):
     resumeText: str
     jobDescription: str
+    model: Optional[str] = None
 
 class GenerateResumeResponse(BaseModel):
     optimizedResumeMarkdown: str
     model: str
+    partial: bool = False
 
 class CoverLetterRequest(BaseModel):
     resumeText: str
     jobDescription: str
+    model: Optional[str] = None
 
 class CoverLetterResponse(BaseModel):
     coverLetterMarkdown: str
     model: str
+    partial: bool = False
 
 class SimulateInterviewRequest(BaseModel):
     resumeText: str
@@ -34,3 +45,120 @@ class QAItem(BaseModel):
 class SimulateInterviewResponse(BaseModel):
     qa: List[QAItem]
     model: str
+    reusedSimilarity: Optional[float] = None
+
+# -------------------------
+# Lote: um currículo x várias vagas, ou várias vagas x um currículo
+# -------------------------
+class BatchRequest(BaseModel):
+    resumeText: Optional[str] = None
+    jobDescriptions: List[str] = []
+    jobDescription: Optional[str] = None
+    resumeTexts: List[str] = []
+    model: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_one_shared_side(self):
+        one_resume = self.resumeText is not None and bool(self.jobDescriptions) and not self.resumeTexts
+        one_job = self.jobDescription is not None and bool(self.resumeTexts) and not self.jobDescriptions
+        if one_resume == one_job:
+            raise ValueError("envie resumeText + jobDescriptions ou jobDescription + resumeTexts")
+        return self
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        if self.resumeText is not None:
+            return [(self.resumeText, job) for job in self.jobDescriptions]
+        return [(resume, self.jobDescription) for resume in self.resumeTexts]
+
+class BatchGenerateResumeItem(BaseModel):
+    index: int
+    optimizedResumeMarkdown: Optional[str] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchCoverLetterItem(BaseModel):
+    index: int
+    coverLetterMarkdown: Optional[str] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchSimulateInterviewItem(BaseModel):
+    index: int
+    qa: Optional[List[QAItem]] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
+
+# -------------------------
+# Candidatura completa: os quatro artefatos numa requisição só
+# -------------------------
+class ApplicationRequest(BaseModel):
+    resumeText: str
+    jobDescription: str
+    summarizerModel: Optional[str] = None
+    generatorModel: Optional[str] = None
+
+class ApplicationPart(BaseModel):
+    # model, programmatic, passthrough, ou fallback/deadline/error quando caiu no fallback
+    status: str
+    fallback: bool
+    model: str
+    ms: float
+
+class ApplicationResponse(BaseModel):
+    summary: str
+    optimizedResumeMarkdown: str
+    coverLetterMarkdown: str
+    qa: List[QAItem]
+    model: str
+    parts: Dict[str, ApplicationPart]
+    prepareMs: float
+    totalMs: float
+
+# -------------------------
+# Catálogo de vagas e matching currículo x catálogo
+# -------------------------
+class CatalogJob(BaseModel):
+    id: str
+    description: str
+    title: Optional[str] = None
+
+class CatalogAddRequest(BaseModel):
+    jobs: List[CatalogJob]
+
+class MatchRequest(BaseModel):
+    resumeText: str
+    topK: int = Field(10, ge=1, le=1000)
+
+class MatchItem(BaseModel):
+    id: str
+    title: Optional[str] = None
+    score: float
+    matchedSkills: List[str]
+    missingSkills: List[str]
+
+class MatchResponse(BaseModel):
+    matches: List[MatchItem]
+    indexSize: int
+
+# -------------------------
+# Jobs assíncronos: POST /jobs/{kind} devolve o id, GET /jobs/{id} o estado e o resultado
+# -------------------------
+class JobRequest(BaseModel):
+    resumeText: str
+    # Obrigatório para resume, cover e interview; ignorado em summarize
+    jobDescription: Optional[str] = None
+    model: Optional[str] = None
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    # queued, running, done ou failed
+    status: str
+    deduplicated: bool = False
+    # summarize/resume/cover: texto; interview: lista de perguntas e respostas
+    result: Optional[Any] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int
+    queueSeconds: float
+    runSeconds: Optional[float] = None
@@ -0,0 +1,231 @@
+# near_duplicates.py - Índice MinHash/LSH para reaproveitar resultados de currículos quase idênticos
+import contextvars
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from metrics import REGISTRY
+from result_cache import normalize_text
+
+# Sem acerto no cache exato, /summarize serve o resultado de um currículo parecido
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "1") == "1"
+# Similaridade de Jaccard estimada mínima entre os shingles para reaproveitar
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+# Funções de hash da assinatura e bandas do LSH (NUM_PERM divisível por BANDS).
+# 128/16 (8 linhas por banda): pares com Jaccard 0.9 viram candidatos com ~99.99% de chance
+NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "128"))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+# Palavras por shingle (os shingles não cruzam linhas: reordenar bullets não muda o conjunto)
+NEAR_DUP_SHINGLE_SIZE = int(os.getenv("NEAR_DUP_SHINGLE_SIZE", "3"))
+# Textos curtos demais dão estimativas ruidosas: ficam só com o cache exato
+NEAR_DUP_MIN_SHINGLES = int(os.getenv("NEAR_DUP_MIN_SHINGLES", "20"))
+# Limite de memória: entradas mais antigas saem primeiro (e todas após o TTL)
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "10000"))
+NEAR_DUP_TTL_SECONDS = float(os.getenv("NEAR_DUP_TTL_SECONDS", "86400"))
+
+# Só endpoints com modelo: os programáticos (entrevista, currículo) são baratos de refazer
+NEAR_DUP_ENDPOINTS = ("summarize",)
+
+# Primo de Mersenne 2^31-1: a*x + b cabe em uint64 com a, x < 2^31
+_PRIME = (1 << 31) - 1
+_TOKEN_RE = re.compile(r"[^\w+#]+")
+
+
+def _normalized_lines(text: Optional[str]) -> List[List[str]]:
+    """Palavras por linha (NFKC, minúsculas), sem pontuação nem marcadores de bullet"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", text).lower()
+    lines = []
+    for line in text.splitlines():
+        words = _TOKEN_RE.sub(" ", line).split()
+        if words:
+            lines.append(words)
+    return lines
+
+
+def shingles(resume_text: str, size: int = NEAR_DUP_SHINGLE_SIZE) -> Set[int]:
+    """Conjunto de shingles (hash crc32) do currículo; a vaga entra exata no namespace"""
+    hashed: Set[int] = set()
+    for words in _normalized_lines(resume_text):
+        if len(words) <= size:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+        for gram in grams:
+            hashed.add(zlib.crc32(gram.encode("utf-8")))
+    return hashed
+
+
+class MinHasher:
+    """Assinatura MinHash com hashes universais (a*x + b) mod p, vetorizada em numpy"""
+
+    def __init__(self, num_perm: int = NEAR_DUP_NUM_PERM, seed: int = 1):
+        # Semente fixa: a mesma entrada tem a mesma assinatura em qualquer processo
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, hashed: Set[int]) -> np.ndarray:
+        x = np.fromiter(hashed, dtype=np.uint64, count=len(hashed)) % np.uint64(_PRIME)
+        return ((self.a * x + self.b) % np.uint64(_PRIME)).min(axis=1).astype(np.uint32)
+
+
+class NearMatch(NamedTuple):
+    value: Any
+    similarity: float
+
+
+class _Entry(NamedTuple):
+    namespace: str
+    signature: np.ndarray
+    value: Any
+    created: float
+
+
+class NearDuplicateIndex:
+    """LSH por bandas sobre assinaturas MinHash, com o resultado guardado junto.
+
+    ``namespace`` separa endpoint, modelo, parâmetros e a vaga (hash exato): só
+    reaproveita resultados da mesma configuração e da mesma vaga. Candidatos das bandas são confirmados pela
+    fração de posições iguais da assinatura (estimativa do Jaccard).
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, num_perm: int = NEAR_DUP_NUM_PERM,
+                 bands: int = NEAR_DUP_BANDS, max_entries: int = NEAR_DUP_MAX_ENTRIES,
+                 ttl_seconds: float = NEAR_DUP_TTL_SECONDS):
+        if num_perm % bands:
+            raise ValueError(f"NEAR_DUP_NUM_PERM ({num_perm}) precisa ser divisível por NEAR_DUP_BANDS ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, bytes], Set[int]] = {}
+        self._next_id = 0
+        self.lookups = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def _signature(self, resume_text: str) -> Optional[np.ndarray]:
+        hashed = shingles(resume_text)
+        if len(hashed) < NEAR_DUP_MIN_SHINGLES:
+            return None
+        return self.hasher.signature(hashed)
+
+    def _band_keys(self, namespace: str, signature: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        return [(namespace, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def lookup(self, namespace: str, resume_text: str) -> Optional[NearMatch]:
+        """Resultado guardado da entrada mais parecida acima do limiar, ou None"""
+        signature = self._signature(resume_text)
+        with self._lock:
+            self.lookups += 1
+            if signature is None:
+                return None
+            self._expire()
+            candidates: Set[int] = set()
+            for key in self._band_keys(namespace, signature):
+                candidates |= self._buckets.get(key, set())
+            best: Optional[NearMatch] = None
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                similarity = float(np.mean(entry.signature == signature))
+                if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                    best = NearMatch(entry.value, round(similarity, 4))
+            if best is not None:
+                self.reuses += 1
+            return best
+
+    def add(self, namespace: str, resume_text: str, value: Any):
+        signature = self._signature(resume_text)
+        if signature is None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(namespace, signature, value, time.time())
+            for key in self._band_keys(namespace, signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        while self._entries and next(iter(self._entries.values())).created < cutoff:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, entry = self._entries.popitem(last=False)
+        for key in self._band_keys(entry.namespace, entry.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+        self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": NEAR_DUP_ENABLED,
+                "threshold": self.threshold,
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "buckets": len(self._buckets),
+                "lookups": self.lookups,
+                "reuses": self.reuses,
+                "evictions": self.evictions,
+            }
+
+
+near_duplicates = NearDuplicateIndex()
+
+
+def near_namespace(endpoint: str, model_name: str, params: Dict[str, Any],
+                   job_description: Optional[str] = None) -> str:
+    # Vaga diferente = resultado diferente: entra exata (normalizada), não pela similaridade
+    payload = f"{endpoint}\x00{model_name}\x00{sorted(params.items())}\x00{normalize_text(job_description)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# -------------------------
+# Similaridade do resultado reaproveitado, para os metadados da resposta
+# -------------------------
+_current_report: contextvars.ContextVar = contextvars.ContextVar("near_duplicate_report", default=None)
+
+
+@contextmanager
+def near_duplicate_report() -> Iterator[Dict[str, float]]:
+    """Recebe ``similarity`` quando a requisição foi servida por uma entrada quase idêntica"""
+    report: Dict[str, float] = {}
+    token = _current_report.set(report)
+    try:
+        yield report
+    finally:
+        _current_report.reset(token)
+
+
+def record_reuse(endpoint: str, match: Optional[NearMatch]):
+    NEAR_DUP_LOOKUPS.inc(endpoint=endpoint, outcome="reused" if match else "missed")
+    report = _current_report.get()
+    if match is not None and report is not None:
+        report["similarity"] = match.similarity
+
+
+NEAR_DUP_LOOKUPS = REGISTRY.counter("ai_near_duplicate_lookups_total",
+                                    "Consultas ao índice de quase duplicatas (reused ou missed)",
+                                    ["endpoint", "outcome"])
@@ -0,0 +1,279 @@
+# profiling.py - cProfile sob demanda por requisição (header ou amostragem), salvo em .pstats
+import asyncio
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from logger import get_logger
+from metrics import REGISTRY
+
+logger = get_logger("profiling")
+
+# Desligado, a rota padrão do FastAPI é usada: nenhum custo por requisição
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+# Fração das requisições perfiladas sem pedir (0 = só com o header)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# O header X-Profile precisa trazer este valor (e as rotas /admin/profiles, X-Profile-Token).
+# Vazio: só a amostragem funciona e as rotas de administração não são registradas
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "profiles"))
+# Os perfis mais antigos saem quando o diretório passa do limite
+PROFILE_DIR_MAX_MB = float(os.getenv("PROFILE_DIR_MAX_MB", "200"))
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+# Rotas nunca amostradas (sondas, métricas e a própria administração); com o header, qualquer uma
+PROFILE_SAMPLE_SKIP = ("/healthz", "/readyz", "/metrics", "/stats", "/admin")
+
+_PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+
+class ProfileSession:
+    """Perfis de uma requisição: o trecho no event loop (validação, serialização) e o da thread do handler"""
+
+    def __init__(self, trigger: str):
+        self.id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.trigger = trigger
+        self.profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self.profilers.append(profiler)
+
+
+_current_session: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+# O profiler do event loop é global na thread: um por vez (os demais perfilam só a thread do handler)
+_loop_profiler_busy = False
+
+
+def _trigger(request: Request) -> Optional[str]:
+    value = request.headers.get(PROFILE_HEADER)
+    if value:
+        return "header" if token_valid(value) else None
+    if PROFILE_SAMPLE_RATE > 0 and not request.url.path.startswith(PROFILE_SAMPLE_SKIP) \
+            and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+def _profiled_call(call: Callable) -> Callable:
+    """Handler síncrono (roda no threadpool) perfilado na própria thread quando a requisição pediu"""
+    def run(*args, **kwargs):
+        session: Optional[ProfileSession] = _current_session.get()
+        if session is None:
+            return call(*args, **kwargs)
+        with session.profile():
+            return call(*args, **kwargs)
+    return run
+
+
+class ProfiledRoute(APIRoute):
+    """Rota que perfila a requisição inteira (validação, handler, serialização) quando disparada.
+
+    O trecho no event loop pode incluir corrotinas de outras requisições que rodaram
+    no meio; a espera pelo modelo aparece como tempo em ``MicroBatcher.submit``.
+    Em respostas em streaming só a criação do gerador entra no perfil.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = _profiled_call(self.dependant.call)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def profiled_handler(request: Request) -> Response:
+            global _loop_profiler_busy
+            trigger = _trigger(request)
+            if trigger is None:
+                return await handler(request)
+            session = ProfileSession(trigger)
+            token = _current_session.set(session)
+            owns_loop_profiler = not _loop_profiler_busy
+            start = time.perf_counter()
+            try:
+                if owns_loop_profiler:
+                    _loop_profiler_busy = True
+                    try:
+                        with session.profile():
+                            response = await handler(request)
+                    finally:
+                        _loop_profiler_busy = False
+                else:
+                    response = await handler(request)
+            finally:
+                _current_session.reset(token)
+            metadata = {"id": session.id, "method": request.method, "path": request.url.path, "route": route,
+                        "status": response.status_code, "trigger": trigger,
+                        "durationMs": round((time.perf_counter() - start) * 1000, 1), "created": time.time()}
+            try:
+                await run_in_threadpool(save_profile, session, metadata)
+                response.headers["X-Profile-Id"] = session.id
+            except Exception as e:
+                logger.error("Falha ao salvar o perfil %s: %s", session.id, e)
+            return response
+
+        return profiled_handler
+
+
+def install_profiling(app) -> bool:
+    """Liga o perfilamento nas rotas declaradas depois desta chamada (antes dos decorators)"""
+    if not PROFILING_ENABLED:
+        return False
+    app.router.route_class = ProfiledRoute
+    if PROFILING_TOKEN:
+        app.include_router(admin_router)
+    else:
+        logger.warning("PROFILING_TOKEN vazio: header %s e rotas /admin/profiles desligados, só amostragem",
+                       PROFILE_HEADER)
+    logger.info("Perfilamento ligado: header %s, amostragem %.3f, diretório %s", PROFILE_HEADER,
+                PROFILE_SAMPLE_RATE, PROFILE_DIR)
+    return True
+
+
+# -------------------------
+# Armazenamento (.pstats + .json com os metadados) com limite de tamanho
+# -------------------------
+_store_lock = threading.Lock()
+
+
+def save_profile(session: ProfileSession, metadata: Dict[str, Any]):
+    if not session.profilers:
+        return
+    with _store_lock:
+        _write_profile(session, metadata)
+
+
+def _write_profile(session: ProfileSession, metadata: Dict[str, Any]):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats = pstats.Stats(session.profilers[0])
+    for profiler in session.profilers[1:]:
+        stats.add(profiler)
+    path = os.path.join(PROFILE_DIR, session.id + ".pstats")
+    stats.dump_stats(path)
+    metadata["sizeBytes"] = os.path.getsize(path)
+    with open(os.path.join(PROFILE_DIR, session.id + ".json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    PROFILES.inc(trigger=metadata["trigger"])
+    logger.info("Perfil %s salvo: %s %s em %.1f ms", session.id, metadata["method"], metadata["path"],
+                metadata["durationMs"])
+    _enforce_size_cap()
+
+
+def _enforce_size_cap():
+    """Remove perfis inteiros (.pstats e .json), do mais antigo para o mais novo, até caber no limite"""
+    sizes: Dict[str, int] = {}
+    for name in os.listdir(PROFILE_DIR):
+        profile_id = name.rsplit(".", 1)[0]
+        sizes[profile_id] = sizes.get(profile_id, 0) + os.path.getsize(os.path.join(PROFILE_DIR, name))
+    total = sum(sizes.values())
+    limit = PROFILE_DIR_MAX_MB * 2 ** 20
+    # O id começa pelo timestamp em ms: ordem de id = ordem de criação
+    for profile_id in sorted(sizes):
+        if total <= limit:
+            break
+        for extension in (".pstats", ".json"):
+            path = os.path.join(PROFILE_DIR, profile_id + extension)
+            if os.path.exists(path):
+                os.remove(path)
+        total -= sizes[profile_id]
+
+
+def token_valid(token: Optional[str]) -> bool:
+    # Sem token configurado nada é aceito
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Metadados dos perfis guardados, do mais recente para o mais antigo"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda profile: profile["created"], reverse=True)
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Caminho do .pstats (ids validados: nada fora do PROFILE_DIR)"""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ".pstats")
+    return path if os.path.exists(path) else None
+
+
+def profile_text(path: str, sort: str = "cumulative", limit: int = 60) -> str:
+    """Resumo legível do perfil (como ``python -m pstats``), sem precisar baixar o arquivo"""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# -------------------------
+# Rotas de administração (só registradas por install_profiling com PROFILING_TOKEN)
+# -------------------------
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "ncalls", "filename", "name")
+
+admin_router = APIRouter()
+
+
+@admin_router.get("/admin/profiles")
+def list_profiles_endpoint(x_profile_token: Optional[str] = Header(None)):
+    if not token_valid(x_profile_token):
+        return JSONResponse(status_code=403, content={"detail": f"{PROFILE_TOKEN_HEADER} inválido"})
+    return {"profiles": list_profiles()}
+
+
+@admin_router.get("/admin/profiles/{profile_id}")
+def download_profile_endpoint(profile_id: str, format: str = Query("pstats", pattern="^(pstats|text)$"),
+                              sort: str = Query("cumulative"), limit: int = Query(60, ge=1, le=1000),
+                              x_profile_token: Optional[str] = Header(None)):
+    # pstats: arquivo para snakeviz/gprof2dot/python -m pstats; text: as funções mais caras
+    if not token_valid(x_profile_token):
+        return JSONResponse(status_code=403, content={"detail": f"{PROFILE_TOKEN_HEADER} inválido"})
+    path = profile_path(profile_id)
+    if path is None:
+        return JSONResponse(status_code=404, content={"detail": f"perfil '{profile_id}' não encontrado"})
+    if format == "text":
+        if sort not in PROFILE_SORT_KEYS:
+            return JSONResponse(status_code=422, content={"detail": f"sort deve ser um de: {', '.join(PROFILE_SORT_KEYS)}"})
+        return PlainTextResponse(profile_text(path, sort, limit))
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
+
+
+PROFILES = REGISTRY.counter("ai_profiles_total", "Requisições perfiladas por gatilho (header ou amostragem)",
+                            ["trigger"])
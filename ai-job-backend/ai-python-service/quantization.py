@@ -0,0 +1,124 @@
+# quantization.py - Modo de inferência quantizado (int8 dinâmico / bf16) para CPU
+import difflib
+import io
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from logger import get_logger
+
+logger = get_logger("quantization")
+
+# fp32 (padrão), int8 (quantização dinâmica das camadas Linear) ou bf16; por modelo com <MODELO>_PRECISION
+# (ex.: GOOGLE_FLAN_T5_LARGE_PRECISION=int8)
+INFERENCE_PRECISION = os.getenv("INFERENCE_PRECISION", "fp32").lower()
+# int8+bf16 não existe: os kernels int8 dinâmicos só aceitam ativações fp32, e converter o
+# modelo quantizado para bf16 quebra as camadas Linear quantizadas
+PRECISIONS = ("fp32", "int8", "bf16")
+# Compara a saída quantizada com a fp32 numa amostra fixa antes de descartar o modelo fp32
+QUANTIZATION_CHECK = os.getenv("QUANTIZATION_CHECK", "0") == "1"
+
+# Amostras fixas do check de acurácia, por tarefa
+CHECK_SAMPLES = {
+    "summarization": (
+        "Engenheira de Machine Learning com 6 anos de experiência em Python, PyTorch e AWS. "
+        "Construiu pipelines de dados e APIs para servir modelos de NLP em produção. "
+        "Liderou a migração de serviços para Kubernetes, reduzindo custos de infraestrutura. "
+        "Formada em Ciência da Computação, com certificação AWS Solutions Architect."
+    ),
+    "text2text-generation": (
+        "Escreva uma carta de apresentação profissional para Ana Souza com 6 anos de experiência "
+        "em Python, PyTorch e AWS."
+    ),
+}
+_OUTPUT_KEYS = {"summarization": "summary_text", "text2text-generation": "generated_text"}
+
+# model_name -> relatório (tamanho antes/depois, check de acurácia)
+QUANTIZATION_REPORTS: Dict[str, Dict[str, Any]] = {}
+
+
+def model_size_mb(model) -> float:
+    """Tamanho serializado do state_dict (conta os pesos int8 empacotados, que não são parameters)"""
+    import torch
+
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return round(buffer.tell() / (1024 * 1024), 1)
+
+
+def cpu_supports_bf16() -> bool:
+    import torch
+
+    check = getattr(torch.cpu, "_is_avx512_bf16_supported", None)
+    if check is not None:
+        try:
+            if check():
+                return True
+        except Exception:
+            pass
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+    except OSError:
+        return False
+
+
+def _run_sample(pipe, task: str) -> Dict[str, Any]:
+    sample = CHECK_SAMPLES.get(task)
+    start = time.perf_counter()
+    # Greedy para que fp32 e quantizado sejam comparáveis
+    output = pipe(sample, do_sample=False)[0][_OUTPUT_KEYS[task]]
+    return {"text": output, "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+def _convert(model, precision: str):
+    import torch
+
+    if precision == "int8":
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if cpu_supports_bf16():
+        return model.to(torch.bfloat16)
+    logger.warning("CPU sem suporte a bf16, mantendo fp32")
+    return model
+
+
+def model_precision(model_name: str, default: Optional[str] = None) -> str:
+    """Precisão do modelo: <MODELO>_PRECISION, senão a do papel (``default``), senão INFERENCE_PRECISION"""
+    override = os.getenv(re.sub(r"[^0-9A-Za-z]+", "_", model_name).strip("_").upper() + "_PRECISION")
+    precision = (override or default or INFERENCE_PRECISION).lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"precisão '{precision}' inválida para {model_name} (opções: {', '.join(PRECISIONS)})")
+    return precision
+
+
+def apply_precision(pipe, task: str, model_name: str, precision: Optional[str] = None):
+    """Converte o modelo do pipeline para a precisão pedida e registra o relatório"""
+    precision = model_precision(model_name, precision)
+    if precision == "fp32" or pipe is None:
+        return pipe
+
+    report: Dict[str, Any] = {"precision": precision, "sizeMbBefore": model_size_mb(pipe.model)}
+    baseline = _run_sample(pipe, task) if QUANTIZATION_CHECK and task in CHECK_SAMPLES else None
+
+    pipe.model = _convert(pipe.model, precision)
+    pipe.model.eval()
+    report["sizeMbAfter"] = model_size_mb(pipe.model)
+
+    if baseline is not None:
+        quantized = _run_sample(pipe, task)
+        report["check"] = {
+            "similarity": round(difflib.SequenceMatcher(None, baseline["text"], quantized["text"]).ratio(), 3),
+            "fp32Ms": baseline["ms"],
+            "quantizedMs": quantized["ms"],
+            "speedup": round(baseline["ms"] / quantized["ms"], 2) if quantized["ms"] else None,
+            "fp32Output": baseline["text"],
+            "quantizedOutput": quantized["text"],
+        }
+
+    QUANTIZATION_REPORTS[model_name] = report
+    check = report.get("check") or {}
+    logger.info("%s em %s: %s MB -> %s MB%s", model_name, precision, report["sizeMbBefore"], report["sizeMbAfter"],
+                f" | similaridade {check['similarity']}, speedup {check['speedup']}x" if check else "")
+    return pipe
@@ -0,0 +1,236 @@
+# result_cache.py - Cache de resultados endereçado por conteúdo (LRU em memória + SQLite opcional)
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+# Caminho do arquivo SQLite; vazio desliga a camada em disco
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", "")
+RESULT_CACHE_DB_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_DB_MAX_ENTRIES", "100000"))
+# Com do_sample=True guardamos até N variantes e passamos a rodiziá-las; 0 = não cachear modos amostrados
+RESULT_CACHE_SAMPLED_VARIANTS = int(os.getenv("RESULT_CACHE_SAMPLED_VARIANTS", "3"))
+
+# Valores do header Cache-Control que controlam o bypass por requisição
+NO_CACHE = "no-cache"   # ignora a leitura, mas atualiza a entrada
+NO_STORE = "no-store"   # não lê nem grava
+
+# Muda quando o formato do valor guardado muda (entradas antigas deixam de casar)
+CACHE_FORMAT_VERSION = 2
+
+_WS_RE = re.compile(r"[ \t\f\v]+")
+_TABLE_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Normaliza quebras de linha e espaços para que reenvios triviais gerem a mesma chave"""
+    if not text:
+        return ""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(_WS_RE.sub(" ", line).strip() for line in lines).strip()
+
+
+def cache_key(endpoint: str, resume_text: str, job_description: Optional[str],
+              model_name: Optional[str], params: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        [CACHE_FORMAT_VERSION, endpoint, normalize_text(resume_text), normalize_text(job_description),
+         model_name or "", params],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _SQLiteTier:
+    """Camada em disco: sobrevive a reinícios do serviço.
+
+    Cada cache usa a própria tabela no mesmo arquivo: o limite de entradas e a
+    evicção de um não apagam as entradas do outro.
+    """
+
+    def __init__(self, path: str, max_entries: int, table: str = "results"):
+        if not _TABLE_RE.match(table):
+            raise ValueError(f"nome de tabela inválido: {table!r}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY, variants TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[float, List[Any]]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT variants, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return row[1], json.loads(row[0])
+
+    def put(self, key: str, created: float, variants: List[Any]):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, variants, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(variants, ensure_ascii=False), created, time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self, ttl_seconds: float) -> int:
+        """Remove entradas expiradas e as menos acessadas acima do limite"""
+        with self._lock:
+            removed = self._conn.execute(f"DELETE FROM {self.table} WHERE created < ?",
+                                         (time.time() - ttl_seconds,)).rowcount
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if count > self.max_entries:
+                removed += self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class ResultCache:
+    """Cache de duas camadas para os resultados dos endpoints.
+
+    Cada entrada guarda uma lista de variantes. Para modos determinísticos basta
+    uma; para modos com amostragem (``sampled=True``) a entrada só vira hit
+    depois de acumular ``sampled_variants`` saídas, servidas em rodízio.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+                 db_path: str = RESULT_CACHE_DB, db_max_entries: int = RESULT_CACHE_DB_MAX_ENTRIES,
+                 sampled_variants: int = RESULT_CACHE_SAMPLED_VARIANTS, db_table: str = "results"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sampled_variants = sampled_variants
+        self._memory: "OrderedDict[str, Tuple[float, List[Any]]]" = OrderedDict()
+        self._rotation: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._disk = _SQLiteTier(db_path, db_max_entries, db_table) if db_path else None
+        self._puts = 0
+        self.stats_counters = {"hits": 0, "diskHits": 0, "misses": 0, "bypasses": 0, "evictions": 0}
+
+    def _count(self, name: str, n: int = 1):
+        self.stats_counters[name] += n
+
+    def _expired(self, created: float) -> bool:
+        return time.time() - created > self.ttl_seconds
+
+    def _lookup(self, key: str) -> Optional[List[Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry[0]):
+                    del self._memory[key]
+                    self._count("evictions")
+                else:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+        if self._disk is None:
+            return None
+        entry = self._disk.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry[0]):
+            self._disk.delete(key)
+            return None
+        with self._lock:
+            self._count("diskHits")
+            self._store_memory(key, entry[0], entry[1])
+        return entry[1]
+
+    def _store_memory(self, key: str, created: float, variants: List[Any]):
+        self._memory[key] = (created, variants)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            old_key, _ = self._memory.popitem(last=False)
+            self._rotation.pop(old_key, None)
+            self._count("evictions")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], sampled: bool = False,
+                       cache_control: Optional[str] = None,
+                       store_if: Optional[Callable[[], bool]] = None) -> Tuple[Any, str]:
+        """Devolve (resultado, status) onde status é HIT, MISS ou BYPASS.
+
+        ``store_if`` é consultado depois do cálculo: False (ex.: resposta degradada
+        por deadline) devolve o resultado sem gravá-lo.
+        """
+        directive = (cache_control or "").lower()
+        if NO_STORE in directive or (sampled and self.sampled_variants <= 0):
+            with self._lock:
+                self._count("bypasses")
+            return compute(), "BYPASS"
+
+        wanted = self.sampled_variants if sampled else 1
+        variants = None if NO_CACHE in directive else self._lookup(key)
+        if variants is not None and len(variants) >= wanted:
+            with self._lock:
+                self._count("hits")
+                index = self._rotation.get(key, 0)
+                self._rotation[key] = index + 1
+            return variants[index % len(variants)], "HIT"
+
+        with self._lock:
+            self._count("bypasses" if NO_CACHE in directive else "misses")
+        result = compute()
+        if store_if is not None and not store_if():
+            return result, "BYPASS"
+        self._store(key, result, variants if variants is not None and NO_CACHE not in directive else [])
+        return result, "BYPASS" if NO_CACHE in directive else "MISS"
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """Consulta direta (modo determinístico), para quem calcula os misses em lote"""
+        variants = self._lookup(key)
+        with self._lock:
+            self._count("hits" if variants else "misses")
+        return variants[0] if variants else None
+
+    def store(self, key: str, result: Any):
+        self._store(key, result, [])
+
+    def _store(self, key: str, result: Any, previous: List[Any]):
+        variants = previous + [result]
+        created = time.time()
+        with self._lock:
+            self._store_memory(key, created, variants)
+            self._puts += 1
+            run_disk_eviction = self._disk is not None and self._puts % 100 == 0
+        if self._disk is not None:
+            self._disk.put(key, created, variants)
+            if run_disk_eviction:
+                removed = self._disk.evict(self.ttl_seconds)
+                with self._lock:
+                    self._count("evictions", removed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.stats_counters)
+            counters["memoryEntries"] = len(self._memory)
+        counters["diskEntries"] = len(self._disk) if self._disk is not None else None
+        lookups = counters["hits"] + counters["misses"]
+        counters["hitRate"] = round(counters["hits"] / lookups, 4) if lookups else None
+        return counters
@@ -0,0 +1,176 @@
+# resume_parser.py - Parser de passada única do currículo, compartilhado por todos os extratores
+import os
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+from metrics import stage_timer
+from tech_taxonomy import TAXONOMY
+
+# Quantos currículos parseados manter em memória (reuso entre endpoints para o mesmo texto)
+RESUME_PARSE_CACHE_SIZE = int(os.getenv("RESUME_PARSE_CACHE_SIZE", "256"))
+
+# Lista canônica derivada da taxonomia (mantida para compatibilidade)
+KNOWN_TECH = TAXONOMY.names
+
+# -------------------------
+# Regexes pré-compiladas
+# -------------------------
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[\.\?\!])\s+')
+ROLE_PATTERNS = ("desenvolvedor", "desenvolvedora", "analista", "engenheiro", "cientista", "gerente", "coordenador")
+ROLES_RE = re.compile(r'\b(' + '|'.join(ROLE_PATTERNS) + r')\b', re.IGNORECASE)
+YEARS_RE = re.compile(r'(\d+)\s*(anos|anos de|year|years)', re.IGNORECASE)
+EXPERIENCE_LINE_RE = re.compile(r'20\d{2}[–\-−]\s*(presente|20\d{2})\s*:')
+EDUCATION_RE = re.compile(r'(bacharel|graduação|universidade|faculdade)[^0-9]*(\d{4})', re.IGNORECASE)
+EDUCATION_WORDS = ('universidade', 'faculdade', 'bacharel', 'graduação')
+KEY_SENTENCE_RE = re.compile(r'experiência|desenvolvedor|engenheiro|analista|especialista|foco', re.IGNORECASE)
+
+# Títulos de seção reconhecidos (linha curta que começa com uma destas palavras)
+SECTION_HEADING_RE = re.compile(
+    r'^(?:#+\s*)?(?P<name>resumo|sobre|experi[eê]ncia|projetos?|forma[cç][aã]o|educa[cç][aã]o'
+    r'|habilidades|compet[eê]ncias|certifica[cç][oõ]es|idiomas)\b', re.IGNORECASE)
+_SECTION_KEYS = {
+    "resumo": "resumo", "sobre": "resumo", "experiencia": "experiencia", "experiência": "experiencia",
+    "projeto": "projetos", "projetos": "projetos", "formacao": "formacao", "formação": "formacao",
+    "educacao": "formacao", "educação": "formacao", "habilidades": "habilidades",
+    "competencias": "habilidades", "competências": "habilidades", "certificacoes": "certificacoes",
+    "certificações": "certificacoes", "idiomas": "idiomas",
+}
+MAX_HEADING_LENGTH = 60
+
+
+def split_sentences(text: str) -> List[str]:
+    return [seg.strip() for seg in SENTENCE_SPLIT_RE.split(text) if seg.strip()]
+
+
+def extract_techs(text: str) -> List[str]:
+    return TAXONOMY.extract(text)
+
+
+class ParsedResume:
+    """Resultado imutável do parse de um currículo.
+
+    Construído por ``parse_resume`` numa única passada pelas linhas do texto;
+    todos os extratores, o gerador programático, a carta, a entrevista e o
+    resumo de fallback leem daqui em vez de reprocessar o texto.
+    """
+
+    __slots__ = (
+        "text", "lower", "lines", "name", "techs", "tech_matches", "roles", "years", "experience_lines",
+        "projects", "education", "certifications", "sentences", "key_sentences", "sections",
+    )
+
+    def __init__(self, **fields):
+        for slot in self.__slots__:
+            object.__setattr__(self, slot, fields[slot])
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ParsedResume é imutável")
+
+    def __delattr__(self, key):
+        raise AttributeError("ParsedResume é imutável")
+
+    def __repr__(self) -> str:
+        return f"ParsedResume(name={self.name!r}, techs={list(self.techs)!r}, sections={list(self.sections)!r})"
+
+    def section_text(self, name: str) -> str:
+        """Trecho do texto original correspondente à seção (vazio se ausente)"""
+        span = self.sections.get(name)
+        return self.text[span[0]:span[1]] if span else ""
+
+
+def _section_key(line: str) -> Optional[str]:
+    if len(line) > MAX_HEADING_LENGTH or line.startswith('- '):
+        return None
+    match = SECTION_HEADING_RE.match(line)
+    if not match:
+        return None
+    return _SECTION_KEYS.get(match.group("name").lower())
+
+
+@lru_cache(maxsize=RESUME_PARSE_CACHE_SIZE)
+def parse_resume(text: str) -> ParsedResume:
+    """Tokeniza o currículo em linhas e seções numa só passada (resultado memorizado por texto)"""
+    with stage_timer("parse"):
+        return _parse_resume(text)
+
+
+def _parse_resume(text: str) -> ParsedResume:
+    lower = text.lower()
+
+    lines: List[str] = []
+    experience_lines: List[str] = []
+    projects: List[str] = []
+    certifications: List[str] = []
+    education_line: Optional[str] = None
+    # seção -> (offset inicial, offset final) em caracteres no texto original
+    sections: Dict[str, Tuple[int, int]] = {}
+    current_section: Optional[str] = None
+    current_start = 0
+
+    in_projects_section = False
+    in_cert_section = False
+    offset = 0
+    for raw_line in text.split('\n'):
+        line_start = offset
+        offset += len(raw_line) + 1
+        line = raw_line.strip()
+        line_lower = line.lower()
+        if line:
+            lines.append(line)
+
+        section = _section_key(line) if line else None
+        if section:
+            if current_section and current_section not in sections:
+                sections[current_section] = (current_start, line_start)
+            current_section, current_start = section, line_start
+
+        if EXPERIENCE_LINE_RE.search(line):
+            experience_lines.append(line)
+
+        if education_line is None and any(word in line_lower for word in EDUCATION_WORDS):
+            education_line = line
+
+        # Projetos: itens "- Nome: descrição" após "Projetos Relevantes"
+        if 'projeto' in line_lower and 'relevante' in line_lower:
+            in_projects_section = True
+        elif in_projects_section and line.startswith('- ') and ':' in line:
+            projects.append(line[2:])
+        elif in_projects_section and (line.startswith('Formação') or line.startswith('Habilidades')):
+            in_projects_section = False
+
+        # Certificações: itens "- " logo após o título, até a primeira linha que não é item
+        if 'certificaç' in line_lower:
+            in_cert_section = True
+        elif in_cert_section and line.startswith('- '):
+            certifications.append(line[2:])
+        elif in_cert_section and line:
+            in_cert_section = False
+
+    if current_section and current_section not in sections:
+        sections[current_section] = (current_start, len(text))
+
+    years_match = YEARS_RE.search(text)
+    education_match = EDUCATION_RE.search(text)
+    sentences = split_sentences(text)
+    found_roles = {m.group(1).lower() for m in ROLES_RE.finditer(text)}
+    tech_matches = TAXONOMY.find(text)
+
+    return ParsedResume(
+        text=text,
+        lower=lower,
+        lines=tuple(lines),
+        name=lines[0] if lines else "Profissional",
+        techs=tuple(TAXONOMY.canonical(tech_matches)),
+        tech_matches=tuple(tech_matches),
+        roles=tuple(role for role in ROLE_PATTERNS if role in found_roles),
+        years=f"{years_match.group(1)} anos" if years_match else None,
+        experience_lines=tuple(experience_lines),
+        projects=tuple(projects[:3]),
+        education=education_match.group(0).strip() if education_match else education_line,
+        certifications=tuple(certifications),
+        sentences=tuple(sentences),
+        key_sentences=tuple(s for s in sentences if KEY_SENTENCE_RE.search(s)),
+        sections=MappingProxyType(sections),
+    )
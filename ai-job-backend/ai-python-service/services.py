@@ -3,8 +3,34 @@ from dotenv import load_dotenv
 import os
 import json
 import re
-from typing import List, Dict, Optional
-from transformers import pipeline, AutoTokenizer
+import contextvars
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from functools import lru_cache, partial
+from typing import Any, Iterator, List, Dict, NamedTuple, Optional, Tuple
+import threading
+import time
+from model_handles import FAILED, ModelHandle, current_rss_bytes, load_in_background
+from admission import (Deadline, DeadlineExceeded, Overloaded, admission_controller, current_deadline,
+                       deadline_scope)
+from batching import MicroBatcher, pipeline_runner, wait_result
+from job_queue import RetryLater
+from decoding import DecodingPlan, current_budget, decoding_params, plan_decoding, record_plan, throughput
+from near_duplicates import NEAR_DUP_ENABLED, NEAR_DUP_ENDPOINTS, near_duplicates, near_namespace, record_reuse
+from result_cache import NO_CACHE, NO_STORE, ResultCache, cache_key
+from streaming import stream_generate, stream_stats
+from summarization import SUMMARY_LONG_MODE, chunk_cache, map_reduce_summary
+from tokenization import TokenizedInput, count_tokens, token_cache_stats, truncate_tokens
+from workers import WorkerPool
+from warmup import apply_thread_profile, run_warmup, skip_warmup, warmup_report
+from quantization import INFERENCE_PRECISION, QUANTIZATION_REPORTS, apply_precision, model_precision
+from resume_parser import ParsedResume, extract_techs, parse_resume, split_sentences
+from tech_taxonomy import TAXONOMY
+from logger import get_logger
+from model_registry import MODEL_REGISTRY, ModelEntry, model_scope, selected_model
+from metrics import METRICS_ENABLED, REGISTRY, STAGE_SECONDS, record_outcome, record_tokens, stage_timer
+
+logger = get_logger("services")
 
 # -------------------------
 # Config / ambiente
@@ -14,7 +40,7 @@ HF_API_KEY = os.getenv("HF_API_KEY")
 if HF_API_KEY:
     os.environ["HUGGINGFACE_HUB_TOKEN"] = HF_API_KEY
 else:
-    print("Aviso: HF_API_KEY não encontrado no .env — modelos privados/gated podem falhar.")
+    logger.warning("HF_API_KEY não encontrado no .env — modelos privados/gated podem falhar.")
 
 # -------------------------
 # Modelos e pipelines otimizados para evitar problemas de token
@@ -23,237 +49,511 @@ LED_MODEL = os.getenv("LED_MODEL", "allenai/led-base-16384")
 SUM_MODEL_FALLBACK = os.getenv("SUM_MODEL_FALLBACK", "facebook/bart-large-cnn")
 FLAN_MODEL = os.getenv("FLAN_MODEL", "google/flan-t5-large")
 
-def safe_pipeline(task: str, model_name: str, device: int = -1, **kwargs):
+# background: carrega na inicialização sem bloquear o servidor (fallback programático enquanto isso)
+# lazy: carrega no primeiro uso, bloqueando essa requisição
+# eager: carrega tudo antes de aceitar conexões (comportamento antigo)
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background").lower()
+# Handles que precisam carregar para o /readyz responder 200 (ex.: "generator,generator_tokenizer").
+# Vazio: só fica fora do ar quando todos falharam (o fallback programático sozinho não é "pronto")
+READY_REQUIRED_MODELS = {name.strip() for name in os.getenv("READY_REQUIRED_MODELS", "").split(",") if name.strip()}
+
+# Carregamento enxuto: tokenizer vem do próprio pipeline (sem segunda cópia) e os pesos são
+# montados direto do arquivo safetensors mapeado em memória (low_cpu_mem_usage), sem o pico
+# de inicializar o modelo aleatório e depois copiar os pesos por cima
+LEAN_MODEL_LOADING = os.getenv("LEAN_MODEL_LOADING", "0") == "1"
+
+# Precisão de inferência por papel (fp32, int8, bf16); padrão INFERENCE_PRECISION, <MODELO>_PRECISION tem prioridade
+SUMMARIZER_PRECISION = os.getenv("SUMMARIZER_PRECISION", INFERENCE_PRECISION)
+GENERATOR_PRECISION = os.getenv("GENERATOR_PRECISION", INFERENCE_PRECISION)
+
+# Perfil de decodificação (decoding.py) que vira o padrão de cada pipeline; cada endpoint
+# passa o seu próprio perfil em toda chamada, ajustado ao orçamento de latência
+TASK_PROFILES = {"summarization": "summarize", "text2text-generation": "cover"}
+
+def safe_pipeline(task: str, model_name: str, device: int = -1, precision: Optional[str] = None, **kwargs):
     try:
+        # Precisão inválida falha antes de baixar/carregar os pesos
+        precision = model_precision(model_name, precision)
+        # Import tardio: transformers/torch só são carregados quando algum modelo é pedido
+        from transformers import pipeline
+
         # Configurações para evitar problemas de token
-        if task == "summarization":
-            kwargs.update({
-                "max_length": 150,
-                "min_length": 50,
-                "do_sample": False,
-                "truncation": True
-            })
-        elif task == "text2text-generation":
-            kwargs.update({
-                "max_length": 512,
-                "do_sample": True,
-                "temperature": 0.7,
-                "truncation": True
-            })
+        kwargs.update(decoding_params(TASK_PROFILES[task]) if task in TASK_PROFILES else {})
+        kwargs.setdefault("truncation", True)
         
-        return pipeline(task, model=model_name, device=device, **kwargs)
+        if LEAN_MODEL_LOADING:
+            pipe = _lean_pipeline(pipeline, task, model_name, device, kwargs)
+        else:
+            pipe = pipeline(task, model=model_name, device=device, **kwargs)
+        # Opcional: int8 dinâmico / bf16 (INFERENCE_PRECISION ou <MODELO>_PRECISION)
+        return apply_precision(pipe, task, model_name, precision)
     except Exception as e:
-        print(f"[safe_pipeline] Falha ao carregar {model_name}: {e}")
+        logger.error("Falha ao carregar %s: %s", model_name, e)
         return None
 
+def _lean_pipeline(pipeline, task: str, model_name: str, device: int, kwargs: Dict):
+    """Pipeline com os pesos lidos do safetensors via mmap, sem o modelo aleatório intermediário"""
+    model_kwargs = {"low_cpu_mem_usage": True, "use_safetensors": True}
+    try:
+        return pipeline(task, model=model_name, device=device, model_kwargs=model_kwargs, **kwargs)
+    except (OSError, EnvironmentError) as e:
+        # Repositório só com pytorch_model.bin: ainda evita a cópia dupla com low_cpu_mem_usage
+        logger.info("%s sem safetensors (%s), carregando .bin com low_cpu_mem_usage", model_name, e)
+        model_kwargs["use_safetensors"] = False
+        return pipeline(task, model=model_name, device=device, model_kwargs=model_kwargs, **kwargs)
+
+def _pipeline_tokenizer(handle: ModelHandle):
+    """Loader que devolve o tokenizer do pipeline do handle (o mesmo modelo que foi carregado)"""
+    def load():
+        pipe = handle.load()
+        return getattr(pipe, "tokenizer", None) if pipe is not None else None
+    return load
+
 def safe_tokenizer(model_name: str):
     """Carrega tokenizer com configurações seguras"""
     try:
+        from transformers import AutoTokenizer
+
         tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
         return tokenizer
     except Exception as e:
-        print(f"[safe_tokenizer] Falha ao carregar tokenizer {model_name}: {e}")
+        logger.error("Falha ao carregar tokenizer %s: %s", model_name, e)
         return None
 
 def truncate_text(text: str, tokenizer, max_tokens: int = 400) -> str:
     """Trunca texto para não exceder limite de tokens"""
-    if not tokenizer:
-        # Fallback: truncar por caracteres (aproximadamente 4 chars = 1 token)
-        max_chars = max_tokens * 4
-        return text[:max_chars] if len(text) > max_chars else text
-    
+    return truncate_prompt(text, tokenizer, max_tokens).text
+
+def truncate_prompt(text: str, tokenizer, max_tokens: int = 400) -> TokenizedInput:
+    """Trunca e já devolve os input_ids para o modelo (uma única tokenização)"""
+    with stage_timer("truncate"):
+        try:
+            return truncate_tokens(text, tokenizer, max_tokens)
+        except Exception as e:
+            logger.error("Erro no truncamento: %s", e)
+            # Fallback por caracteres (razão calibrada com os tokenizers reais)
+            return truncate_tokens(text, None, max_tokens)
+
+# -------------------------
+# Handles de modelos (carregados sob demanda ou em background)
+# -------------------------
+def _load_summarizer():
+    summarizer = safe_pipeline("summarization", LED_MODEL, precision=SUMMARIZER_PRECISION)
+    if not summarizer:
+        logger.info("LED model falhou, tentando BART...")
+        summarizer = safe_pipeline("summarization", SUM_MODEL_FALLBACK, precision=SUMMARIZER_PRECISION)
+    return summarizer
+
+def _load_summ_tokenizer():
+    return safe_tokenizer(LED_MODEL) or safe_tokenizer(SUM_MODEL_FALLBACK)
+
+summarizer_handle = ModelHandle("summarizer", _load_summarizer)
+# Mesmo modelo FLAN para currículo e carta de apresentação
+generator_handle = ModelHandle("generator", lambda: safe_pipeline("text2text-generation", FLAN_MODEL,
+                                                                 precision=GENERATOR_PRECISION))
+if LEAN_MODEL_LOADING:
+    # Se o LED falhar, o tokenizer acompanha o BART que de fato foi carregado
+    summ_tokenizer_handle = ModelHandle("summarizer_tokenizer", _pipeline_tokenizer(summarizer_handle))
+    generation_tokenizer_handle = ModelHandle("generator_tokenizer", _pipeline_tokenizer(generator_handle))
+else:
+    summ_tokenizer_handle = ModelHandle("summarizer_tokenizer", _load_summ_tokenizer)
+    generation_tokenizer_handle = ModelHandle("generator_tokenizer", lambda: safe_tokenizer(FLAN_MODEL))
+
+MODEL_HANDLES = [summarizer_handle, summ_tokenizer_handle, generator_handle, generation_tokenizer_handle]
+
+# Filas de micro-batching: requisições concorrentes viram um único forward por modelo
+summarizer_batcher = MicroBatcher("summarizer", pipeline_runner(
+    summarizer_handle.get, "summary_text", decoding_params("summarize")))
+generator_batcher = MicroBatcher("generator", pipeline_runner(
+    generator_handle.get, "generated_text", decoding_params("cover")))
+
+# Filas dos modelos padrão (as que o pool de processos assume)
+BATCHERS = [summarizer_batcher, generator_batcher]
+
+# Admissão por modelo: concorrência limitada + fila finita (429/503) e desvio por deadline
+summarizer_admission = admission_controller("summarizer")
+generator_admission = admission_controller("generator")
+
+# -------------------------
+# Registro de modelos: o padrão de cada papel + alternativos escolhidos por requisição
+# -------------------------
+# Modelos extras (separados por vírgula) que a requisição pode pedir pelo nome, para A/B
+SUMMARIZER_MODELS = [name.strip() for name in os.getenv("SUMMARIZER_MODELS", "").split(",") if name.strip()]
+GENERATOR_MODELS = [name.strip() for name in os.getenv("GENERATOR_MODELS", "").split(",") if name.strip()]
+
+ROLE_TASKS = {"summarizer": "summarization", "generator": "text2text-generation"}
+ROLE_OUTPUT_KEYS = {"summarizer": "summary_text", "generator": "generated_text"}
+ROLE_PRECISIONS = {"summarizer": SUMMARIZER_PRECISION, "generator": GENERATOR_PRECISION}
+
+def _extra_model_entry(role: str, model_name: str) -> ModelEntry:
+    """Modelo alternativo: só é carregado quando alguma requisição o pede"""
+    task = ROLE_TASKS[role]
+    handle = ModelHandle(model_name, lambda: safe_pipeline(task, model_name, precision=ROLE_PRECISIONS[role]))
+    tokenizer_loader = _pipeline_tokenizer(handle) if LEAN_MODEL_LOADING else lambda: safe_tokenizer(model_name)
+    tokenizer_handle = ModelHandle(f"{model_name}:tokenizer", tokenizer_loader)
+    batcher = MicroBatcher(f"{role}:{model_name}", pipeline_runner(
+        handle.get, ROLE_OUTPUT_KEYS[role], decoding_params(TASK_PROFILES[task])))
+    return ModelEntry(model_name, role, task, handle, tokenizer_handle, batcher, admission_controller(batcher.name))
+
+MODEL_REGISTRY.register(ModelEntry(LED_MODEL, "summarizer", "summarization", summarizer_handle,
+                                   summ_tokenizer_handle, summarizer_batcher, summarizer_admission, default=True))
+MODEL_REGISTRY.register(ModelEntry(FLAN_MODEL, "generator", "text2text-generation", generator_handle,
+                                   generation_tokenizer_handle, generator_batcher, generator_admission, default=True))
+for _role, _names in (("summarizer", SUMMARIZER_MODELS), ("generator", GENERATOR_MODELS)):
+    for _name in _names:
+        MODEL_REGISTRY.register(_extra_model_entry(_role, _name))
+
+class Served(NamedTuple):
+    """Resultado de um serviço, como foi obtido (model, programmatic, passthrough,
+    fallback, deadline ou error) e o modelo que o produziu ("programmatic" sem modelo)"""
+    result: Any
+    outcome: str
+    model: str
+
+def _served(entry: Optional[ModelEntry], result: Any, outcome: str) -> Served:
+    return Served(result, outcome, entry.served_name if entry is not None and outcome == "model" else "programmatic")
+
+def _deadline_fallback(operation: str, error: DeadlineExceeded) -> None:
+    """Marca a requisição como degradada (não entra no cache) antes de usar o fallback"""
+    logger.info("%s: %s, usando fallback programático", operation, error)
+    record_outcome(operation, "deadline")
+    for deadline in (current_deadline(), current_budget()):
+        if deadline is not None:
+            deadline.degraded = True
+
+def _generation_limit() -> Optional[Deadline]:
+    """O prazo que vence primeiro entre o deadline (descarta) e o orçamento de latência (aceita parcial)"""
+    limits = [limit for limit in (current_deadline(), current_budget()) if limit is not None]
+    return min(limits, key=lambda limit: limit.at) if limits else None
+
+def _settle_budget(profile: str, plan: DecodingPlan, limit: Optional[Deadline]) -> bool:
+    """Registra o plano; True se a geração foi cortada pelo orçamento de latência.
+    Plano reduzido ou saída cortada não entram no cache."""
+    budget = current_budget()
+    cut = budget is not None and budget is limit and budget.expired
+    record_plan(profile, plan, cut)
+    if budget is not None and (cut or plan.kind != "full"):
+        budget.degraded = True
+    return cut
+
+def _mark_partial(cut: bool) -> None:
+    """A resposta usa uma saída cortada no prazo (sinalizada ao cliente)"""
+    budget = current_budget()
+    if cut and budget is not None:
+        budget.partial = True
+
+def _generate(entry: ModelEntry, profile: str, prompt, tokenizer) -> Tuple[str, bool]:
+    """Uma geração na fila do modelo com o perfil do endpoint, ajustado ao orçamento de latência.
+
+    Devolve (texto, cortada pelo orçamento). O tempo de cada geração alimenta a
+    estimativa de tokens/s do modelo.
+    """
+    plan = plan_decoding(profile, entry.served_name, current_budget())
+    limit = _generation_limit()
+    start = time.perf_counter()
+    result = entry.batcher.submit(prompt, deadline=limit, **plan.params)[ROLE_OUTPUT_KEYS[entry.role]]
+    if tokenizer is not None:
+        throughput(entry.served_name).observe(count_tokens(result or "", tokenizer), time.perf_counter() - start)
+    _record_model_tokens(entry.handle, prompt, result, tokenizer)
+    return result, _settle_budget(profile, plan, limit)
+
+def batching_stats() -> Dict[str, Dict]:
+    return {batcher.name: batcher.stats() for batcher in MODEL_REGISTRY.batchers()}
+
+REGISTRY.gauge("ai_batch_queue_depth", "Itens esperando na fila de micro-batching", ["model"],
+               lambda: {(batcher.name,): batcher.queue_depth for batcher in MODEL_REGISTRY.batchers()})
+REGISTRY.gauge("ai_model_ready", "1 quando o modelo terminou de carregar com sucesso", ["model"],
+               lambda: {(handle.name,): int(handle.ready) for handle in MODEL_HANDLES})
+
+def _record_model_tokens(handle: ModelHandle, prompt, output: str, tokenizer) -> None:
+    """Tokens de entrada (ids já calculados no truncamento) e de saída do modelo"""
+    if not METRICS_ENABLED or tokenizer is None:
+        return
+    if isinstance(prompt, TokenizedInput):
+        input_tokens = len(prompt.input_ids) or count_tokens(prompt.text, tokenizer)
+    else:
+        input_tokens = count_tokens(prompt, tokenizer)
+    record_tokens(handle.model_name or handle.name, input_tokens, count_tokens(output or "", tokenizer))
+
+# -------------------------
+# Cache de resultados dos endpoints
+# -------------------------
+result_cache = ResultCache()
+
+# endpoint -> papel do modelo usado (o escolhido na requisição); None = puramente programático.
+# /generate/resume usa sempre o gerador programático primeiro, então é determinístico.
+CACHE_PROFILES = {
+    "summarize": "summarizer",
+    "resume": None,
+    "cover": "generator",
+    "interview": None,
+}
+
+def served_precision(model_name: str) -> str:
+    """Precisão em que o modelo está servindo (fp32 se não foi quantizado)"""
+    return QUANTIZATION_REPORTS.get(model_name, {}).get("precision", "fp32")
+
+def cached_result(endpoint: str, resume_text: str, job_description: Optional[str], compute,
+                  cache_control: Optional[str] = None):
+    """Executa ``compute`` (que devolve um ``Served``) passando pelo cache.
+
+    Devolve (resultado, modelo que o produziu, status HIT/MISS/BYPASS/NEAR).
+    NEAR: sem acerto exato, veio de uma entrada quase idêntica (``near_duplicate_report``).
+    """
+    role = CACHE_PROFILES[endpoint]
+    entry = selected_model(role) if role else None
+    # Enquanto o modelo não está pronto a resposta vem do fallback programático:
+    # a chave muda quando o modelo fica pronto, para não servir o fallback para sempre
+    if entry is not None and entry.loaded:
+        model_name = entry.served_name
+        # Saídas int8/bf16 diferem das fp32: a precisão também entra na chave
+        params = {**decoding_params(endpoint), "precision": served_precision(model_name)}
+    else:
+        model_name, params = "programmatic", {}
+    key = cache_key(endpoint, resume_text, job_description, model_name, params)
+    # Um HIT serve também quem tem orçamento apertado; saída reduzida ou parcial não é gravada
+    deadline, budget = current_deadline(), current_budget()
+    degraded = lambda: any(limit is not None and limit.degraded for limit in (deadline, budget))
+    # no-cache/no-store pedem o cálculo: quase duplicatas também ficam de fora
+    near = NEAR_DUP_ENABLED and endpoint in NEAR_DUP_ENDPOINTS and \
+        not any(directive in (cache_control or "").lower() for directive in (NO_CACHE, NO_STORE))
+    namespace = near_namespace(endpoint, model_name, params, job_description) if near else ""
+    reused = []
+    def compute_entry():
+        if near:
+            match = near_duplicates.lookup(namespace, resume_text)
+            record_reuse(endpoint, match)
+            if match is not None:
+                reused.append(match)
+                return match.value
+        # O cache guarda [resultado, modelo]: um HIT informa quem produziu a resposta original
+        served = compute()
+        value = [served.result, served.model]
+        if near and not degraded():
+            near_duplicates.add(namespace, resume_text, value)
+        return value
+
+    # Reaproveitado não é gravado sob a chave exata: edições sucessivas não se afastam do original
+    (result, model), status = result_cache.get_or_compute(
+        key, compute_entry, sampled=bool(params.get("do_sample")), cache_control=cache_control,
+        store_if=lambda: not reused and not degraded())
+    return result, model, "NEAR" if reused else status
+
+# -------------------------
+# Jobs assíncronos (POST /jobs/{kind}): mesmos serviços e mesmo cache dos endpoints síncronos
+# -------------------------
+# kind -> (papel do modelo selecionável, serviço)
+JOB_KINDS = {
+    "summarize": ("summarizer", lambda resume_text, job_description: summarize_resume_served(resume_text)),
+    "resume": ("generator", lambda resume_text, job_description: generate_optimized_resume_served(resume_text, job_description)),
+    "cover": ("generator", lambda resume_text, job_description: generate_cover_letter_served(resume_text, job_description)),
+    "interview": (None, lambda resume_text, job_description: simulate_interview_served(resume_text, job_description)),
+}
+
+def job_input_hash(kind: str, resume_text: str, job_description: Optional[str], model: Optional[str]) -> str:
+    """Jobs com a mesma entrada normalizada (e o mesmo modelo pedido) são o mesmo job"""
+    return cache_key(f"job:{kind}", resume_text, "" if kind == "summarize" else job_description, model, {})
+
+def run_job(kind: str, payload: Dict[str, Any]) -> Tuple[Any, str]:
+    """Executa um job da fila; devolve (resultado, modelo que o produziu)"""
+    role, compute = JOB_KINDS[kind]
+    resume_text, job_description = payload["resumeText"], payload.get("jobDescription") or ""
     try:
-        # Tokenizar e truncar
-        tokens = tokenizer.encode(text, truncation=True, max_length=max_tokens)
-        return tokenizer.decode(tokens, skip_special_tokens=True)
-    except Exception as e:
-        print(f"[truncate_text] Erro: {e}")
-        # Fallback por caracteres
-        max_chars = max_tokens * 4
-        return text[:max_chars] if len(text) > max_chars else text
+        with model_scope(**({role: payload.get("model")} if role else {})):
+            result, model, _ = cached_result(kind, resume_text, "" if kind == "summarize" else job_description,
+                                             lambda: compute(resume_text, job_description))
+    except Overloaded as e:
+        # Rejeição da admissão é passageira: o job volta para a fila em vez de falhar
+        raise RetryLater(str(e), e.retry_after) from e
+    except DeadlineExceeded as e:
+        raise RetryLater(str(e)) from e
+    return result, model
+
+# -------------------------
+# Pool de processos de inferência (WORKER_PROCESSES > 0)
+# -------------------------
+worker_pool = WorkerPool()
+
+def _start_worker_pool() -> None:
+    """Carrega os modelos no processo da API e faz o fork dos workers, que herdam os pesos"""
+    for handle in MODEL_HANDLES:
+        handle.load()
+    # Aquecido antes do fork: os workers herdam alocações, caches de tokenizer e inicializações preguiçosas
+    _warm_up_models()
+    models = [handle.get() for handle in (summarizer_handle, generator_handle) if handle.ready]
+    runners = {batcher.name: batcher.runner for batcher in BATCHERS}
+    worker_pool.start(runners, models)
+    for batcher in BATCHERS:
+        batcher.set_runner(worker_pool.runner(batcher.name), max_in_flight=worker_pool.processes)
 
-# Carregamento seguro de modelos
-print("[INFO] Carregando modelos com configurações seguras...")
+def _warm_up_models() -> None:
+    """Entradas sintéticas em cada modelo carregado, com o perfil de decodificação da sua tarefa"""
+    run_warmup(MODEL_REGISTRY.entries(), lambda entry: decoding_params(TASK_PROFILES[entry.task]))
 
-# Modelo para sumarização com fallback
-summarizer_long = safe_pipeline("summarization", LED_MODEL)
-if not summarizer_long:
-    print("[INFO] LED model falhou, tentando BART...")
-    summarizer_long = safe_pipeline("summarization", SUM_MODEL_FALLBACK)
+def start_model_loading() -> None:
+    """Dispara o carregamento conforme MODEL_LOAD_MODE (chamado no startup da API)"""
+    if not worker_pool.enabled:
+        # Com workers cada processo recebe o seu orçamento de threads (WORKER_THREADS)
+        warmup_report.thread_profile = apply_thread_profile()
+    if worker_pool.enabled:
+        # O fork precisa acontecer com os pesos já carregados, então o modo vira eager
+        _start_worker_pool()
+    elif MODEL_LOAD_MODE == "eager":
+        for handle in MODEL_HANDLES:
+            handle.load()
+        _warm_up_models()
+    elif MODEL_LOAD_MODE == "background" and LEAN_MODEL_LOADING:
+        # Tokenizers saem junto com os pipelines: modelos primeiro
+        load_in_background([summarizer_handle, summ_tokenizer_handle, generator_handle, generation_tokenizer_handle],
+                           on_done=_warm_up_models)
+    elif MODEL_LOAD_MODE == "background":
+        # Tokenizers primeiro: são leves e liberam o truncamento cedo
+        load_in_background([summ_tokenizer_handle, generation_tokenizer_handle,
+                            summarizer_handle, generator_handle], on_done=_warm_up_models)
+    else:
+        skip_warmup(f"MODEL_LOAD_MODE={MODEL_LOAD_MODE} carrega no primeiro uso")
+    mode = f"workers ({worker_pool.processes} processos)" if worker_pool.enabled else MODEL_LOAD_MODE
+    logger.info("Carregamento de modelos: modo '%s'", mode)
+
+def _model(handle: ModelHandle):
+    """Modelo pronto para uso, ou None. Em modo background nunca bloqueia a requisição."""
+    if MODEL_LOAD_MODE != "background":
+        return handle.get()
+    value = handle.get(wait=False)
+    if value is None and handle.unloaded:
+        # Descarregado pelo orçamento de memória: recarrega em background (fallback até lá)
+        handle.load_async()
+    return value
+
+def _entry_model(entry: ModelEntry):
+    """Pipeline do modelo escolhido; um alternativo pedido explicitamente carrega no primeiro uso"""
+    return _model(entry.handle) if entry.default else entry.handle.get()
+
+def _entry_tokenizer(entry: ModelEntry):
+    return _model(entry.tokenizer_handle) if entry.default else entry.tokenizer_handle.get()
 
-# Tokenizer para sumarização
-summ_tokenizer = safe_tokenizer(LED_MODEL)
-if not summ_tokenizer:
-    summ_tokenizer = safe_tokenizer(SUM_MODEL_FALLBACK)
+def models_status() -> Dict[str, Dict]:
+    return {handle.name: handle.status() for handle in MODEL_HANDLES}
 
-# Modelos T5/FLAN com configuração segura
-resume_generator = safe_pipeline("text2text-generation", FLAN_MODEL)
-resume_tokenizer = safe_tokenizer(FLAN_MODEL) if resume_generator else None
+def readiness() -> Tuple[bool, List[str]]:
+    """(pronto, handles que falharam e tiram o serviço do ar).
 
-cover_letter_generator = resume_generator  # Reutilizar o mesmo modelo
-generation_tokenizer = resume_tokenizer
+    Só a carga de inicialização (background/eager) segura o tráfego; no modo lazy e
+    depois de uma evicção o handle fica pendente até o próximo uso, sem afetar o /readyz.
+    """
+    if MODEL_LOAD_MODE != "lazy" or worker_pool.enabled:
+        starting = any(not handle.settled and not handle.unloaded for handle in MODEL_HANDLES)
+        if starting or not warmup_report.finished:
+            return False, []
+    failed = [handle.name for handle in MODEL_HANDLES if handle.state == FAILED]
+    if len(failed) == len(MODEL_HANDLES):
+        return False, failed
+    blocking = [name for name in failed if name in READY_REQUIRED_MODELS]
+    return not blocking, blocking
 
-print(f"[INFO] Modelos carregados:")
-print(f"  - Summarizer: {'✓' if summarizer_long else '✗'}")
-print(f"  - Resume Generator: {'✓' if resume_generator else '✗'}")
-print(f"  - Tokenizers: {'✓' if summ_tokenizer else '✗'}")
+def memory_report() -> Dict[str, Any]:
+    """RSS do processo e, por modelo, o que o carregamento deixou residente e o pico durante a carga"""
+    handles = MODEL_HANDLES + [handle for entry in MODEL_REGISTRY.entries() if not entry.default
+                               for handle in (entry.handle, entry.tokenizer_handle)]
+    rss = current_rss_bytes()
+    return {
+        "leanLoading": LEAN_MODEL_LOADING,
+        "processRssMb": round(rss / 2 ** 20, 1) if rss is not None else None,
+        "models": {handle.name: {key: handle.status()[key] for key in ("state", "model", "rssDeltaMb", "peakRssDeltaMb")}
+                   for handle in handles},
+    }
 
 # -------------------------
 # Helpers de NLP (mantidos)
 # -------------------------
-KNOWN_TECH = [
-    "Python", "JavaScript", "TypeScript", "C#", "Node.js", "React", "Next.js", "Vue.js",
-    "TensorFlow", "PyTorch", "LangChain", "Hugging Face", "AWS", "S3", "DynamoDB", "Docker",
-    "Kubernetes", "SQL", "Postgres", "MongoDB", "Redis", "GraphQL", "FastAPI", "Django",
-    "Flask", "Angular", "Vue", "Svelte", "Go", "Rust", "Java", "Kotlin", "Swift"
-]
-
+# Os extratores leem do ParsedResume memorizado: o texto é percorrido uma única vez
 def _sentences(text: str) -> List[str]:
-    s = re.split(r'(?<=[\.\?\!])\s+', text)
-    return [seg.strip() for seg in s if seg.strip()]
+    return split_sentences(text)
 
 def _extract_techs(text: str) -> List[str]:
-    txt = text.lower()
-    found_techs = []
-    for tech in KNOWN_TECH:
-        if tech.lower() in txt:
-            found_techs.append(tech)
-    return found_techs
+    return extract_techs(text)
 
 def _extract_roles(text: str) -> List[str]:
-    patterns = ["desenvolvedor", "desenvolvedora", "analista", "engenheiro", "cientista", "gerente", "coordenador"]
-    return [p for p in patterns if re.search(r'\b' + re.escape(p) + r'\b', text, flags=re.IGNORECASE)]
+    return list(parse_resume(text).roles)
 
 def _extract_projects(text: str) -> List[str]:
-    projects = []
-    lines = text.split('\n')
-    
-    in_projects_section = False
-    for line in lines:
-        line = line.strip()
-        if 'projeto' in line.lower() and 'relevante' in line.lower():
-            in_projects_section = True
-            continue
-        elif in_projects_section and line.startswith('- ') and ':' in line:
-            projects.append(line[2:])
-        elif in_projects_section and (line.startswith('Formação') or line.startswith('Habilidades')):
-            in_projects_section = False
-    
-    return projects[:3]
+    return list(parse_resume(text).projects)
 
 def _extract_years_experience(text: str) -> Optional[str]:
-    m = re.search(r'(\d+)\s*(anos|anos de|year|years)', text, flags=re.IGNORECASE)
-    return f"{m.group(1)} anos" if m else None
+    return parse_resume(text).years
 
 def _extract_experience_lines(text: str) -> List[str]:
-    lines = text.split('\n')
-    experiences = []
-    
-    for line in lines:
-        line = line.strip()
-        if re.search(r'20\d{2}[–\-−]\s*(presente|20\d{2})\s*:', line):
-            experiences.append(line)
-    
-    return experiences
+    return list(parse_resume(text).experience_lines)
 
 def _extract_education(text: str) -> Optional[str]:
-    match = re.search(r'(bacharel|graduação|universidade|faculdade)[^0-9]*(\d{4})', text, re.IGNORECASE)
-    if match:
-        return match.group(0).strip()
-    
-    lines = text.split('\n')
-    for line in lines:
-        if any(word in line.lower() for word in ['universidade', 'faculdade', 'bacharel', 'graduação']):
-            return line.strip()
-    
-    return None
+    return parse_resume(text).education
 
 def _extract_certifications(text: str) -> List[str]:
-    lines = text.split('\n')
-    certs = []
-    
-    in_cert_section = False
-    for line in lines:
-        line = line.strip()
-        if 'certificaç' in line.lower():
-            in_cert_section = True
-            continue
-        elif in_cert_section and line.startswith('- '):
-            certs.append(line[2:])
-        elif in_cert_section and line and not line.startswith('- '):
-            in_cert_section = False
-    
-    return certs
+    return list(parse_resume(text).certifications)
+
+@lru_cache(maxsize=256)
+def _job_techs(job_description: str) -> Tuple[str, ...]:
+    """Tecnologias da vaga, memorizadas (a mesma vaga costuma vir em vários pedidos de um batch)"""
+    return tuple(_extract_techs(job_description))
+
+def _merge_techs(resume: ParsedResume, job_techs: List[str]) -> List[str]:
+    """Tecnologias do currículo + vaga, na ordem da taxonomia (equivale a extrair do texto concatenado)"""
+    return TAXONOMY.order(list(resume.techs) + list(job_techs))
 
 # -------------------------
 # Gerador programático (mantido e melhorado)
 # -------------------------
-def _generate_resume_markdown_programmatic(resume_text: str, job_description: str) -> str:
-    """Gerador programático otimizado"""
-    
-    print("[DEBUG] Iniciando geração programática de currículo")
-    
-    lines = [line.strip() for line in resume_text.strip().split('\n') if line.strip()]
-    
-    # Extrair informações básicas
-    name = lines[0] if lines else "Profissional"
-    
-    # Extrair tecnologias priorizando as da vaga
-    all_techs = _extract_techs(resume_text + " " + (job_description or ""))
-    job_techs = _extract_techs(job_description or "")
-    priority_techs = [t for t in all_techs if t in job_techs] + [t for t in all_techs if t not in job_techs]
-    
-    # Extrair outras informações
-    years_exp = _extract_years_experience(resume_text) or "3+ anos"
-    experiences = _extract_experience_lines(resume_text)
-    projects = _extract_projects(resume_text)
-    education = _extract_education(resume_text)
-    certifications = _extract_certifications(resume_text)
-    
-    # Determinar título baseado na vaga
-    title = "Desenvolvedor/Engenheiro de IA"
-    if job_description:
-        job_lower = job_description.lower()
-        if "fullstack" in job_lower:
-            title = "Desenvolvedor Full Stack"
-        elif "backend" in job_lower:
-            title = "Desenvolvedor Backend"
-        elif "frontend" in job_lower:
-            title = "Desenvolvedor Frontend"
-        elif "data scientist" in job_lower:
-            title = "Cientista de Dados"
-        elif "devops" in job_lower:
-            title = "Engenheiro DevOps"
-    
-    # Construir currículo
-    markdown = []
-    
-    # Header
-    markdown.extend([
-        f"# {name}",
-        f"## {title}",
-        "",
-        "---",
-        ""
-    ])
-    
-    # Resumo Profissional
-    markdown.extend([
-        "## 💼 Resumo Profissional",
-        ""
-    ])
+# Categorias da taxonomia exibidas em "Habilidades Técnicas", na ordem de exibição
+SKILL_CATEGORY_LABELS = [
+    ("languages", "Linguagens"),
+    ("frameworks", "Frameworks"),
+    ("ml_ai", "IA & ML"),
+    ("cloud_infra", "Cloud"),
+    ("databases", "Databases"),
+]
+
+# Diferenciais por tecnologia citada na vaga (e presente no currículo)
+RESUME_DIFFERENTIALS = {
+    "python": "✓ **Expertise em Python** - linguagem principal para desenvolvimento",
+    "javascript": "✓ **JavaScript Avançado** - desenvolvimento web moderno",
+    "react": "✓ **React Specialist** - interfaces de usuário avançadas",
+    "aws": "✓ **Cloud Computing** - experiência AWS para sistemas escaláveis",
+    "docker": "✓ **Containerização** - deploy e orquestração com Docker/Kubernetes",
+    "api": "✓ **APIs Escaláveis** - desenvolvimento de serviços robustos"
+}
+
+def _resume_title(job_description: str) -> str:
+    """Título baseado na vaga"""
+    job_lower = job_description.lower()
+    if "fullstack" in job_lower:
+        return "Desenvolvedor Full Stack"
+    if "backend" in job_lower:
+        return "Desenvolvedor Backend"
+    if "frontend" in job_lower:
+        return "Desenvolvedor Frontend"
+    if "data scientist" in job_lower:
+        return "Cientista de Dados"
+    if "devops" in job_lower:
+        return "Engenheiro DevOps"
+    return "Desenvolvedor/Engenheiro de IA"
+
+# Renderizadores por seção: recebem só a fatia do currículo/vaga que usam (a chave da memorização)
+def _render_header(name: str, title: str) -> List[str]:
+    return [f"# {name}", f"## {title}", "", "---", ""]
+
+def _render_summary(years_exp: str, has_nlp: bool, has_pipeline: bool, main_techs: List[str]) -> List[str]:
+    markdown = ["## 💼 Resumo Profissional", ""]
     
     summary_parts = []
     summary_parts.append(f"Profissional com {years_exp} de experiência em desenvolvimento e tecnologia.")
     
-    if "nlp" in resume_text.lower():
+    if has_nlp:
         summary_parts.append("Especialista em NLP e processamento de linguagem natural.")
     
-    if "pipeline" in resume_text.lower():
+    if has_pipeline:
         summary_parts.append("Experiência comprovada em construção de pipelines de ML e integração de modelos.")
     
-    if priority_techs:
-        main_techs = priority_techs[:4]
+    if main_techs:
         if len(main_techs) > 1:
             summary_parts.append(f"Domínio técnico em {', '.join(main_techs[:-1])} e {main_techs[-1]}.")
         else:
@@ -262,42 +562,13 @@ def _generate_resume_markdown_programmatic(resume_text: str, job_description: st
     for part in summary_parts:
         markdown.append(part)
         markdown.append("")
+    return markdown
+
+def _render_experience(experiences: List[str], has_pipeline: bool, has_api: bool, has_aws: bool) -> List[str]:
+    markdown = ["## 🚀 Experiência Profissional", ""]
     
-    # Experiência Profissional
-    markdown.extend([
-        "## 🚀 Experiência Profissional",
-        ""
-    ])
-    
-    if experiences:
-        for exp in experiences[:3]:
-            clean_exp = exp.replace('—', '-').replace('–', '-').replace(':', '')
-            company_role = clean_exp.split('@')[0].strip() if '@' in clean_exp else clean_exp
-            company = clean_exp.split('@')[1].split('—')[0].strip() if '@' in clean_exp else "Empresa"
-            
-            markdown.append(f"### {company_role}")
-            markdown.append(f"**{company}** | {clean_exp.split()[0]} - {clean_exp.split()[1] if len(clean_exp.split()) > 1 else 'Presente'}")
-            markdown.append("")
-            
-            # Adicionar bullets baseados no contexto
-            bullets = []
-            if "pipeline" in resume_text.lower():
-                bullets.append("- Desenvolvimento e otimização de pipelines de Machine Learning")
-            if "api" in resume_text.lower():
-                bullets.append("- Construção de APIs escaláveis e integração de sistemas")
-            if "aws" in resume_text.lower():
-                bullets.append("- Deploy e gerenciamento de soluções em cloud (AWS)")
-            if not bullets:
-                bullets = [
-                    "- Desenvolvimento de soluções tecnológicas inovadoras",
-                    "- Colaboração em projetos multidisciplinares"
-                ]
-            
-            for bullet in bullets:
-                markdown.append(bullet)
-            markdown.append("")
-    else:
-        markdown.extend([
+    if not experiences:
+        return markdown + [
             "### Engenheiro de Machine Learning",
             "**TechCompany** | 2023 - Presente",
             "",
@@ -312,13 +583,36 @@ def _generate_resume_markdown_programmatic(resume_text: str, job_description: st
             "- Implementação de soluções de backend e frontend",
             "- Integração com serviços de nuvem e databases",
             ""
-        ])
+        ]
     
-    # Projetos Relevantes
-    markdown.extend([
-        "## 🔧 Projetos Relevantes",
-        ""
-    ])
+    # Bullets baseados no contexto (os mesmos para todas as experiências)
+    bullets = []
+    if has_pipeline:
+        bullets.append("- Desenvolvimento e otimização de pipelines de Machine Learning")
+    if has_api:
+        bullets.append("- Construção de APIs escaláveis e integração de sistemas")
+    if has_aws:
+        bullets.append("- Deploy e gerenciamento de soluções em cloud (AWS)")
+    if not bullets:
+        bullets = [
+            "- Desenvolvimento de soluções tecnológicas inovadoras",
+            "- Colaboração em projetos multidisciplinares"
+        ]
+    
+    for exp in experiences:
+        clean_exp = exp.replace('—', '-').replace('–', '-').replace(':', '')
+        company_role = clean_exp.split('@')[0].strip() if '@' in clean_exp else clean_exp
+        company = clean_exp.split('@')[1].split('—')[0].strip() if '@' in clean_exp else "Empresa"
+        
+        markdown.append(f"### {company_role}")
+        markdown.append(f"**{company}** | {clean_exp.split()[0]} - {clean_exp.split()[1] if len(clean_exp.split()) > 1 else 'Presente'}")
+        markdown.append("")
+        markdown.extend(bullets)
+        markdown.append("")
+    return markdown
+
+def _render_projects(projects: List[str], relevant_techs: List[str]) -> List[str]:
+    markdown = ["## 🔧 Projetos Relevantes", ""]
     
     if projects:
         for i, project in enumerate(projects, 1):
@@ -329,46 +623,31 @@ def _generate_resume_markdown_programmatic(resume_text: str, job_description: st
             markdown.append(f"### {i}. {project_name}")
             markdown.append(f"{project_desc}")
             markdown.append("")
-    else:
-        default_projects = [
-            ("Sistema de Automação com IA", "Pipeline completo de processamento de dados com modelos de machine learning para classificação e predição."),
-            ("API de Machine Learning", "Desenvolvimento de API REST escalável para servir modelos ML em produção com monitoramento."),
-            ("Plataforma de NLP", "Sistema de processamento de linguagem natural para análise de sentimentos e extração de entidades.")
-        ]
-        
-        for i, (name, desc) in enumerate(default_projects, 1):
-            markdown.append(f"### {i}. {name}")
-            markdown.append(f"{desc}")
-            if priority_techs:
-                relevant_techs = [t for t in priority_techs[:3]]
-                if relevant_techs:
-                    markdown.append(f"**Tecnologias:** {', '.join(relevant_techs)}")
-            markdown.append("")
+        return markdown
     
-    # Habilidades Técnicas
-    markdown.extend([
-        "## 🛠️ Habilidades Técnicas",
-        ""
-    ])
+    default_projects = [
+        ("Sistema de Automação com IA", "Pipeline completo de processamento de dados com modelos de machine learning para classificação e predição."),
+        ("API de Machine Learning", "Desenvolvimento de API REST escalável para servir modelos ML em produção com monitoramento."),
+        ("Plataforma de NLP", "Sistema de processamento de linguagem natural para análise de sentimentos e extração de entidades.")
+    ]
+    
+    for i, (name, desc) in enumerate(default_projects, 1):
+        markdown.append(f"### {i}. {name}")
+        markdown.append(f"{desc}")
+        if relevant_techs:
+            markdown.append(f"**Tecnologias:** {', '.join(relevant_techs)}")
+        markdown.append("")
+    return markdown
+
+def _render_skills(priority_techs: List[str]) -> List[str]:
+    markdown = ["## 🛠️ Habilidades Técnicas", ""]
     
     if priority_techs:
-        # Categorizar tecnologias
-        languages = [t for t in priority_techs if t in ['Python', 'JavaScript', 'TypeScript', 'C#', 'Java', 'Go', 'Rust']]
-        frameworks = [t for t in priority_techs if t in ['React', 'Next.js', 'Vue.js', 'Node.js', 'FastAPI', 'Django', 'Flask']]
-        ml_ai = [t for t in priority_techs if t in ['TensorFlow', 'PyTorch', 'LangChain', 'Hugging Face']]
-        cloud_infra = [t for t in priority_techs if t in ['AWS', 'S3', 'DynamoDB', 'Docker', 'Kubernetes']]
-        databases = [t for t in priority_techs if t in ['SQL', 'MongoDB', 'Postgres', 'Redis']]
-        
-        if languages:
-            markdown.append(f"**Linguagens:** {', '.join(languages)}")
-        if frameworks:
-            markdown.append(f"**Frameworks:** {', '.join(frameworks)}")
-        if ml_ai:
-            markdown.append(f"**IA & ML:** {', '.join(ml_ai)}")
-        if cloud_infra:
-            markdown.append(f"**Cloud:** {', '.join(cloud_infra)}")
-        if databases:
-            markdown.append(f"**Databases:** {', '.join(databases)}")
+        # Categorizar tecnologias (categorias vêm da taxonomia)
+        by_category = TAXONOMY.by_category(priority_techs)
+        for category, label in SKILL_CATEGORY_LABELS:
+            if by_category.get(category):
+                markdown.append(f"**{label}:** {', '.join(by_category[category])}")
     else:
         markdown.extend([
             "**Linguagens:** Python, JavaScript, TypeScript",
@@ -378,117 +657,170 @@ def _generate_resume_markdown_programmatic(resume_text: str, job_description: st
         ])
     
     markdown.append("")
+    return markdown
+
+def _render_education(education: Optional[str]) -> List[str]:
+    if not education:
+        return []
+    return ["## 🎓 Formação", "", f"**{education}**", ""]
+
+def _render_certifications(certifications: List[str]) -> List[str]:
+    if not certifications:
+        return []
+    return ["## 📜 Certificações", ""] + [f"- {cert}" for cert in certifications] + [""]
+
+def _render_differentials(has_job: bool, job_keys: List[str], priority_techs: List[str]) -> List[str]:
+    if not has_job:
+        return []
+    markdown = ["## ⭐ Diferenciais Competitivos", ""]
     
-    # Formação
-    if education:
-        markdown.extend([
-            "## 🎓 Formação",
-            "",
-            f"**{education}**",
-            ""
-        ])
+    # Tecnologias citadas na vaga (job_keys) que também aparecem no currículo
+    differentials = [RESUME_DIFFERENTIALS[key] for key in job_keys
+                     if any(tech.lower() in key for tech in priority_techs)]
     
-    # Certificações
-    if certifications:
-        markdown.extend([
-            "## 📜 Certificações",
-            ""
-        ])
-        for cert in certifications:
-            markdown.append(f"- {cert}")
+    # Adicionar diferenciais genéricos se não encontrar específicos
+    if not differentials:
+        differentials = [
+            "✓ **Experiência técnica alinhada** com os requisitos da posição",
+            "✓ **Capacidade comprovada** de entrega em projetos complexos"
+        ]
+    
+    for diff in differentials[:4]:  # Máximo 4 diferenciais
+        markdown.append(diff)
         markdown.append("")
+    return markdown
+
+def _generate_resume_markdown_programmatic(resume_text: str, job_description: str) -> str:
+    """Gerador programático por seções: cada renderizador recebe só a fatia do currículo/vaga que usa"""
     
-    # Diferenciais competitivos
-    if job_description:
-        markdown.extend([
-            "## ⭐ Diferenciais Competitivos",
-            ""
-        ])
-        
-        job_lower = job_description.lower()
-        differentials = []
-        
-        # Mapear tecnologias encontradas para diferenciais
-        tech_differentials = {
-            "python": "✓ **Expertise em Python** - linguagem principal para desenvolvimento",
-            "javascript": "✓ **JavaScript Avançado** - desenvolvimento web moderno",
-            "react": "✓ **React Specialist** - interfaces de usuário avançadas",
-            "aws": "✓ **Cloud Computing** - experiência AWS para sistemas escaláveis",
-            "docker": "✓ **Containerização** - deploy e orquestração com Docker/Kubernetes",
-            "api": "✓ **APIs Escaláveis** - desenvolvimento de serviços robustos"
-        }
-        
-        for tech_key, differential in tech_differentials.items():
-            if tech_key in job_lower and any(tech.lower() in tech_key for tech in priority_techs):
-                differentials.append(differential)
-        
-        # Adicionar diferenciais genéricos se não encontrar específicos
-        if not differentials:
-            differentials = [
-                "✓ **Experiência técnica alinhada** com os requisitos da posição",
-                "✓ **Capacidade comprovada** de entrega em projetos complexos"
-            ]
-        
-        for diff in differentials[:4]:  # Máximo 4 diferenciais
-            markdown.append(diff)
-            markdown.append("")
+    logger.debug("Iniciando geração programática de currículo")
+    resume = parse_resume(resume_text)
+    resume_lower = resume.lower
+    job_lower = (job_description or "").lower()
     
-    result = "\n".join(markdown)
-    print(f"[DEBUG] Currículo gerado com {len(result)} caracteres")
+    # Tecnologias priorizando as da vaga
+    job_techs = _job_techs(job_description or "")
+    all_techs = _merge_techs(resume, job_techs)
+    priority_techs = [t for t in all_techs if t in job_techs] + [t for t in all_techs if t not in job_techs]
+    
+    has_pipeline = "pipeline" in resume_lower
+    sections = [
+        _render_header(resume.name, _resume_title(job_description or "")),
+        _render_summary(resume.years or "3+ anos", "nlp" in resume_lower, has_pipeline, priority_techs[:4]),
+        _render_experience(list(resume.experience_lines[:3]), has_pipeline, "api" in resume_lower, "aws" in resume_lower),
+        _render_projects(list(resume.projects), [] if resume.projects else priority_techs[:3]),
+        _render_skills(priority_techs),
+        _render_education(resume.education),
+        _render_certifications(list(resume.certifications)),
+        _render_differentials(bool(job_description), [key for key in RESUME_DIFFERENTIALS if key in job_lower],
+                              priority_techs),
+    ]
+    result = "\n".join(line for section in sections for line in section)
+    logger.debug("Currículo gerado com %d caracteres", len(result))
     return result
 
 # -------------------------
 # Funções principais com proteção contra problemas de token
 # -------------------------
+def _summarize_many(entry: ModelEntry, chunks: List[str]) -> List[str]:
+    """Todos os pedaços entram juntos na fila do sumarizador (viram batches cheios)"""
+    plan = plan_decoding("summarize", entry.served_name, current_budget())
+    limit = _generation_limit()
+    start = time.perf_counter()
+    futures = entry.batcher.submit_many(chunks, deadline=limit, **plan.params)
+    summaries = [wait_result(future, limit)['summary_text'] for future in futures]
+    tokenizer = entry.tokenizer_handle.get(wait=False)
+    if tokenizer is not None and len(chunks) == 1:
+        # Vários pedaços dividem o forward: só a chamada simples mede tokens/s
+        throughput(entry.served_name).observe(count_tokens(summaries[0] or "", tokenizer), time.perf_counter() - start)
+    for chunk, summary in zip(chunks, summaries):
+        _record_model_tokens(entry.handle, chunk, summary, tokenizer)
+    _mark_partial(_settle_budget("summarize", plan, limit))
+    return summaries
+
 def summarize_resume(text: str) -> str:
     """Resumo com proteção contra limite de tokens"""
+    return summarize_resume_served(text).result
+
+def summarize_resume_served(text: str) -> Served:
+    """Resumo, como foi obtido e por qual modelo (o da requisição ou o padrão)"""
+    entry = selected_model("summarizer")
     if not text.strip():
-        return ""
+        return _served(entry, "", "passthrough")
     
     # Primeiro, tentar método simples
-    sentences = _sentences(text)
+    resume = parse_resume(text)
+    sentences = resume.sentences
     if len(sentences) <= 3:
-        return text
+        record_outcome("summarize", "passthrough")
+        return _served(entry, text, "passthrough")
     
     # Se temos o modelo de sumarização, usar com truncamento
+    outcome = "fallback"
+    summarizer_long = _entry_model(entry)
+    summ_tokenizer = _entry_tokenizer(entry)
     if summarizer_long and summ_tokenizer:
+        deadline = current_deadline()
         try:
-            # Truncar o texto para evitar problemas de token
-            truncated_text = truncate_text(text, summ_tokenizer, max_tokens=400)
-            print(f"[DEBUG] Texto truncado para {len(truncated_text)} caracteres")
-            
-            summary = summarizer_long(truncated_text)[0]['summary_text']
-            print(f"[DEBUG] Resumo gerado: {len(summary)} caracteres")
-            return summary
+            with entry.admit(deadline):
+                if SUMMARY_LONG_MODE == "map_reduce":
+                    # Currículo inteiro, em pedaços do tamanho do modelo (sem descartar o final)
+                    budget = current_budget()
+                    summary = map_reduce_summary(text, summ_tokenizer, partial(_summarize_many, entry),
+                                                 entry.served_name, decoding_params("summarize"),
+                                                 store_if=lambda: budget is None or not budget.degraded,
+                                                 precision=served_precision(entry.served_name))
+                else:
+                    # Truncar o texto para evitar problemas de token
+                    truncated = truncate_prompt(text, summ_tokenizer, max_tokens=400)
+                    logger.debug("Texto truncado para %d caracteres", len(truncated.text))
+                    summary, cut = _generate(entry, "summarize", truncated, summ_tokenizer)
+                    _mark_partial(cut)
+            logger.debug("Resumo gerado: %d caracteres", len(summary))
+            record_outcome("summarize", "model")
+            return _served(entry, summary, "model")
             
+        except Overloaded:
+            raise
+        except DeadlineExceeded as e:
+            _deadline_fallback("summarize", e)
+            outcome = "deadline"
         except Exception as e:
-            print(f"[ERROR] Erro na sumarização com modelo: {e}")
+            logger.error("Erro na sumarização com modelo: %s", e)
+            record_outcome("summarize", "error")
+            outcome = "error"
     
     # Fallback: método programático
-    key_sentences = []
-    for sentence in sentences:
-        if any(keyword in sentence.lower() for keyword in 
-               ['experiência', 'desenvolvedor', 'engenheiro', 'analista', 'especialista', 'foco']):
-            key_sentences.append(sentence)
-        if len(key_sentences) >= 3:
-            break
+    record_outcome("summarize", "fallback")
+    key_sentences = list(resume.key_sentences[:3])
     
     if not key_sentences:
-        key_sentences = sentences[:3]
+        key_sentences = list(sentences[:3])
     
-    return " ".join(key_sentences)
+    return _served(entry, " ".join(key_sentences), outcome)
 
 def generate_optimized_resume(resume_text: str, job_description: Optional[str] = "") -> str:
     """Função principal com fallbacks robustos"""
-    print("[INFO] Gerando currículo otimizado")
+    return generate_optimized_resume_served(resume_text, job_description).result
+
+def generate_optimized_resume_served(resume_text: str, job_description: Optional[str] = "") -> Served:
+    logger.info("Gerando currículo otimizado")
+    entry = selected_model("generator")
     
     # Sempre tentar o gerador programático primeiro (mais confiável)
     try:
-        return _generate_resume_markdown_programmatic(resume_text, job_description or "")
+        with stage_timer("programmatic", "resume"):
+            result = _generate_resume_markdown_programmatic(resume_text, job_description or "")
+        record_outcome("resume", "programmatic")
+        return _served(entry, result, "programmatic")
     except Exception as e:
-        print(f"[ERROR] Erro no gerador programático: {e}")
+        logger.error("Erro no gerador programático: %s", e)
+        record_outcome("resume", "error")
+    outcome = "error"
     
     # Se temos modelos carregados, tentar com eles
+    resume_generator = _entry_model(entry)
+    generation_tokenizer = _entry_tokenizer(entry)
     if resume_generator and generation_tokenizer:
         try:
             # Criar prompt otimizado e truncado
@@ -496,53 +828,58 @@ def generate_optimized_resume(resume_text: str, job_description: Optional[str] =
             prompt = f"Otimize este currículo:{job_context}\n\nCurrículo:\n{resume_text}"
             
             # Truncar prompt para evitar problemas
-            truncated_prompt = truncate_text(prompt, generation_tokenizer, max_tokens=350)
-            print(f"[DEBUG] Prompt truncado para {len(truncated_prompt)} caracteres")
+            truncated_prompt = truncate_prompt(prompt, generation_tokenizer, max_tokens=350)
+            logger.debug("Prompt truncado para %d caracteres", len(truncated_prompt.text))
             
-            result = resume_generator(truncated_prompt)[0]['generated_text']
+            deadline = current_deadline()
+            with entry.admit(deadline):
+                result, cut = _generate(entry, "resume", truncated_prompt, generation_tokenizer)
             if result and len(result) > 100:
-                print(f"[DEBUG] Currículo gerado via modelo: {len(result)} caracteres")
-                return result
+                _mark_partial(cut)
+                logger.debug("Currículo gerado via modelo: %d caracteres", len(result))
+                record_outcome("resume", "model")
+                return _served(entry, result, "model")
+        except Overloaded:
+            raise
+        except DeadlineExceeded as e:
+            _deadline_fallback("resume", e)
+            outcome = "deadline"
         except Exception as e:
-            print(f"[ERROR] Erro na geração com modelo: {e}")
+            logger.error("Erro na geração com modelo: %s", e)
+            record_outcome("resume", "error")
     
     # Fallback final: versão básica
-    return f"""# Currículo Otimizado
+    record_outcome("resume", "fallback")
+    return _served(entry, f"""# Currículo Otimizado
 
 ## Resumo Profissional
 {summarize_resume(resume_text)}
 
 ## Habilidades Principais
-{', '.join(_extract_techs(resume_text + ' ' + (job_description or ''))[:8])}
+{', '.join(_merge_techs(parse_resume(resume_text), _job_techs(job_description or ''))[:8])}
 
 ## Experiência
 Profissional com sólida experiência em desenvolvimento de software e tecnologia.
 
 ---
-*Currículo gerado automaticamente*"""
+*Currículo gerado automaticamente*""", outcome)
 
-def generate_cover_letter(resume_text: str, job_description: Optional[str] = "") -> str:
-    """Carta de apresentação com proteção de token"""
-    
-    name_match = re.search(r'^([A-Za-z\sÀ-ÿ]+)', resume_text.strip())
+COVER_NAME_RE = re.compile(r'^([A-Za-z\sÀ-ÿ]+)')
+
+def _cover_letter_context(resume_text: str, job_description: Optional[str]) -> Tuple[str, List[str], str]:
+    """Nome, tecnologias e anos de experiência usados no prompt e no fallback da carta"""
+    resume = parse_resume(resume_text)
+    name_match = COVER_NAME_RE.search(resume_text.strip())
     name = name_match.group(1).strip() if name_match else "Candidato"
     
-    techs = _extract_techs(resume_text + " " + (job_description or ""))
-    years = _extract_years_experience(resume_text) or "vários anos"
-    
-    # Se temos o modelo, tentar usar
-    if cover_letter_generator and generation_tokenizer:
-        try:
-            prompt = f"Escreva uma carta de apresentação profissional para {name} com {years} de experiência em {', '.join(techs[:3])}."
-            truncated_prompt = truncate_text(prompt, generation_tokenizer, max_tokens=200)
-            
-            result = cover_letter_generator(truncated_prompt)[0]['generated_text']
-            if result and len(result) > 50:
-                return result
-        except Exception as e:
-            print(f"[ERROR] Erro na geração de carta: {e}")
-    
-    # Fallback programático
+    techs = _merge_techs(resume, _job_techs(job_description or ""))
+    years = resume.years or "vários anos"
+    return name, techs, years
+
+def _cover_letter_prompt(name: str, techs: List[str], years: str) -> str:
+    return f"Escreva uma carta de apresentação profissional para {name} com {years} de experiência em {', '.join(techs[:3])}."
+
+def _cover_letter_fallback(name: str, techs: List[str], years: str) -> str:
     tech_list = ', '.join(techs[:4]) if techs else 'Python, Machine Learning, APIs'
     
     return f"""# Carta de Apresentação
@@ -565,12 +902,63 @@ Atenciosamente,
 **{name}**
 """
 
+def generate_cover_letter(resume_text: str, job_description: Optional[str] = "") -> str:
+    """Carta de apresentação com proteção de token"""
+    return generate_cover_letter_served(resume_text, job_description).result
+
+def generate_cover_letter_served(resume_text: str, job_description: Optional[str] = "") -> Served:
+    return _cover_letter_served(_cover_letter_context(resume_text, job_description))
+
+def _cover_letter_served(context: Tuple[str, List[str], str],
+                         truncated_prompt: Optional[TokenizedInput] = None) -> Served:
+    """Carta a partir do contexto (e do prompt já truncado, se houver)"""
+    entry = selected_model("generator")
+    outcome = "fallback"
+    
+    # Se temos o modelo, tentar usar
+    cover_letter_generator = _entry_model(entry)
+    generation_tokenizer = _entry_tokenizer(entry)
+    if cover_letter_generator and generation_tokenizer:
+        try:
+            if truncated_prompt is None:
+                truncated_prompt = truncate_prompt(_cover_letter_prompt(*context), generation_tokenizer, max_tokens=200)
+            
+            deadline = current_deadline()
+            with entry.admit(deadline):
+                result, cut = _generate(entry, "cover", truncated_prompt, generation_tokenizer)
+            if result and len(result) > 50:
+                _mark_partial(cut)
+                record_outcome("cover", "model")
+                return _served(entry, result, "model")
+        except Overloaded:
+            raise
+        except DeadlineExceeded as e:
+            _deadline_fallback("cover", e)
+            outcome = "deadline"
+        except Exception as e:
+            logger.error("Erro na geração de carta: %s", e)
+            record_outcome("cover", "error")
+            outcome = "error"
+    
+    # Fallback programático
+    record_outcome("cover", "fallback")
+    return _served(entry, _cover_letter_fallback(*context), outcome)
+
 def simulate_interview(resume_text: str, job_description: Optional[str] = "", max_retries: int = 1) -> List[Dict]:
     """Simulador de entrevista otimizado"""
-    
-    techs = _extract_techs(resume_text + " " + (job_description or ""))
-    projects = _extract_projects(resume_text)
-    years = _extract_years_experience(resume_text)
+    return simulate_interview_served(resume_text, job_description).result
+
+def simulate_interview_served(resume_text: str, job_description: Optional[str] = "") -> Served:
+    with stage_timer("programmatic", "interview"):
+        qa = _interview_questions(resume_text, job_description)
+    record_outcome("interview", "programmatic")
+    return _served(None, qa, "programmatic")
+
+def _interview_questions(resume_text: str, job_description: Optional[str]) -> List[Dict]:
+    resume = parse_resume(resume_text)
+    techs = _merge_techs(resume, _job_techs(job_description or ""))
+    projects = resume.projects
+    years = resume.years
     
     qa = []
     
@@ -612,4 +1000,245 @@ def simulate_interview(resume_text: str, job_description: Optional[str] = "", ma
         "answer": "Estou motivado em aplicar minhas habilidades técnicas para resolver problemas reais e contribuir com uma equipe que valoriza inovação, crescimento profissional e excelência técnica."
     })
     
-    return qa
\ No newline at end of file
+    return qa
+
+# -------------------------
+# Processamento em lote (um currículo x várias vagas, ou o inverso)
+# -------------------------
+# (índice, resultado, erro, modelo que produziu o resultado)
+BatchItem = Tuple[int, Optional[object], Optional[str], Optional[str]]
+
+def _run_batch_programmatic(pairs: List[Tuple[str, str]], fn, generator_model: Optional[str] = None) -> Iterator[BatchItem]:
+    # O lado compartilhado é parseado uma só vez (parse_resume/_job_techs são memorizados)
+    for index, (resume_text, job_description) in enumerate(pairs):
+        try:
+            # Os itens rodam na thread da resposta em streaming: o escopo é aberto aqui
+            with model_scope(generator=generator_model):
+                served = fn(resume_text, job_description)
+            yield index, served.result, None, served.model
+        except Exception as e:
+            logger.error("Erro no item %d do batch: %s", index, e)
+            yield index, None, str(e), None
+
+def generate_optimized_resumes_batch(pairs: List[Tuple[str, str]], model: Optional[str] = None) -> Iterator[BatchItem]:
+    """Gera (índice, currículo, erro, modelo) para cada par, na ordem em que ficam prontos"""
+    return _run_batch_programmatic(pairs, generate_optimized_resume_served, model)
+
+def simulate_interviews_batch(pairs: List[Tuple[str, str]]) -> Iterator[BatchItem]:
+    return _run_batch_programmatic(pairs, simulate_interview_served)
+
+def generate_cover_letters_batch(pairs: List[Tuple[str, str]], deadline: Optional[Deadline] = None,
+                                 model: Optional[str] = None) -> Iterator[BatchItem]:
+    """Cartas para vários pares: todos os prompts vão de uma vez para a fila do gerador,
+    que os executa em batches cheios; cada carta é entregue assim que fica pronta.
+    Itens cujo ``deadline`` vence recebem o fallback programático."""
+    entry = MODEL_REGISTRY.resolve("generator", model)
+    contexts = [_cover_letter_context(resume_text, job) for resume_text, job in pairs]
+    
+    generation_tokenizer = _entry_tokenizer(entry)
+    if not (_entry_model(entry) and generation_tokenizer):
+        for index, context in enumerate(contexts):
+            record_outcome("cover", "fallback")
+            yield index, _cover_letter_fallback(*context), None, "programmatic"
+        return
+    
+    prompts = [truncate_prompt(_cover_letter_prompt(*context), generation_tokenizer, max_tokens=200)
+               for context in contexts]
+    with ExitStack() as stack:
+        # Admitido enquanto o lote está na fila: o modelo não é descarregado no meio
+        try:
+            stack.enter_context(entry.admit(deadline))
+        except (DeadlineExceeded, Overloaded) as e:
+            logger.info("Lote de %d cartas sem admissão no gerador (%s), usando fallback programático", len(pairs), e)
+            for index, context in enumerate(contexts):
+                record_outcome("cover", "deadline" if isinstance(e, DeadlineExceeded) else "error")
+                record_outcome("cover", "fallback")
+                yield index, _cover_letter_fallback(*context), None, "programmatic"
+            return
+        futures = entry.batcher.submit_many(prompts, deadline=deadline, **decoding_params("cover"))
+        index_of = {future: index for index, future in enumerate(futures)}
+        for future in as_completed(futures):
+            index = index_of[future]
+            try:
+                result = future.result()['generated_text']
+                _record_model_tokens(entry.handle, prompts[index], result, generation_tokenizer)
+                if result and len(result) > 50:
+                    record_outcome("cover", "model")
+                    yield index, result, None, entry.served_name
+                    continue
+            except (DeadlineExceeded, CancelledError) as e:
+                logger.info("Carta %d: %s, usando fallback programático", index, e or "cancelada")
+                record_outcome("cover", "deadline")
+            except Exception as e:
+                logger.error("Erro na geração de carta (item %d): %s", index, e)
+                record_outcome("cover", "error")
+            record_outcome("cover", "fallback")
+            yield index, _cover_letter_fallback(*contexts[index]), None, "programmatic"
+
+
+# -------------------------
+# Candidatura completa: resumo, currículo, carta e entrevista numa requisição só
+# -------------------------
+# Threads que esperam os modelos enquanto a thread da requisição faz a parte programática
+APPLICATION_MODEL_THREADS = int(os.getenv("APPLICATION_MODEL_THREADS", "16"))
+_application_executor = ThreadPoolExecutor(max_workers=APPLICATION_MODEL_THREADS, thread_name_prefix="application")
+
+FALLBACK_OUTCOMES = ("fallback", "deadline", "error")
+
+def _timed_part(fn, *args) -> Tuple[Served, float]:
+    start = time.perf_counter()
+    served = fn(*args)
+    return served, (time.perf_counter() - start) * 1000
+
+def generate_application(resume_text: str, job_description: str) -> Dict:
+    """Os quatro artefatos de uma candidatura com um único parse.
+
+    O prompt da carta é montado antes de tudo; resumo (sumarizador) e carta (gerador)
+    vão em paralelo para as filas de micro-batching, e o currículo e a entrevista,
+    programáticos, rodam na thread da requisição enquanto os modelos trabalham.
+    """
+    start = time.perf_counter()
+    # parse_resume/_job_techs são memorizados: as quatro partes reaproveitam este parse
+    parse_resume(resume_text)
+    _job_techs(job_description)
+    cover_context = _cover_letter_context(resume_text, job_description)
+    generator = selected_model("generator")
+    generation_tokenizer = _entry_tokenizer(generator)
+    cover_prompt = None
+    if generation_tokenizer and _entry_model(generator):
+        cover_prompt = truncate_prompt(_cover_letter_prompt(*cover_context), generation_tokenizer, max_tokens=200)
+    prepare_ms = (time.perf_counter() - start) * 1000
+
+    # Cada thread leva uma cópia do contexto (deadline e modelos da requisição)
+    summary_future = _application_executor.submit(
+        contextvars.copy_context().run, _timed_part, summarize_resume_served, resume_text)
+    cover_future = _application_executor.submit(
+        contextvars.copy_context().run, _timed_part, _cover_letter_served, cover_context, cover_prompt)
+    try:
+        parts = {
+            "resume": _timed_part(generate_optimized_resume_served, resume_text, job_description),
+            "interview": _timed_part(simulate_interview_served, resume_text, job_description),
+        }
+        parts["summary"] = summary_future.result()
+        parts["cover"] = cover_future.result()
+    finally:
+        # Erro (ex.: 429 de um dos modelos) não deixa a outra parte ocupando o modelo à toa
+        summary_future.cancel()
+        cover_future.cancel()
+
+    return {
+        "summary": parts["summary"][0].result,
+        "optimizedResumeMarkdown": parts["resume"][0].result,
+        "coverLetterMarkdown": parts["cover"][0].result,
+        "qa": parts["interview"][0].result,
+        "model": parts["cover"][0].model,
+        "parts": {name: {"status": served.outcome, "fallback": served.outcome in FALLBACK_OUTCOMES,
+                         "model": served.model, "ms": round(ms, 1)}
+                  for name, (served, ms) in parts.items()},
+        "prepareMs": round(prepare_ms, 1),
+        "totalMs": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+# -------------------------
+# Streaming (SSE): eventos ("token", pedaço) e, por último, ("done", texto final)
+# -------------------------
+StreamEvent = Tuple[str, str]
+
+def _stream_model(entry: ModelEntry, profile: str, prompt: str, cancel: threading.Event, min_length: int,
+                  deadline: Optional[Deadline] = None) -> Iterator[StreamEvent]:
+    """Streaming do gerador com o perfil do endpoint; o evento "done" só sai se o texto passar de
+    ``min_length``. Com ``deadline`` a geração para no prazo (``max_time``) e levanta ``DeadlineExceeded``."""
+    pipe = _entry_model(entry)
+    generate_kwargs = decoding_params(profile)
+    if deadline is not None:
+        generate_kwargs["max_time"] = max(0.0, deadline.remaining())
+    start = time.perf_counter()
+    chunks: List[str] = []
+    with entry.admit(deadline):
+        try:
+            for chunk in stream_generate(pipe, prompt, cancel, **generate_kwargs):
+                if not chunks:
+                    stream_stats.record_ttft(time.perf_counter() - start)
+                chunks.append(chunk)
+                yield "token", chunk
+        finally:
+            stream_stats.record_stream(cancelled=cancel.is_set())
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="generate", component="generator_stream")
+    result = "".join(chunks)
+    _record_model_tokens(entry.handle, prompt, result, _entry_tokenizer(entry))
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded("deadline expirou durante o streaming")
+    if result and len(result) > min_length:
+        yield "done", result
+
+def stream_cover_letter(resume_text: str, job_description: Optional[str], cancel: threading.Event,
+                        deadline: Optional[Deadline] = None, model: Optional[str] = None) -> Iterator[StreamEvent]:
+    """Carta em streaming; sem modelo (ou com saída curta demais) o "done" traz o fallback programático"""
+    entry = MODEL_REGISTRY.resolve("generator", model)
+    name, techs, years = _cover_letter_context(resume_text, job_description)
+    
+    generation_tokenizer = _entry_tokenizer(entry)
+    if _entry_model(entry) and generation_tokenizer:
+        try:
+            prompt = truncate_text(_cover_letter_prompt(name, techs, years), generation_tokenizer, max_tokens=200)
+            for event in _stream_model(entry, "cover", prompt, cancel, min_length=50, deadline=deadline):
+                yield event
+                if event[0] == "done":
+                    record_outcome("cover_stream", "model")
+                    return
+        except (DeadlineExceeded, Overloaded) as e:
+            # Status 200 já foi enviado: o "done" programático substitui o modelo
+            logger.info("Carta (stream): %s, usando fallback programático", e)
+            record_outcome("cover_stream", "deadline" if isinstance(e, DeadlineExceeded) else "overloaded")
+        except Exception as e:
+            logger.error("Erro na geração de carta (stream): %s", e)
+            record_outcome("cover_stream", "error")
+    
+    if not cancel.is_set():
+        record_outcome("cover_stream", "fallback")
+        yield "done", _cover_letter_fallback(name, techs, years)
+
+def stream_optimized_resume(resume_text: str, job_description: Optional[str], cancel: threading.Event,
+                            deadline: Optional[Deadline] = None, model: Optional[str] = None) -> Iterator[StreamEvent]:
+    """Mesma ordem de generate_optimized_resume: o gerador programático responde de imediato
+    e o modelo só é usado (em streaming) se ele falhar.
+
+    No caminho normal sai um único evento "done" com o currículo completo, sem "token":
+    tokens só chegam quando o gerador programático falha e o modelo assume. Apenas
+    /cover/stream transmite tokens do modelo no caminho normal.
+    """
+    start = time.perf_counter()
+    try:
+        with stage_timer("programmatic", "resume"):
+            result = _generate_resume_markdown_programmatic(resume_text, job_description or "")
+        stream_stats.record_ttft(time.perf_counter() - start)
+        record_outcome("resume_stream", "programmatic")
+        yield "done", result
+        return
+    except Exception as e:
+        logger.error("Erro no gerador programático: %s", e)
+        record_outcome("resume_stream", "error")
+    
+    entry = MODEL_REGISTRY.resolve("generator", model)
+    generation_tokenizer = _entry_tokenizer(entry)
+    if _entry_model(entry) and generation_tokenizer:
+        try:
+            job_context = f"\n\nVaga: {job_description}" if job_description else ""
+            prompt = f"Otimize este currículo:{job_context}\n\nCurrículo:\n{resume_text}"
+            truncated_prompt = truncate_text(prompt, generation_tokenizer, max_tokens=350)
+            for event in _stream_model(entry, "resume", truncated_prompt, cancel, min_length=100, deadline=deadline):
+                yield event
+                if event[0] == "done":
+                    record_outcome("resume_stream", "model")
+                    return
+        except (DeadlineExceeded, Overloaded) as e:
+            logger.info("Currículo (stream): %s, usando fallback programático", e)
+            record_outcome("resume_stream", "deadline" if isinstance(e, DeadlineExceeded) else "overloaded")
+        except Exception as e:
+            logger.error("Erro na geração com modelo (stream): %s", e)
+            record_outcome("resume_stream", "error")
+    
+    if not cancel.is_set():
+        with deadline_scope(deadline), model_scope(generator=model):
+            result = generate_optimized_resume(resume_text, job_description)
+        yield "done", result
@@ -0,0 +1,84 @@
+# streaming.py - Geração token a token com cancelamento e métrica de time-to-first-token
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator
+
+# Tempo máximo esperando o próximo token antes de desistir da geração
+STREAM_TOKEN_TIMEOUT = float(os.getenv("STREAM_TOKEN_TIMEOUT", "60"))
+# Quantas amostras de TTFT manter para os percentis
+STREAM_STATS_WINDOW = int(os.getenv("STREAM_STATS_WINDOW", "1000"))
+
+
+class StreamStats:
+    """Time-to-first-token e contadores das gerações em streaming"""
+
+    def __init__(self, window: int = STREAM_STATS_WINDOW):
+        self._lock = threading.Lock()
+        self._ttft_ms: Deque[float] = deque(maxlen=window)
+        self.streams = 0
+        self.cancelled = 0
+
+    def record_ttft(self, seconds: float):
+        with self._lock:
+            self._ttft_ms.append(seconds * 1000.0)
+
+    def record_stream(self, cancelled: bool):
+        with self._lock:
+            self.streams += 1
+            if cancelled:
+                self.cancelled += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._ttft_ms)
+            streams, cancelled = self.streams, self.cancelled
+
+        def percentile(p: float):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+
+        return {
+            "streams": streams,
+            "cancelled": cancelled,
+            "ttftMs": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99), "samples": len(samples)},
+        }
+
+
+stream_stats = StreamStats()
+
+
+def stream_generate(pipe, prompt: str, cancel: threading.Event, **generate_kwargs) -> Iterator[str]:
+    """Roda o pipeline numa thread e devolve os pedaços de texto conforme o modelo os produz.
+
+    ``cancel`` é verificado a cada passo de decodificação: quando o cliente
+    desconecta, a geração para no próximo token em vez de ir até ``max_length``.
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+    class _StopOnCancel(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return cancel.is_set()
+
+    streamer = TextIteratorStreamer(pipe.tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                    timeout=STREAM_TOKEN_TIMEOUT)
+    errors = []
+
+    def _run():
+        try:
+            pipe(prompt, streamer=streamer, stopping_criteria=StoppingCriteriaList([_StopOnCancel()]),
+                 **generate_kwargs)
+        except Exception as e:
+            errors.append(e)
+            # Destrava o consumidor mesmo se a geração falhar antes do fim
+            streamer.on_finalized_text("", stream_end=True)
+
+    thread = threading.Thread(target=_run, name="stream-generate", daemon=True)
+    thread.start()
+    for text in streamer:
+        if text:
+            yield text
+    if errors:
+        raise errors[0]
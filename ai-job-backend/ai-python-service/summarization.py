@@ -0,0 +1,156 @@
+# summarization.py - Sumarização map-reduce para currículos longos (em vez de truncar)
+import hashlib
+import os
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+from result_cache import RESULT_CACHE_DB, ResultCache
+from resume_parser import split_sentences
+from tokenization import count_tokens
+
+# truncate: comportamento antigo (corta no limite de tokens); map_reduce: resume por partes
+SUMMARY_LONG_MODE = os.getenv("SUMMARY_LONG_MODE", "map_reduce").lower()
+# Tamanho dos pedaços em tokens (limitado pelo model_max_length do tokenizer)
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1000"))
+SUMMARY_CHUNK_OVERLAP = int(os.getenv("SUMMARY_CHUNK_OVERLAP", "50"))
+# summarize: resume de novo a junção dos resumos parciais; concat: só concatena
+SUMMARY_REDUCE_STRATEGY = os.getenv("SUMMARY_REDUCE_STRATEGY", "summarize").lower()
+SUMMARY_MAX_REDUCE_ROUNDS = int(os.getenv("SUMMARY_MAX_REDUCE_ROUNDS", "3"))
+SUMMARY_CHUNK_CACHE_SIZE = int(os.getenv("SUMMARY_CHUNK_CACHE_SIZE", "4096"))
+# Limite da tabela própria (summary_chunks) no SQLite do RESULT_CACHE_DB
+SUMMARY_CHUNK_CACHE_DB_MAX_ENTRIES = int(os.getenv("SUMMARY_CHUNK_CACHE_DB_MAX_ENTRIES", "100000"))
+
+# Resumos por pedaço: um currículo editado só ressumariza os pedaços que mudaram
+chunk_cache = ResultCache(max_entries=SUMMARY_CHUNK_CACHE_SIZE, db_path=RESULT_CACHE_DB,
+                          db_max_entries=SUMMARY_CHUNK_CACHE_DB_MAX_ENTRIES, db_table="summary_chunks")
+
+SummarizeMany = Callable[[List[str]], List[str]]
+
+
+def chunk_budget(tokenizer, chunk_tokens: int = SUMMARY_CHUNK_TOKENS) -> int:
+    model_max = getattr(tokenizer, "model_max_length", None)
+    if isinstance(model_max, int) and 0 < model_max < 1_000_000:
+        # Folga para os tokens especiais que o pipeline acrescenta
+        return max(16, min(chunk_tokens, model_max - 8))
+    return chunk_tokens
+
+
+def _units(text: str) -> List[str]:
+    """Unidades indivisíveis: cada linha (itens, títulos de seção) quebrada em sentenças"""
+    units: List[str] = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if line:
+            units.extend(split_sentences(line))
+    return units
+
+
+def _split_oversized(unit: str, tokens: int, budget: int) -> List[str]:
+    """Sentença maior que o pedaço: corte proporcional por caracteres"""
+    pieces = -(-tokens // budget)
+    size = -(-len(unit) // pieces)
+    return [unit[i:i + size] for i in range(0, len(unit), size)]
+
+
+def _is_anchor(unit: str, tokens: int, target: int) -> bool:
+    """Corte definido pelo conteúdo: depende só da própria unidade (hash estável entre processos).
+
+    A chance de cortar depois da unidade é proporcional ao tamanho dela, o que dá
+    pedaços de ~``target`` tokens em média sem olhar para o resto do texto.
+    """
+    return zlib.crc32(unit.encode("utf-8")) % 10_000 < 10_000 * tokens / max(1, target)
+
+
+def chunk_text(text: str, tokenizer, chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+               overlap_tokens: int = SUMMARY_CHUNK_OVERLAP) -> List[str]:
+    """Agrupa sentenças/linhas em pedaços de até ``chunk_tokens``; cada pedaço repete
+    as últimas sentenças do anterior (até ``overlap_tokens``) para manter contexto.
+
+    As fronteiras caem em unidades escolhidas pelo conteúdo (``_is_anchor``), não pela
+    contagem acumulada: editar uma linha muda só o pedaço dela (e o seguinte, se a
+    linha estiver na sobreposição), e os demais continuam acertando o cache. O limite
+    de tokens só força um corte extra quando não aparece âncora a tempo.
+    """
+    budget = chunk_budget(tokenizer, chunk_tokens)
+    overlap_tokens = min(overlap_tokens, budget // 2)
+    target = max(1, budget - overlap_tokens)
+
+    units = []
+    for unit in _units(text):
+        tokens = count_tokens(unit, tokenizer)
+        if tokens > budget:
+            units.extend((piece, count_tokens(piece, tokenizer)) for piece in _split_oversized(unit, tokens, budget))
+        else:
+            units.append((unit, tokens))
+
+    chunks: List[str] = []
+    current: List = []
+    current_tokens = 0
+
+    def close(next_tokens: int):
+        nonlocal current, current_tokens
+        chunks.append("\n".join(u for u, _ in current))
+        # Sobreposição: carrega as últimas unidades que cabem no overlap
+        carried: List = []
+        carried_tokens = 0
+        for prev in reversed(current):
+            if carried_tokens + prev[1] > overlap_tokens or carried_tokens + prev[1] + next_tokens > budget:
+                break
+            carried.insert(0, prev)
+            carried_tokens += prev[1]
+        current, current_tokens = carried, carried_tokens
+
+    for position, (unit, tokens) in enumerate(units):
+        if current and current_tokens + tokens > budget:
+            close(tokens)
+        current.append((unit, tokens))
+        current_tokens += tokens
+        if position + 1 < len(units) and _is_anchor(unit, tokens, target):
+            close(units[position + 1][1])
+    if current:
+        chunks.append("\n".join(u for u, _ in current))
+    return chunks
+
+
+def _chunk_key(chunk: str, model_name: Optional[str], params: Dict[str, Any], precision: str) -> str:
+    # Resumos int8/bf16 diferem dos fp32: a precisão também entra na chave
+    payload = repr((chunk, model_name or "", sorted(params.items()), precision))
+    return "chunk:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def summarize_chunks(chunks: List[str], summarize_many: SummarizeMany, model_name: Optional[str],
+                     params: Dict[str, Any], store_if: Optional[Callable[[], bool]] = None,
+                     precision: str = "fp32") -> List[str]:
+    """Map: resume só os pedaços ausentes do cache, todos num único lote.
+    ``store_if`` falso (ex.: geração reduzida pelo orçamento) não grava os resumos no cache."""
+    keys = [_chunk_key(chunk, model_name, params, precision) for chunk in chunks]
+    summaries: List[Optional[str]] = [chunk_cache.lookup(key) for key in keys]
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    if missing:
+        fresh = summarize_many([chunks[i] for i in missing])
+        store = store_if is None or store_if()
+        for i, summary in zip(missing, fresh):
+            summaries[i] = summary
+            if store:
+                chunk_cache.store(keys[i], summary)
+    return [summary or "" for summary in summaries]
+
+
+def map_reduce_summary(text: str, tokenizer, summarize_many: SummarizeMany, model_name: Optional[str],
+                       params: Dict[str, Any], chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+                       overlap_tokens: int = SUMMARY_CHUNK_OVERLAP, reduce_strategy: str = SUMMARY_REDUCE_STRATEGY,
+                       max_rounds: int = SUMMARY_MAX_REDUCE_ROUNDS,
+                       store_if: Optional[Callable[[], bool]] = None, precision: str = "fp32") -> str:
+    """Resume pedaço a pedaço e depois reduz os resumos parciais até caberem num único pedaço"""
+    budget = chunk_budget(tokenizer, chunk_tokens)
+    current = text
+    for _ in range(max(1, max_rounds)):
+        if count_tokens(current, tokenizer) <= budget:
+            return summarize_chunks([current], summarize_many, model_name, params, store_if, precision)[0]
+        chunks = chunk_text(current, tokenizer, chunk_tokens, overlap_tokens)
+        partials = summarize_chunks(chunks, summarize_many, model_name, params, store_if, precision)
+        current = "\n".join(partial.strip() for partial in partials if partial.strip())
+        if reduce_strategy == "concat":
+            return current
+    # Limite de rodadas atingido: devolve a última redução sem truncar mais
+    return current
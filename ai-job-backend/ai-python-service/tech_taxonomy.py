@@ -0,0 +1,141 @@
+# tech_taxonomy.py - Taxonomia de tecnologias e matcher compilado (uma passada pelo texto)
+import json
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+TECH_TAXONOMY_PATH = os.getenv(
+    "TECH_TAXONOMY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tech_taxonomy.json"))
+
+# Fronteiras de token: "Go" não casa em "good", "Vue" não casa em "Vue.js", "SQL" não casa em "PostgreSQL",
+# "js" não casa em "Express.js"
+_LEFT_BOUNDARY = r"(?<![\w#+])(?<!\w\.)"
+_RIGHT_BOUNDARY = r"(?![\w#+$]|\.\w)"
+# Versão colada ao nome ("python3.11", "Java8") fica fora do alias e não bloqueia o match
+_VERSION_SUFFIX = r"(?:\d+(?:\.\d+)*)?"
+
+
+class Skill(NamedTuple):
+    name: str
+    category: str
+
+
+class TechMatch(NamedTuple):
+    name: str
+    category: str
+    start: int
+    end: int
+
+
+def _build_trie(words: List[str]) -> Dict:
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    return trie
+
+
+def _trie_pattern(node: Dict) -> str:
+    """Converte a trie numa regex sem alternâncias redundantes (prefixos comuns fatorados)"""
+    terminal = "" in node
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != ""]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    group = "(?:" + "|".join(branches) + ")"
+    # Quantificador guloso: tenta o alias mais longo primeiro, recua para o prefixo se a fronteira falhar
+    return group + "?" if terminal else group
+
+
+class TechTaxonomy:
+    """Catálogo de skills com aliases, compilado numa única regex em forma de trie.
+
+    Aliases são case-insensitive, exceto em skills marcadas com ``caseSensitive``
+    (nomes que coincidem com palavras comuns, como Go ou Swift). Com ``matchName``
+    falso o nome sozinho não casa, só os aliases com contexto ("linguagem C", não
+    "Nível C"). ``compounds`` mapeia um termo para várias skills ("AWS S3", "C/C++").
+    """
+
+    def __init__(self, categories: List[str], skills: List[Dict],
+                 compounds: Optional[Dict[str, List[str]]] = None):
+        self.categories = list(categories)
+        self.skills: List[Skill] = []
+        self._order: Dict[str, int] = {}
+        self._ci_aliases: Dict[str, Tuple[Skill, ...]] = {}
+        self._cs_aliases: Dict[str, Tuple[Skill, ...]] = {}
+        for entry in skills:
+            skill = Skill(entry["name"], entry.get("category", "tools"))
+            if skill.name in self._order:
+                continue
+            self._order[skill.name] = len(self.skills)
+            self.skills.append(skill)
+            aliases = list(entry.get("aliases", []))
+            if entry.get("matchName", True):
+                aliases.insert(0, skill.name)
+            for alias in aliases:
+                if entry.get("caseSensitive"):
+                    self._cs_aliases.setdefault(alias, (skill,))
+                else:
+                    self._ci_aliases.setdefault(alias.lower(), (skill,))
+        for term, names in (compounds or {}).items():
+            self._ci_aliases[term.lower()] = tuple(self.skills[self._order[name]] for name in names)
+
+        alternatives = []
+        if self._ci_aliases:
+            alternatives.append("(?i:" + _trie_pattern(_build_trie(list(self._ci_aliases))) + ")")
+        if self._cs_aliases:
+            alternatives.append(_trie_pattern(_build_trie(list(self._cs_aliases))))
+        body = "|".join(alternatives) or r"(?!x)x"
+        self._pattern = re.compile(_LEFT_BOUNDARY + "(?P<alias>" + body + ")" + _VERSION_SUFFIX + _RIGHT_BOUNDARY)
+
+    @classmethod
+    def load(cls, path: str = TECH_TAXONOMY_PATH) -> "TechTaxonomy":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("categories", []), data["skills"], data.get("compounds"))
+
+    @property
+    def names(self) -> List[str]:
+        return [skill.name for skill in self.skills]
+
+    def _skills_for(self, matched: str) -> Tuple[Skill, ...]:
+        return self._cs_aliases.get(matched) or self._ci_aliases.get(matched.lower()) or ()
+
+    def find(self, text: str) -> List[TechMatch]:
+        """Todas as ocorrências, com nome canônico, categoria e posição no texto"""
+        matches = []
+        for m in self._pattern.finditer(text):
+            for skill in self._skills_for(m.group("alias")):
+                matches.append(TechMatch(skill.name, skill.category, m.start(), m.end()))
+        return matches
+
+    def canonical(self, matches: List[TechMatch]) -> List[str]:
+        """Nomes canônicos únicos, na ordem da taxonomia"""
+        found = {match.name for match in matches}
+        return sorted(found, key=self._order.__getitem__)
+
+    def extract(self, text: str) -> List[str]:
+        return self.canonical(self.find(text))
+
+    def order(self, names) -> List[str]:
+        return sorted(set(names), key=lambda name: self._order.get(name, len(self._order)))
+
+    def category_of(self, name: str) -> Optional[str]:
+        index = self._order.get(name)
+        return self.skills[index].category if index is not None else None
+
+    def by_category(self, names: List[str]) -> Dict[str, List[str]]:
+        """Agrupa nomes por categoria preservando a ordem recebida"""
+        groups: Dict[str, List[str]] = {category: [] for category in self.categories}
+        for name in names:
+            category = self.category_of(name)
+            if category is not None:
+                groups.setdefault(category, []).append(name)
+        return groups
+
+
+# Construída uma vez na importação a partir do arquivo de dados
+TAXONOMY = TechTaxonomy.load()
@@ -0,0 +1,5 @@
+# Os módulos do serviço são planos (main.py, services.py...): a pasta do serviço entra no path
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+import main
+from admission import AdmissionController, Deadline, DeadlineExceeded, Overloaded
+
+
+@pytest.fixture
+def busy():
+    """Controlador com a única vaga ocupada por outra thread até ``release`` ser setado"""
+    controller = AdmissionController("test-busy", max_concurrent=1, max_queue=1, queue_timeout_ms=50)
+    entered, release = threading.Event(), threading.Event()
+
+    def hold():
+        with controller.admit():
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    assert entered.wait(5)
+    yield controller, release
+    release.set()
+    thread.join()
+
+
+def test_full_queue_rejects_with_429(busy):
+    controller, release = busy
+    controller.queue_timeout = 5
+
+    def wait_in_queue():
+        with controller.admit():
+            pass
+
+    # Ocupa a única posição da fila
+    waiter = threading.Thread(target=wait_in_queue)
+    waiter.start()
+    while controller.stats()["waiting"] == 0:
+        pass
+    with pytest.raises(Overloaded) as exc:
+        with controller.admit():
+            pass
+    release.set()
+    waiter.join()
+    assert exc.value.status_code == 429 and exc.value.retry_after >= 1
+    assert controller.counters["rejected"] == 1
+
+
+def test_queue_timeout_returns_503(busy):
+    controller, _ = busy
+    with pytest.raises(Overloaded) as exc:
+        with controller.admit():
+            pass
+    assert exc.value.status_code == 503 and exc.value.retry_after >= 1
+    assert controller.counters["timedOut"] == 1 and controller.stats()["waiting"] == 0
+
+
+def test_overloaded_response_has_retry_after():
+    response = main.overloaded_handler(None, Overloaded("flan", 429, 7))
+    assert response.status_code == 429 and response.headers["Retry-After"] == "7"
+
+
+def test_expired_deadline_is_skipped_without_queueing(busy):
+    controller, _ = busy
+    with pytest.raises(DeadlineExceeded):
+        with controller.admit(Deadline(0)):
+            pass
+    stats = controller.stats()
+    assert stats["deadlineSkipped"] == 1 and stats["waiting"] == 0 and stats["admitted"] == 1
+
+
+def test_deadline_expiring_in_queue_is_skipped(busy):
+    controller, _ = busy
+    controller.queue_timeout = 5
+    with pytest.raises(DeadlineExceeded):
+        with controller.admit(Deadline(0.05)):
+            pass
+    assert controller.counters["deadlineSkipped"] == 1 and controller.counters["timedOut"] == 0
+
+
+def test_released_slot_admits_waiter(busy):
+    controller, release = busy
+    controller.queue_timeout = 5
+    threading.Timer(0.05, release.set).start()
+    with controller.admit(Deadline(5)):
+        assert controller.stats()["active"] == 1
+    assert controller.counters["admitted"] == 2
@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+
+import pytest
+
+import services
+from admission import Deadline, DeadlineExceeded, deadline_scope
+
+LETTER = "Prezados, " + "tenho experiência com Python e APIs. " * 3
+SHORT_RESUME = "Ana Souza\nDesenvolvedora Python com 5 anos de experiência."
+LONG_RESUME = SHORT_RESUME + " " + " ".join(f"Projeto {i} em produção com FastAPI." for i in range(6))
+JOB = "Vaga backend Python com FastAPI"
+
+
+class FakeEntry:
+    handle = None
+    tokenizer_handle = None
+
+    def __init__(self, name, timeout=False):
+        self.served_name = name
+        self.timeout = timeout
+
+    @contextmanager
+    def admit(self, deadline=None):
+        if self.timeout:
+            raise DeadlineExceeded(f"deadline insuficiente para '{self.served_name}'")
+        yield
+
+
+@pytest.fixture
+def models(monkeypatch):
+    def install(summarizer, generator, cover):
+        entries = {"summarizer": summarizer, "generator": generator}
+        monkeypatch.setattr(services, "selected_model", entries.__getitem__)
+        monkeypatch.setattr(services, "_entry_model", lambda entry: object())
+        monkeypatch.setattr(services, "_entry_tokenizer", lambda entry: object())
+        monkeypatch.setattr(services, "truncate_prompt", lambda text, tokenizer, max_tokens=400: text)
+        monkeypatch.setattr(services, "_generate", cover)
+    return install
+
+
+def _timeout(*args):
+    raise DeadlineExceeded("deadline expirou na fila de 'fake-generator'")
+
+
+def test_cover_timeout_falls_back_only_for_that_part(models):
+    models(FakeEntry("fake-summarizer"), FakeEntry("fake-generator"), _timeout)
+    with deadline_scope(Deadline(30)) as deadline:
+        application = services.generate_application(SHORT_RESUME, JOB)
+
+    parts = application["parts"]
+    assert parts["cover"] == {**parts["cover"], "status": "deadline", "fallback": True, "model": "programmatic"}
+    assert application["coverLetterMarkdown"] and application["model"] == "programmatic"
+    assert (parts["summary"]["status"], parts["summary"]["fallback"]) == ("passthrough", False)
+    assert parts["resume"]["status"] == parts["interview"]["status"] == "programmatic"
+    assert not any(parts[name]["fallback"] for name in ("summary", "resume", "interview"))
+    # Resposta degradada não entra no cache
+    assert deadline.degraded
+
+
+def test_summary_timeout_keeps_model_cover(models):
+    models(FakeEntry("fake-summarizer", timeout=True), FakeEntry("fake-generator"), lambda *args: (LETTER, False))
+    with deadline_scope(Deadline(30)):
+        application = services.generate_application(LONG_RESUME, JOB)
+
+    parts = application["parts"]
+    assert (parts["summary"]["status"], parts["summary"]["fallback"]) == ("deadline", True)
+    assert application["summary"]
+    assert parts["cover"] == {**parts["cover"], "status": "model", "fallback": False, "model": "fake-generator"}
+    assert application["coverLetterMarkdown"] == LETTER and application["model"] == "fake-generator"
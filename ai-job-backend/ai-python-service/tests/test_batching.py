@@ -0,0 +1,53 @@
+from concurrent.futures import Future
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def _echo(inputs, kwargs):
+    return [f"{item}!" for item in inputs]
+
+
+class BrokenDeadline:
+    @property
+    def expired(self):
+        raise RuntimeError("relógio quebrado")
+
+    def remaining(self):
+        return 1.0
+
+
+def test_loop_survives_unhashable_params():
+    batcher = MicroBatcher("test-unhashable", _echo, max_batch_size=4, max_wait_ms=1)
+    [future] = batcher.submit_many(["a"], stop=["\n"])
+    with pytest.raises(TypeError):
+        future.result(timeout=2)
+    assert batcher.submit("b") == "b!"
+
+
+def test_group_error_fails_its_futures_and_keeps_serving():
+    batcher = MicroBatcher("test-group-error", _echo, max_batch_size=4, max_wait_ms=1)
+    [future] = batcher.submit_many(["a"], deadline=BrokenDeadline())
+    with pytest.raises(RuntimeError, match="relógio"):
+        future.result(timeout=2)
+    assert batcher.submit("b") == "b!"
+
+
+def test_runner_error_reaches_every_caller():
+    def broken(inputs, kwargs):
+        raise ValueError("modelo caiu")
+
+    batcher = MicroBatcher("test-runner-error", broken, max_batch_size=4, max_wait_ms=20)
+    futures = batcher.submit_many(["a", "b"])
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=2)
+
+
+def test_cancelled_items_are_dropped():
+    batcher = MicroBatcher("test-dropped", _echo, max_batch_size=4, max_wait_ms=1)
+    future: Future = Future()
+    future.cancel()
+    batcher._run_group({}, [("a", future, None)])
+    assert batcher.stats()["dropped"] == 1
@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+RECORDS = [{"id": i, "resumeText": f"currículo {i}", "jobDescription": "vaga"} for i in range(1, 6)]
+
+
+@pytest.fixture
+def bulk(monkeypatch):
+    # bulk.py liga o carregamento eager na importação: mantém o ambiente dos outros testes intacto
+    monkeypatch.setenv("MODEL_LOAD_MODE", "lazy")
+    monkeypatch.setenv("JOB_WORKERS", "0")
+    import bulk
+    import services
+
+    monkeypatch.setattr(services, "start_model_loading", lambda: None)
+    return bulk
+
+
+@pytest.fixture
+def paths(tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    input_path.write_text("".join(json.dumps(record) + "\n" for record in RECORDS), encoding="utf-8")
+    return str(input_path), str(tmp_path / "out.jsonl")
+
+
+class Killed(BaseException):
+    pass
+
+
+def _functions(seen, kill_at=None):
+    def resume(pairs):
+        for index, (resume_text, _) in enumerate(pairs):
+            if resume_text == kill_at:
+                raise Killed()
+            seen.append(resume_text)
+            yield index, resume_text.upper(), None, "programmatic"
+    return lambda model: {"resume": resume}
+
+
+def _output(out_path):
+    with open(out_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_from_checkpoint(bulk, paths, monkeypatch):
+    input_path, out_path = paths
+    seen = []
+    monkeypatch.setattr(bulk, "_batch_functions", _functions(seen, kill_at="currículo 3"))
+    with pytest.raises(Killed):
+        bulk.run(input_path, out_path, ["resume"], chunk_size=2)
+    assert bulk.load_checkpoint(out_path)["records"] == 2
+
+    monkeypatch.setattr(bulk, "_batch_functions", _functions(seen))
+    summary = bulk.run(input_path, out_path, ["resume"], chunk_size=2)
+    # O primeiro bloco não é refeito
+    assert seen == [f"currículo {i}" for i in range(1, 6)]
+    assert (summary["records"], summary["errors"], summary["line"]) == (5, 0, 5)
+    assert [row["id"] for row in _output(out_path)] == [1, 2, 3, 4, 5]
+    assert _output(out_path)[2]["resume"] == {"result": "CURRÍCULO 3", "model": "programmatic", "error": None}
+
+
+def test_half_written_chunk_is_discarded(bulk, paths, monkeypatch):
+    input_path, out_path = paths
+    monkeypatch.setattr(bulk, "_batch_functions", _functions([]))
+    bulk.run(input_path, out_path, ["resume"], chunk_size=2)
+    checkpoint = bulk.load_checkpoint(out_path)
+    # Simula um kill no meio do terceiro bloco: saída com uma linha e meia além do checkpoint,
+    # checkpoint ainda no fim do segundo bloco
+    with open(out_path, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(out_path, "wb") as f:
+        f.write(b"".join(lines[:4]) + lines[4] + lines[4][:10])
+    bulk.save_checkpoint(out_path, {**checkpoint, "offset": _offset_after(input_path, 4), "line": 4,
+                                    "outputBytes": len(b"".join(lines[:4])), "records": 4})
+
+    summary = bulk.run(input_path, out_path, ["resume"], chunk_size=2)
+    assert summary["records"] == 5
+    assert [row["id"] for row in _output(out_path)] == [1, 2, 3, 4, 5]
+    assert os.path.getsize(out_path) == bulk.load_checkpoint(out_path)["outputBytes"]
+
+
+def _offset_after(path, lines):
+    with open(path, "rb") as f:
+        return sum(len(f.readline()) for _ in range(lines))
@@ -0,0 +1,76 @@
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pytest
+
+import services
+from admission import Overloaded
+
+LETTER = "Prezados, " + "tenho experiência com Python e APIs. " * 3
+
+
+class FakeBatcher:
+    def __init__(self, entry):
+        self.entry = entry
+
+    def submit_many(self, prompts, deadline=None, **params):
+        futures = []
+        for _ in prompts:
+            # A fila só recebe prompts de quem foi admitido no modelo
+            assert self.entry.in_use == 1
+            future = Future()
+            future.set_result({"generated_text": LETTER})
+            futures.append(future)
+        return futures
+
+
+class FakeEntry:
+    served_name = "fake-generator"
+    handle = None
+
+    def __init__(self, overloaded=False):
+        self.in_use = 0
+        self.overloaded = overloaded
+        self.batcher = FakeBatcher(self)
+
+    @contextmanager
+    def admit(self, deadline=None):
+        if self.overloaded:
+            raise Overloaded(self.served_name, 429, 1)
+        self.in_use += 1
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+
+
+@pytest.fixture
+def fake_generator(monkeypatch):
+    def install(entry):
+        monkeypatch.setattr(services.MODEL_REGISTRY, "resolve", lambda role, model=None: entry)
+        monkeypatch.setattr(services, "_entry_model", lambda entry: object())
+        monkeypatch.setattr(services, "_entry_tokenizer", lambda entry: object())
+        monkeypatch.setattr(services, "truncate_prompt", lambda text, tokenizer, max_tokens=400: text)
+        monkeypatch.setattr(services, "_record_model_tokens", lambda *args: None)
+        return entry
+    return install
+
+
+PAIRS = [("Ana\nPython 3 anos", "backend python"), ("Bruno\nJava 5 anos", "backend java")]
+
+
+def test_batch_holds_admission_until_consumed(fake_generator):
+    entry = fake_generator(FakeEntry())
+    items = services.generate_cover_letters_batch(PAIRS)
+    first = next(items)
+    assert entry.in_use == 1 and first[3] == "fake-generator"
+    rest = list(items)
+    assert entry.in_use == 0
+    assert sorted(index for index, *_ in [first] + rest) == [0, 1]
+
+
+def test_batch_without_admission_falls_back(fake_generator):
+    entry = fake_generator(FakeEntry(overloaded=True))
+    items = list(services.generate_cover_letters_batch(PAIRS))
+    assert [model for *_, model in items] == ["programmatic", "programmatic"]
+    assert entry.in_use == 0
@@ -0,0 +1,59 @@
+import pytest
+
+import decoding
+from decoding import DECODING_MIN_NEW_TOKENS, LatencyBudget, decoding_params, plan_decoding, throughput
+
+OVERHEAD, PER_TOKEN = 0.1, 0.01
+
+
+@pytest.fixture
+def model(request):
+    """Modelo com 100 tokens/s e 100 ms de overhead medidos"""
+    name = f"test-{request.node.name}"
+    for tokens in (50, 100, 200, 120):
+        throughput(name).observe(tokens, OVERHEAD + tokens * PER_TOKEN)
+    return name
+
+
+def test_estimator_separates_overhead_from_rate(model):
+    overhead, per_token = throughput(model).fit()
+    assert overhead == pytest.approx(OVERHEAD) and per_token == pytest.approx(PER_TOKEN)
+
+
+def test_no_budget_or_no_samples_runs_full_profile(model):
+    assert plan_decoding("summarize", model) == (decoding_params("summarize"), "full")
+    assert plan_decoding("summarize", "test-unmeasured", LatencyBudget(0.01)).kind == "full"
+
+
+def test_generous_budget_keeps_full_profile(model):
+    plan = plan_decoding("cover", model, LatencyBudget(60))
+    assert plan.kind == "full" and plan.params == decoding_params("cover")
+
+
+def test_beams_are_dropped_first(model, monkeypatch):
+    monkeypatch.setitem(decoding.DECODING_PROFILES, "beams", {"max_new_tokens": 100, "do_sample": False, "num_beams": 4})
+    # Guloso: 100 x 10 ms = 1 s cabe; 4 beams: 2,5 s não
+    plan = plan_decoding("beams", model, LatencyBudget(2.0))
+    assert plan.kind == "reduced"
+    assert "num_beams" not in plan.params and plan.params["max_new_tokens"] == 100
+
+
+def test_tight_budget_shrinks_tokens_and_turns_greedy(model):
+    # 1 s x 0,85 de segurança - 100 ms de overhead = 750 ms -> 75 tokens
+    plan = plan_decoding("summarize", model, LatencyBudget(1.0))
+    assert plan.kind == "reduced"
+    assert 70 <= plan.params["max_new_tokens"] <= 75
+    assert plan.params["min_new_tokens"] <= plan.params["max_new_tokens"] // 2
+    sampled = plan_decoding("cover", model, LatencyBudget(1.0)).params
+    assert sampled["do_sample"] is False and "temperature" not in sampled
+
+
+def test_exhausted_budget_keeps_minimum_tokens(model):
+    plan = plan_decoding("cover", model, LatencyBudget(0.01))
+    assert plan.params["max_new_tokens"] == DECODING_MIN_NEW_TOKENS
+
+
+def test_plan_shrinks_as_budget_tightens(model):
+    limits = [plan_decoding("cover", model, LatencyBudget(seconds)).params["max_new_tokens"]
+              for seconds in (10, 4, 2, 1, 0.5, 0.1)]
+    assert limits == sorted(limits, reverse=True) and limits[0] == 512 and limits[-1] == DECODING_MIN_NEW_TOKENS
@@ -0,0 +1,73 @@
+import time
+
+import job_index as job_index_module
+from job_index import JobIndex
+
+RESUME = "Desenvolvedor backend com Python, Django e AWS"
+
+
+def test_match_with_empty_last_rows():
+    # Vaga sem features (só stopwords) no fim do CSR não pode derrubar o /match
+    index = JobIndex(directory="")
+    index.add_many([("1", "Vaga Python Django AWS backend", None), ("2", "the and", None)])
+    matches = index.match(RESUME)
+    assert [match.id for match in matches] == ["1"]
+    assert matches[0].score > 0
+
+
+def test_match_with_empty_rows_in_the_middle():
+    index = JobIndex(directory="")
+    index.add_many([("1", "the and", None), ("2", "Vaga Python Django", None), ("3", "for with", None)])
+    assert [match.id for match in index.match(RESUME)] == ["2"]
+
+
+def test_add_replace_and_remove():
+    index = JobIndex(directory="")
+    index.add_many([("1", "Vaga Python Django AWS", "Backend"), ("2", "Vaga React TypeScript frontend", "Front")])
+    assert index.size == 2
+    index.add_many([("1", "Vaga Java Spring Kafka", "Backend Java")])
+    assert index.size == 2
+    assert "1" not in [match.id for match in index.match(RESUME)]
+    assert index.remove("2")
+    assert not index.remove("2")
+    assert index.size == 1
+    assert index.match("Frontend React TypeScript") == []
+
+
+def test_persist_and_reload(tmp_path):
+    index = JobIndex(directory="")
+    index.add_many([("1", "Vaga Python Django AWS", "Backend"), ("2", "the and", None),
+                    ("3", "Vaga React TypeScript", "Front")])
+    index.remove("3")
+    index.save(str(tmp_path))
+
+    reloaded = JobIndex(directory=str(tmp_path))
+    assert reloaded.size == 2
+    assert reloaded.stats()["memoryMapped"]
+    assert [(m.id, m.title) for m in reloaded.match(RESUME)] == [("1", "Backend")]
+    # Alterações depois do load continuam funcionando sobre os arrays mapeados
+    reloaded.add_many([("4", "Vaga Python FastAPI AWS", "API")])
+    assert {match.id for match in reloaded.match(RESUME)} == {"1", "4"}
+
+
+def test_autosave_is_debounced(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_index_module, "JOB_INDEX_SAVE_DELAY_SECONDS", 0.1)
+    index = JobIndex(directory=str(tmp_path))
+    saves = []
+    original_save = index.save
+    monkeypatch.setattr(index, "save", lambda directory=None: (saves.append(1), original_save(directory)))
+    for i in range(5):
+        index.add_many([(str(i), f"Vaga Python {i}", None)])
+    index.remove("0")
+    assert saves == []
+    time.sleep(0.4)
+    assert len(saves) == 1
+    assert JobIndex(directory=str(tmp_path)).size == 4
+
+
+def test_save_pending_flushes_scheduled_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_index_module, "JOB_INDEX_SAVE_DELAY_SECONDS", 60)
+    index = JobIndex(directory=str(tmp_path))
+    index.add_many([("1", "Vaga Python Django", None)])
+    index.save_pending()
+    assert JobIndex(directory=str(tmp_path)).size == 1
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+
+import anyio
+import pytest
+
+import job_queue as job_queue_module
+from job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue, RetryLater
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=1)
+    yield queue
+    queue.stop()
+
+
+def _wait_finished(queue, job_id, timeout=5.0):
+    job = queue.wait(job_id, timeout)
+    assert job["status"] in (DONE, FAILED), job
+    return job
+
+
+def test_submit_deduplicates_pending_and_done_but_not_failed(queue):
+    job, deduplicated = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    assert not deduplicated and job["status"] == QUEUED
+    again, deduplicated = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    assert deduplicated and again["id"] == job["id"]
+
+    assert queue._claim()["id"] == job["id"]
+    queue._finish(job["id"], FAILED, error="boom")
+    retried, deduplicated = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    assert not deduplicated and retried["id"] != job["id"]
+
+
+def test_worker_runs_job(queue):
+    queue.start(lambda kind, payload: ({"echo": payload["resumeText"]}, "programmatic"))
+    job, _ = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    done = _wait_finished(queue, job["id"])
+    assert done["status"] == DONE and done["result"] == {"echo": "a"} and done["attempts"] == 1
+
+
+def test_recover_only_requeues_expired_leases(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    live, crashed = JobQueue(db_path=path, workers=0), JobQueue(db_path=path, workers=0)
+    live_job, _ = live.submit("summarize", {"resumeText": "a"}, "hash-a")
+    crashed_job, _ = crashed.submit("summarize", {"resumeText": "b"}, "hash-b")
+    assert live._claim()["id"] == live_job["id"]
+    assert crashed._claim()["id"] == crashed_job["id"]
+    # A réplica que caiu não renova mais o lease
+    with crashed._lock:
+        crashed._db().execute("UPDATE jobs SET lease_until = ? WHERE id = ?", (time.time() - 1, crashed_job["id"]))
+
+    restarted = JobQueue(db_path=path, workers=0)
+    restarted._recover()
+    assert restarted.get(live_job["id"])["status"] == RUNNING
+    assert restarted.get(crashed_job["id"])["status"] == QUEUED
+
+
+def test_expired_lease_cannot_overwrite_reclaimed_job(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    slow, other = JobQueue(db_path=path, workers=0), JobQueue(db_path=path, workers=0)
+    job, _ = slow.submit("summarize", {"resumeText": "a"}, "hash-a")
+    assert slow._claim()["id"] == job["id"]
+    # O dono travou sem renovar: outra réplica recupera e pega o job
+    with slow._lock:
+        slow._db().execute("UPDATE jobs SET lease_until = ? WHERE id = ?", (time.time() - 1, job["id"]))
+    other._recover()
+    assert other._claim()["id"] == job["id"]
+
+    assert not slow._finish(job["id"], DONE, {"stale": True}, "programmatic")
+    current = other.get(job["id"])
+    assert current["status"] == RUNNING and current["owner"] == other.owner and current["result"] is None
+    assert other._finish(job["id"], DONE, {"fresh": True}, "programmatic")
+    assert other.get(job["id"])["result"] == {"fresh": True}
+
+
+def test_wait_async_does_not_hold_threads(queue):
+    release = threading.Event()
+    queue.start(lambda kind, payload: (release.wait(5) and {"ok": True}, "programmatic"))
+    job, _ = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    results = []
+
+    async def waiter():
+        results.append(await queue.wait_async(job["id"], 5))
+
+    async def main():
+        async with anyio.create_task_group() as group:
+            # Mais esperas que o limite de threads do anyio (40): com threads presas o job nunca seria lido
+            for _ in range(60):
+                group.start_soon(waiter)
+            await anyio.sleep(0.2)
+            release.set()
+
+    anyio.run(main)
+    assert len(results) == 60
+    assert all(job["status"] == DONE and job["result"] == {"ok": True} for job in results)
+
+
+def test_heartbeat_renews_lease(queue, monkeypatch):
+    monkeypatch.setattr(job_queue_module, "JOB_LEASE_SECONDS", 0.3)
+    release = threading.Event()
+    queue.start(lambda kind, payload: (release.wait(5), "programmatic"))
+    job, _ = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    queue.wait(job["id"], 2, changed_from=QUEUED)
+    time.sleep(0.6)
+    other = JobQueue(db_path=queue.db_path, workers=0)
+    other._recover()
+    assert other.get(job["id"])["status"] == RUNNING
+    release.set()
+    assert _wait_finished(queue, job["id"])["status"] == DONE
+
+
+def test_job_gets_max_attempts_real_runs(queue, monkeypatch):
+    monkeypatch.setattr(job_queue_module, "JOB_MAX_ATTEMPTS", 3)
+    job, _ = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    runs = []
+    for _ in range(3):
+        # Simula o processo caindo no meio da execução: o claim conta, o job não termina
+        claimed = queue._claim()
+        runs.append(claimed["attempts"])
+        with queue._lock:
+            queue._db().execute("UPDATE jobs SET status = ?, lease_until = NULL WHERE id = ?", (QUEUED, job["id"]))
+    assert runs == [1, 2, 3]
+    queue._runner = lambda kind, payload: ("ok", "programmatic")
+    queue._run(queue._claim())
+    failed = queue.get(job["id"])
+    assert failed["status"] == FAILED and "3 tentativas" in failed["error"]
+
+
+def test_third_attempt_still_runs(queue, monkeypatch):
+    monkeypatch.setattr(job_queue_module, "JOB_MAX_ATTEMPTS", 3)
+    job, _ = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    for _ in range(2):
+        queue._claim()
+        with queue._lock:
+            queue._db().execute("UPDATE jobs SET status = ? WHERE id = ?", (QUEUED, job["id"]))
+    queue._runner = lambda kind, payload: ("ok", "programmatic")
+    queue._run(queue._claim())
+    assert queue.get(job["id"])["status"] == DONE
+
+
+def test_retry_later_requeues_with_backoff(queue, monkeypatch):
+    monkeypatch.setattr(job_queue_module, "JOB_RETRY_BASE_SECONDS", 0.2)
+    calls = []
+
+    def runner(kind, payload):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise RetryLater("modelo ocupado")
+        return "ok", "programmatic"
+
+    queue.start(runner)
+    job, _ = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    done = _wait_finished(queue, job["id"], timeout=10)
+    assert done["status"] == DONE and done["retries"] == 2
+    # Reenfileiramentos não gastam tentativas
+    assert done["attempts"] == 1
+    assert calls[1] - calls[0] >= 0.2 and calls[2] - calls[1] >= 0.4
+
+
+def test_worker_survives_errors_while_finishing(queue, monkeypatch):
+    original_finish = queue._finish
+    failures = []
+
+    def flaky_finish(*args, **kwargs):
+        if not failures:
+            failures.append(1)
+            raise job_queue_module.sqlite3.OperationalError("database is locked")
+        return original_finish(*args, **kwargs)
+
+    monkeypatch.setattr(queue, "_finish", flaky_finish)
+    queue.start(lambda kind, payload: ("ok", "programmatic"))
+    first, _ = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    second, _ = queue.submit("summarize", {"resumeText": "b"}, "hash-b")
+    assert _wait_finished(queue, second["id"])["status"] == DONE
+    assert queue.get(first["id"])["status"] == RUNNING
+
+
+def test_no_workers_only_enqueues(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=0)
+    queue.start(lambda kind, payload: ("ok", "programmatic"))
+    job, _ = queue.submit("summarize", {"resumeText": "a"}, "hash-a")
+    time.sleep(0.2)
+    assert queue.stats()["workers"] == 0
+    assert queue.get(job["id"])["status"] == QUEUED
+
+
+def test_default_db_path_does_not_depend_on_cwd():
+    assert os.path.isabs(job_queue_module.JOB_QUEUE_DB) or "JOB_QUEUE_DB" in os.environ
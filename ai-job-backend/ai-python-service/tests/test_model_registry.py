@@ -0,0 +1,94 @@
+import threading
+
+from admission import AdmissionController
+from batching import MicroBatcher
+from model_handles import PENDING, READY, ModelHandle
+from model_registry import ModelEntry, ModelRegistry
+
+
+class FakeTensor:
+    def __init__(self, mb):
+        self.mb = mb
+
+    def numel(self):
+        return self.mb * 2 ** 20
+
+    def element_size(self):
+        return 1
+
+
+class FakeModel:
+    def __init__(self, mb):
+        self.weights = [FakeTensor(mb)]
+
+    def parameters(self):
+        return self.weights
+
+    def buffers(self):
+        return []
+
+
+class FakePipeline:
+    def __init__(self, mb):
+        self.model = FakeModel(mb)
+
+
+def _entry(name, mb=10, default=False):
+    handle = ModelHandle(name, lambda: FakePipeline(mb))
+    return ModelEntry(name, "generator", "text2text-generation", handle, ModelHandle(f"{name}-tok", lambda: object()),
+                      MicroBatcher(name, lambda inputs, kwargs: inputs), AdmissionController(name), default=default)
+
+
+def test_default_entry_is_never_evicted():
+    registry = ModelRegistry(budget_mb=15)
+    default = registry.register(_entry("padrao", default=True))
+    extra = registry.register(_entry("extra"))
+    default.handle.load()
+    extra.handle.load()
+    # Carregado por último, "padrao" é o menos usado e sairia pela ordem LRU
+    other = registry.register(_entry("outro"))
+    other.handle.load()
+
+    assert default.pinned
+    assert default.handle.state == READY and not default.handle.unloaded
+    assert default.evictions == 0
+    assert extra.handle.state == PENDING and extra.evictions == 1
+
+
+def test_admission_in_progress_blocks_eviction():
+    registry = ModelRegistry(budget_mb=15)
+    busy = registry.register(_entry("ocupado"))
+    busy.handle.load()
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with busy.admit():
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    assert entered.wait(5)
+    registry.register(_entry("novo")).handle.load()
+    assert busy.handle.state == READY and busy.evictions == 0
+    release.set()
+    thread.join()
+
+
+def test_eviction_holds_use_lock():
+    registry = ModelRegistry(budget_mb=15)
+    victim = registry.register(_entry("vitima"))
+    victim.handle.load()
+    seen = []
+    evict = registry.evict
+
+    def checked_evict(entry):
+        # Uma admissão concorrente não conseguiria incrementar in_use aqui
+        seen.append(entry._use_lock.locked())
+        evict(entry)
+
+    registry.evict = checked_evict
+    registry.register(_entry("novo")).handle.load()
+    assert seen == [True]
+    assert victim.handle.state == PENDING
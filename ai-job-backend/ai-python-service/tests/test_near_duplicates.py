@@ -0,0 +1,32 @@
+from near_duplicates import NEAR_DUP_ENDPOINTS, NearDuplicateIndex, near_namespace
+
+RESUME = "\n".join([
+    "Maria Silva",
+    "Desenvolvedora Python com 5 anos de experiência em backend e dados",
+    "- 2020 2023 Backend @ Acme: APIs REST com FastAPI, PostgreSQL e AWS",
+    "- Liderou a migração de monólito para microsserviços com Docker e Kubernetes",
+    "- Reduziu a latência das APIs em 40% com cache e filas assíncronas",
+    "- Implementou pipelines de CI/CD com GitHub Actions e testes automatizados",
+    "Bacharel em Ciência da Computação pela Universidade Federal",
+])
+JAVA_JOB = "engenheiro Java com Spring Boot e Kubernetes"
+DATA_JOB = "cientista de dados com Python, PyTorch e SQL"
+
+
+def test_same_resume_different_job_is_not_reused():
+    index = NearDuplicateIndex()
+    index.add(near_namespace("summarize", "m", {}, JAVA_JOB), RESUME, "resultado java")
+    assert index.lookup(near_namespace("summarize", "m", {}, DATA_JOB), RESUME) is None
+
+
+def test_edited_resume_same_job_is_reused():
+    index = NearDuplicateIndex()
+    index.add(near_namespace("summarize", "m", {}, JAVA_JOB), RESUME, "resultado java")
+    typo = RESUME.replace("Desenvolvedora", "Desenvolvdora")
+    # Espaços a mais na vaga não mudam o namespace (mesma normalização do cache exato)
+    match = index.lookup(near_namespace("summarize", "m", {}, JAVA_JOB + "  \n"), typo)
+    assert match is not None and match.value == "resultado java" and match.similarity >= 0.9
+
+
+def test_programmatic_endpoints_are_not_near_matched():
+    assert "interview" not in NEAR_DUP_ENDPOINTS
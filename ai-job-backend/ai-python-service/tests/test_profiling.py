@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+
+
+def _client(monkeypatch, tmp_path, enabled, token):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", enabled)
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", token)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    app = FastAPI()
+    profiling.install_profiling(app)
+
+    @app.get("/work")
+    def work():
+        return {"total": sum(range(1000))}
+
+    return TestClient(app)
+
+
+def _admin_paths(client):
+    return [route.path for route in client.app.routes if route.path.startswith("/admin")]
+
+
+def test_disabled_registers_no_admin_routes(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path, False, "s3cret")
+    assert _admin_paths(client) == []
+    assert client.get("/admin/profiles", headers={"X-Profile-Token": "s3cret"}).status_code == 404
+    assert "X-Profile-Id" not in client.get("/work", headers={"X-Profile": "s3cret"}).headers
+
+
+def test_empty_token_refuses_header_and_admin(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path, True, "")
+    assert _admin_paths(client) == []
+    assert "X-Profile-Id" not in client.get("/work", headers={"X-Profile": "anything"}).headers
+    assert not profiling.token_valid("")
+    assert not profiling.token_valid(None)
+
+
+@pytest.mark.parametrize("header, profiled", [("s3cret", True), ("wrong", False)])
+def test_header_needs_matching_token(monkeypatch, tmp_path, header, profiled):
+    client = _client(monkeypatch, tmp_path, True, "s3cret")
+    response = client.get("/work", headers={"X-Profile": header})
+    assert response.status_code == 200
+    assert ("X-Profile-Id" in response.headers) == profiled
+
+
+def test_admin_routes_with_token(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path, True, "s3cret")
+    profile_id = client.get("/work", headers={"X-Profile": "s3cret"}).headers["X-Profile-Id"]
+    assert client.get("/admin/profiles").status_code == 403
+    listed = client.get("/admin/profiles", headers={"X-Profile-Token": "s3cret"}).json()["profiles"]
+    assert [profile["id"] for profile in listed] == [profile_id]
+    text = client.get(f"/admin/profiles/{profile_id}?format=text", headers={"X-Profile-Token": "s3cret"})
+    assert text.status_code == 200 and "function calls" in text.text
@@ -0,0 +1,67 @@
+import pytest
+
+import quantization
+from quantization import QUANTIZATION_REPORTS, apply_precision, model_precision
+
+
+class FakeModel:
+    def __init__(self, size_mb):
+        self.size_mb = size_mb
+        self.evaluated = False
+
+    def eval(self):
+        self.evaluated = True
+
+
+class FakePipeline:
+    def __init__(self):
+        self.model = FakeModel(100.0)
+
+    def __call__(self, text, do_sample=False):
+        suffix = "." if self.model.size_mb < 100 else ""
+        return [{"summary_text": "resumo do currículo" + suffix}]
+
+
+@pytest.fixture
+def fake_torch(monkeypatch):
+    # Sem torch aqui: conversão e tamanho do state_dict simulados
+    monkeypatch.setattr(quantization, "model_size_mb", lambda model: model.size_mb)
+    monkeypatch.setattr(quantization, "_convert", lambda model, precision: FakeModel(model.size_mb / 4))
+
+
+def test_fp32_is_a_no_op(fake_torch):
+    pipe = FakePipeline()
+    model = pipe.model
+    assert apply_precision(pipe, "summarization", "fp32-model", "fp32") is pipe
+    assert pipe.model is model and "fp32-model" not in QUANTIZATION_REPORTS
+
+
+def test_report_with_accuracy_check(fake_torch, monkeypatch):
+    monkeypatch.setattr(quantization, "QUANTIZATION_CHECK", True)
+    pipe = apply_precision(FakePipeline(), "summarization", "int8-model", "int8")
+    assert pipe.model.evaluated
+    report = QUANTIZATION_REPORTS.pop("int8-model")
+    assert (report["precision"], report["sizeMbBefore"], report["sizeMbAfter"]) == ("int8", 100.0, 25.0)
+    check = report["check"]
+    assert check["fp32Output"] == "resumo do currículo" and check["quantizedOutput"] == "resumo do currículo."
+    assert 0.9 < check["similarity"] < 1
+
+
+def test_int8_with_bf16_is_rejected():
+    with pytest.raises(ValueError):
+        model_precision("google/flan-t5-large", "int8+bf16")
+
+
+def test_per_model_override(monkeypatch):
+    monkeypatch.setenv("GOOGLE_FLAN_T5_LARGE_PRECISION", "int8")
+    assert model_precision("google/flan-t5-large", "bf16") == "int8"
+    assert model_precision("facebook/bart-large-cnn", "bf16") == "bf16"
+    monkeypatch.setattr(quantization, "INFERENCE_PRECISION", "fp32")
+    assert model_precision("facebook/bart-large-cnn") == "fp32"
+
+
+def test_int8_keeps_fp32_activations():
+    torch = pytest.importorskip("torch")
+    model = torch.nn.Sequential(torch.nn.Linear(8, 8), torch.nn.ReLU(), torch.nn.Linear(8, 2))
+    quantized = quantization._convert(model, "int8")
+    assert quantized(torch.randn(3, 8)).dtype == torch.float32
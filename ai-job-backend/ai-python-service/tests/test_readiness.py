@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+import services
+from model_handles import FAILED, PENDING, READY, ModelHandle
+
+
+def _handles(**states):
+    return [SimpleNamespace(name=name, state=state, settled=state in (READY, FAILED), unloaded=False)
+            for name, state in states.items()]
+
+
+@pytest.fixture
+def warmed(monkeypatch):
+    monkeypatch.setattr(services, "MODEL_LOAD_MODE", "background")
+    monkeypatch.setattr(services, "warmup_report", SimpleNamespace(finished=True))
+    monkeypatch.setattr(services, "READY_REQUIRED_MODELS", set())
+
+
+def test_not_ready_while_loading_at_startup(monkeypatch, warmed):
+    monkeypatch.setattr(services, "MODEL_HANDLES", _handles(summarizer=READY, generator=PENDING))
+    assert services.readiness() == (False, [])
+
+
+def test_partial_failure_is_ready_by_default(monkeypatch, warmed):
+    monkeypatch.setattr(services, "MODEL_HANDLES", _handles(summarizer=READY, generator=FAILED))
+    assert services.readiness() == (True, [])
+
+
+def test_all_failed_is_not_ready(monkeypatch, warmed):
+    monkeypatch.setattr(services, "MODEL_HANDLES", _handles(summarizer=FAILED, generator=FAILED))
+    assert services.readiness() == (False, ["summarizer", "generator"])
+
+
+def test_required_model_failed_is_not_ready(monkeypatch, warmed):
+    monkeypatch.setattr(services, "MODEL_HANDLES", _handles(summarizer=READY, generator=FAILED))
+    monkeypatch.setattr(services, "READY_REQUIRED_MODELS", {"generator"})
+    assert services.readiness() == (False, ["generator"])
+
+
+def test_lazy_mode_is_ready_before_first_use(monkeypatch, warmed):
+    monkeypatch.setattr(services, "MODEL_LOAD_MODE", "lazy")
+    monkeypatch.setattr(services, "warmup_report", SimpleNamespace(finished=True))
+    handles = [ModelHandle("summarizer", lambda: object()), ModelHandle("generator", lambda: None)]
+    monkeypatch.setattr(services, "MODEL_HANDLES", handles)
+    assert services.readiness() == (True, [])
+    handles[0].load()
+    handles[1].load()
+    # Um modelo lazy que falhou no primeiro uso conta como falha normal
+    assert services.readiness() == (True, [])
+    monkeypatch.setattr(services, "READY_REQUIRED_MODELS", {"generator"})
+    assert services.readiness() == (False, ["generator"])
+
+
+def test_evicted_handle_does_not_flip_readiness(monkeypatch, warmed):
+    handle = ModelHandle("summarizer", lambda: object())
+    handle.load()
+    handle.unload()
+    monkeypatch.setattr(services, "MODEL_HANDLES", [handle])
+    assert handle.state == PENDING
+    assert services.readiness() == (True, [])
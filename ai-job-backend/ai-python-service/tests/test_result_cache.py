@@ -0,0 +1,29 @@
+import pytest
+
+from result_cache import ResultCache, _SQLiteTier
+
+
+def test_caches_sharing_a_file_keep_separate_tables(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    results = ResultCache(max_entries=10, db_path=path, db_max_entries=5)
+    chunks = ResultCache(max_entries=10, db_path=path, db_max_entries=5, db_table="summary_chunks")
+    results.store("same-key", "result")
+    chunks.store("same-key", "chunk")
+    assert ResultCache(db_path=path).lookup("same-key") == "result"
+    assert ResultCache(db_path=path, db_table="summary_chunks").lookup("same-key") == "chunk"
+
+
+def test_eviction_limit_applies_per_table(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    results = _SQLiteTier(path, max_entries=2)
+    chunks = _SQLiteTier(path, max_entries=2, table="summary_chunks")
+    for i in range(5):
+        results.put(f"r{i}", 1e12, ["r"])
+    chunks.put("c0", 1e12, ["c"])
+    assert results.evict(ttl_seconds=1e12) == 3
+    assert (len(results), len(chunks)) == (2, 1)
+
+
+def test_invalid_table_name(tmp_path):
+    with pytest.raises(ValueError):
+        _SQLiteTier(str(tmp_path / "cache.sqlite3"), max_entries=1, table="results; DROP TABLE x")
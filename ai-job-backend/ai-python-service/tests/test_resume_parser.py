@@ -0,0 +1,118 @@
+import re
+from typing import List, Optional
+
+import pytest
+
+from bench.corpus import corpus
+from resume_parser import ParsedResume, parse_resume, split_sentences
+
+# Corpus fixo do benchmark (pt/en, 1 a 5 páginas) mais casos de borda das seções
+CORPUS = [text for _, text, _ in corpus([1, 2, 5], per_size=4)] + [
+    "",
+    "Ana\nProjetos Relevantes\n- API: serviço\nCertificações\n- AWS\n- GCP\nFormação\nUniversidade X",
+    "Bruno\nCertificações\n- CKA\nHabilidades\n- Python: linguagem\nProjetos relevantes\n- Bot: chat\n- ETL: dados\n"
+    "- Web: site\n- Extra: ignorado\nHabilidades\n- Go: linguagem",
+    "Carla\nGraduação em 2015 na faculdade\n2019–presente: Dev @ Empresa\n2015-2019 : Analista\n10 years of Java",
+]
+
+
+# -------------------------
+# Extratores anteriores ao parser de passada única (referência da paridade)
+# -------------------------
+def _old_sentences(text: str) -> List[str]:
+    s = re.split(r'(?<=[\.\?\!])\s+', text)
+    return [seg.strip() for seg in s if seg.strip()]
+
+
+def _old_roles(text: str) -> List[str]:
+    patterns = ["desenvolvedor", "desenvolvedora", "analista", "engenheiro", "cientista", "gerente", "coordenador"]
+    return [p for p in patterns if re.search(r'\b' + re.escape(p) + r'\b', text, flags=re.IGNORECASE)]
+
+
+def _old_projects(text: str) -> List[str]:
+    projects = []
+    in_projects_section = False
+    for line in text.split('\n'):
+        line = line.strip()
+        if 'projeto' in line.lower() and 'relevante' in line.lower():
+            in_projects_section = True
+            continue
+        elif in_projects_section and line.startswith('- ') and ':' in line:
+            projects.append(line[2:])
+        elif in_projects_section and (line.startswith('Formação') or line.startswith('Habilidades')):
+            in_projects_section = False
+    return projects[:3]
+
+
+def _old_years(text: str) -> Optional[str]:
+    m = re.search(r'(\d+)\s*(anos|anos de|year|years)', text, flags=re.IGNORECASE)
+    return f"{m.group(1)} anos" if m else None
+
+
+def _old_experience_lines(text: str) -> List[str]:
+    return [line.strip() for line in text.split('\n')
+            if re.search(r'20\d{2}[–\-−]\s*(presente|20\d{2})\s*:', line.strip())]
+
+
+def _old_education(text: str) -> Optional[str]:
+    match = re.search(r'(bacharel|graduação|universidade|faculdade)[^0-9]*(\d{4})', text, re.IGNORECASE)
+    if match:
+        return match.group(0).strip()
+    for line in text.split('\n'):
+        if any(word in line.lower() for word in ['universidade', 'faculdade', 'bacharel', 'graduação']):
+            return line.strip()
+    return None
+
+
+def _old_certifications(text: str) -> List[str]:
+    certs = []
+    in_cert_section = False
+    for line in text.split('\n'):
+        line = line.strip()
+        if 'certificaç' in line.lower():
+            in_cert_section = True
+            continue
+        elif in_cert_section and line.startswith('- '):
+            certs.append(line[2:])
+        elif in_cert_section and line and not line.startswith('- '):
+            in_cert_section = False
+    return certs
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_parity_with_previous_extractors(text):
+    # Tecnologias ficam de fora: a taxonomia trocou de propósito o casamento por substring
+    parsed = parse_resume(text)
+    assert list(parsed.roles) == _old_roles(text)
+    assert list(parsed.projects) == _old_projects(text)
+    assert parsed.years == _old_years(text)
+    assert list(parsed.experience_lines) == _old_experience_lines(text)
+    assert parsed.education == _old_education(text)
+    assert list(parsed.certifications) == _old_certifications(text)
+    assert list(parsed.sentences) == _old_sentences(text) == split_sentences(text)
+
+
+def test_corpus_exercises_every_field():
+    parsed = [parse_resume(text) for text in CORPUS]
+    for field in ("roles", "projects", "years", "experience_lines", "education", "certifications"):
+        assert any(getattr(p, field) for p in parsed), field
+
+
+def test_parsed_resume_is_immutable_and_shared():
+    text = CORPUS[0]
+    parsed = parse_resume(text)
+    assert parse_resume(text) is parsed
+    with pytest.raises(AttributeError):
+        parsed.name = "Outro"
+    with pytest.raises(AttributeError):
+        del parsed.techs
+    with pytest.raises(AttributeError):
+        parsed.extra = 1
+    with pytest.raises(TypeError):
+        parsed.sections["resumo"] = (0, 1)
+    # Coleções são tuplas: quem lê não altera o resultado memorizado dos outros endpoints
+    for field in ("lines", "techs", "tech_matches", "roles", "experience_lines", "projects", "certifications",
+                  "sentences", "key_sentences"):
+        assert isinstance(getattr(parsed, field), tuple), field
+    assert not hasattr(parsed, "__dict__")
+    assert isinstance(parsed, ParsedResume)
@@ -0,0 +1,72 @@
+import threading
+
+import anyio
+import pytest
+
+import main
+from streaming import stream_generate
+
+
+class FakeRequest:
+    """Cliente que desconecta depois de receber ``after`` eventos"""
+
+    def __init__(self, after):
+        self.after = after
+        self.checks = 0
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.checks >= self.after
+
+
+def test_sse_disconnect_sets_cancel_and_stops_consuming():
+    cancel = threading.Event()
+    produced = []
+
+    def events():
+        for i in range(100):
+            if cancel.is_set():
+                return
+            produced.append(i)
+            yield "token", f"t{i} "
+
+    async def consume():
+        return [chunk async for chunk in main._sse(events(), cancel, FakeRequest(after=2))]
+
+    sent = anyio.run(consume)
+    assert cancel.is_set()
+    assert len(sent) == 2 and len(produced) == 2
+
+
+def test_cancel_stops_generation_through_stopping_criteria():
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+
+    class Tokenizer:
+        def decode(self, ids, **kwargs):
+            return "".join(f"w{i} " for i in ids)
+
+    class Pipe:
+        """Laço de decodificação como o do generate: consulta os critérios de parada a cada passo"""
+        tokenizer = Tokenizer()
+        steps = 0
+
+        def __call__(self, prompt, streamer, stopping_criteria, **kwargs):
+            input_ids = torch.tensor([[1, 2, 3]])
+            streamer.put(input_ids)
+            for step in range(1000):
+                if stopping_criteria(input_ids, None):
+                    break
+                Pipe.steps += 1
+                input_ids = torch.cat([input_ids, torch.tensor([[step]])], dim=1)
+                streamer.put(torch.tensor([step]))
+            streamer.end()
+
+    cancel = threading.Event()
+    chunks = []
+    for chunk in stream_generate(Pipe(), "prompt", cancel):
+        chunks.append(chunk)
+        if len(chunks) == 3:
+            cancel.set()
+    assert Pipe.steps < 1000
+    assert cancel.is_set()
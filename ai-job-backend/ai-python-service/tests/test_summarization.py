@@ -0,0 +1,55 @@
+from summarization import chunk_cache, chunk_text, map_reduce_summary, summarize_chunks
+
+
+def test_chunk_cache_key_includes_precision():
+    calls = []
+
+    def summarize_many(chunks):
+        calls.append(list(chunks))
+        return [chunk.upper() for chunk in chunks]
+
+    chunks = ["pedaço de teste de precisão"]
+    assert summarize_chunks(chunks, summarize_many, "model", {}, precision="fp32") == ["PEDAÇO DE TESTE DE PRECISÃO"]
+    summarize_chunks(chunks, summarize_many, "model", {}, precision="fp32")
+    assert len(calls) == 1
+    summarize_chunks(chunks, summarize_many, "model", {}, precision="int8")
+    assert len(calls) == 2
+
+
+def _long_resume(seed: int):
+    import random
+
+    rng = random.Random(seed)
+    words = "python api docker kubernetes dados modelo equipe cliente projeto sistema latência testes".split()
+    return [f"- {' '.join(rng.choice(words) for _ in range(rng.randint(8, 25)))}." for _ in range(60)]
+
+
+def test_chunk_boundaries_survive_an_edit():
+    lines = _long_resume(1)
+    before = chunk_text("\n".join(lines), None, 200, 50)
+    lines[1] += " Também liderou a equipe."
+    after = chunk_text("\n".join(lines), None, 200, 50)
+    assert len(set(after) - set(before)) <= 2
+    assert len(after) >= 10
+
+
+def test_edited_resume_only_resummarizes_changed_chunks():
+    lines = _long_resume(2)
+    summarized = []
+
+    def summarize_many(chunks):
+        summarized.extend(chunks)
+        return [chunk[:40] for chunk in chunks]
+
+    def run(text):
+        summarized.clear()
+        map_reduce_summary(text, None, summarize_many, "model", {}, chunk_tokens=200, overlap_tokens=50,
+                           reduce_strategy="concat")
+        return len(summarized)
+
+    first = run("\n".join(lines))
+    hits = chunk_cache.stats()["hits"]
+    lines[30] = lines[30].replace("python", "java") + " Mais uma frase."
+    edited = run("\n".join(lines))
+    assert first >= 10 and 1 <= edited <= 2
+    assert chunk_cache.stats()["hits"] - hits >= first - 2
@@ -0,0 +1,41 @@
+from tech_taxonomy import TAXONOMY, TechTaxonomy
+
+
+def test_compound_emits_both_parents():
+    assert TAXONOMY.extract("Experiência com AWS S3 e AWS Lambda") == ["AWS", "S3", "Lambda"]
+    assert TAXONOMY.extract("Amazon S3") == ["S3"]
+
+
+def test_single_letter_languages_need_context():
+    assert TAXONOMY.extract("Nível C de inglês") == []
+    assert TAXONOMY.extract("R e Python") == ["Python"]
+    assert TAXONOMY.extract("linguagem C e linguagem R") == ["C", "R"]
+    assert TAXONOMY.extract("C/C++") == ["C++", "C"]
+    assert TAXONOMY.extract("C++ e C#") == ["C#", "C++"]
+
+
+def test_short_alias_does_not_match_after_dot():
+    assert TAXONOMY.extract("Express.js e Node.js") == ["Node.js", "Express"]
+    assert TAXONOMY.extract("js e React.js") == ["JavaScript", "React"]
+
+
+def test_version_suffix():
+    assert TAXONOMY.extract("python3.11") == ["Python"]
+    assert TAXONOMY.extract("Python 3.11 e Java8") == ["Python", "Java"]
+    match = TAXONOMY.find("usa python3.11 hoje")[0]
+    assert (match.start, match.end) == (4, 14)
+
+
+def test_token_boundaries():
+    assert TAXONOMY.extract("Go is good") == ["Go"]
+    assert TAXONOMY.extract("Vue.js") == ["Vue.js"]
+    assert TAXONOMY.extract("PostgreSQL") == ["Postgres"]
+    assert TAXONOMY.extract("ASP.NET") == [".NET"]
+
+
+def test_match_name_false_keeps_skill_in_catalog():
+    taxonomy = TechTaxonomy(["languages"], [{"name": "C", "category": "languages", "aliases": ["ANSI C"],
+                                             "matchName": False}])
+    assert taxonomy.names == ["C"]
+    assert taxonomy.extract("C") == []
+    assert taxonomy.extract("ANSI C") == ["C"]
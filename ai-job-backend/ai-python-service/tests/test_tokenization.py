@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import pytest
+
+import batching
+from batching import pipeline_runner
+from tokenization import accepts_token_ids, truncate_tokens
+
+PAD, EOS = 0, 1
+
+
+class FakeTensor(list):
+    def to(self, device):
+        return self
+
+
+class FakeTokenizer:
+    """Tokenizer por palavra no formato HF: lento, com </s> no fim e limpeza de espaços antes da pontuação"""
+    is_fast = False
+    name_or_path = "fake"
+
+    def __init__(self):
+        self.vocab = {"<pad>": PAD, "</s>": EOS}
+
+    def _id(self, word):
+        return self.vocab.setdefault(word, len(self.vocab))
+
+    def num_special_tokens_to_add(self):
+        return 1
+
+    def encode(self, text, add_special_tokens=True, truncation=False, max_length=None):
+        ids = [self._id(word) for word in text.split()]
+        if truncation and max_length:
+            ids = ids[:max_length - 1]
+        return ids + [EOS] if add_special_tokens else ids
+
+    def decode(self, ids, skip_special_tokens=False, clean_up_tokenization_spaces=False):
+        words = {i: w for w, i in self.vocab.items()}
+        text = " ".join(words[i] for i in ids if not (skip_special_tokens and i in (PAD, EOS)))
+        return text.replace(" .", ".").replace(" ,", ",") if clean_up_tokenization_spaces else text
+
+    def batch_decode(self, sequences, **kwargs):
+        return [self.decode(ids, **kwargs) for ids in sequences]
+
+    def pad(self, features, return_tensors=None):
+        rows = features["input_ids"]
+        width = max(len(row) for row in rows)
+        return {"input_ids": FakeTensor(row + [PAD] * (width - len(row)) for row in rows),
+                "attention_mask": FakeTensor([1] * len(row) + [0] * (width - len(row)) for row in rows)}
+
+
+class FakeModel:
+    device = "cpu"
+
+    def __init__(self, model_type, prefix=None):
+        self.config = SimpleNamespace(model_type=model_type, prefix=prefix)
+
+    def generate(self, input_ids, attention_mask, **kwargs):
+        # "Resume" devolvendo as palavras da entrada ao contrário
+        return [[i for i, keep in zip(row, mask) if keep and i != EOS][::-1] + [EOS]
+                for row, mask in zip(input_ids, attention_mask)]
+
+
+class FakePipeline:
+    """Caminho por texto como no Text2TextGenerationPipeline: prefixo + tokenizer, generate e decode"""
+
+    def __init__(self, model_type, prefix=None):
+        self.tokenizer = FakeTokenizer()
+        self.model = FakeModel(model_type, prefix)
+        self.text_calls = 0
+
+    def __call__(self, texts, batch_size=None, truncation=False, clean_up_tokenization_spaces=False, **kwargs):
+        self.text_calls += 1
+        prefix = self.model.config.prefix or ""
+        batch = self.tokenizer.pad({"input_ids": [self.tokenizer.encode(prefix + text) for text in texts]})
+        output = self.model.generate(**batch, **kwargs)
+        return [{"summary_text": self.tokenizer.decode(ids, skip_special_tokens=True,
+                                                       clean_up_tokenization_spaces=clean_up_tokenization_spaces)}
+                for ids in output]
+
+
+TEXTS = ["fim do texto , ponto .", "Python e FastAPI em produção ."]
+
+
+def _run(pipe, pretokenized, monkeypatch):
+    monkeypatch.setattr(batching, "PRETOKENIZED_INPUTS", pretokenized)
+    inputs = [truncate_tokens(text, pipe.tokenizer, max_tokens=32) for text in TEXTS]
+    return pipeline_runner(lambda: pipe, output_key="summary_text")(inputs, {"truncation": True})
+
+
+@pytest.mark.parametrize("model_type", ["bart", "t5"])
+def test_ids_path_matches_text_path(model_type, monkeypatch):
+    pipe = FakePipeline(model_type)
+    assert accepts_token_ids(pipe)
+    by_text = _run(pipe, False, monkeypatch)
+    calls = pipe.text_calls
+    by_ids = _run(pipe, True, monkeypatch)
+    assert pipe.text_calls == calls, "caminho por ids não deveria chamar o pipeline"
+    assert by_ids == by_text
+
+
+@pytest.mark.parametrize("pipe", [FakePipeline("led"), FakePipeline("t5", prefix="summarize: ")],
+                         ids=["unverified-architecture", "task-prefix"])
+def test_unverified_models_keep_text_path(pipe, monkeypatch):
+    assert not accepts_token_ids(pipe)
+    _run(pipe, True, monkeypatch)
+    assert pipe.text_calls == 1
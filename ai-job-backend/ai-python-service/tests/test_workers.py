@@ -0,0 +1,72 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import workers
+from workers import WorkerPool
+
+
+def _runner(inputs, kwargs):
+    if "crash" in inputs:
+        os._exit(3)
+    if "slow" in inputs:
+        time.sleep(0.5)
+    return [item.upper() for item in inputs]
+
+
+@pytest.fixture
+def pool(monkeypatch, request):
+    monkeypatch.setattr(workers, "WORKER_CHECK_INTERVAL", 0.1)
+    # Um worker travado vira falha do teste em segundos, não em minutos
+    monkeypatch.setattr(workers, "WORKER_REQUEST_TIMEOUT", 10)
+    pool = WorkerPool(processes=getattr(request, "param", 1), threads=1)
+    pool.start({"echo": _runner})
+    yield pool
+    pool.stop()
+
+
+def test_dead_worker_fails_its_batch_and_is_replaced(pool):
+    run = pool.runner("echo")
+    assert run(["a"], {}) == ["A"]
+    for attempt in range(10):
+        start = time.monotonic()
+        with pytest.raises(RuntimeError, match="código 3"):
+            run(["crash"], {})
+        assert time.monotonic() - start < 5
+        assert run([f"b{attempt}"], {}) == [f"B{attempt}"]
+    stats = pool.stats()
+    assert stats["restarts"] == 10 and stats["alive"] == 1 and stats["inFlight"] == 0
+
+
+def test_worker_killed_while_idle_is_replaced(pool):
+    run = pool.runner("echo")
+    assert run(["a"], {}) == ["A"]
+    os.kill(pool._workers[0].process.pid, signal.SIGKILL)
+    deadline = time.monotonic() + 5
+    while pool.stats()["restarts"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["restarts"] == 1
+    assert run(["b"], {}) == ["B"]
+    assert pool.stats()["failed"] == 0
+
+
+@pytest.mark.parametrize("pool", [2], indirect=True)
+def test_crash_does_not_disturb_other_worker(pool):
+    run = pool.runner("echo")
+    results = []
+    slow = threading.Thread(target=lambda: results.append(run(["slow"], {})))
+    slow.start()
+    with pytest.raises(RuntimeError):
+        run(["crash"], {})
+    slow.join(timeout=5)
+    assert results == [["SLOW"]]
+    assert run(["c"], {}) == ["C"]
+
+
+def test_runner_error_is_reported(pool):
+    with pytest.raises(RuntimeError, match="AttributeError"):
+        pool.runner("echo")([1], {})
+    assert pool.runner("echo")(["c"], {}) == ["C"]
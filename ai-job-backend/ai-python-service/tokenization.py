@@ -0,0 +1,145 @@
+# tokenization.py - Truncamento por tokens numa única passada, contagem memorizada e fallback calibrado
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "8192"))
+# Razão caracteres/token usada antes de haver amostras suficientes do tokenizer real
+DEFAULT_CHARS_PER_TOKEN = float(os.getenv("DEFAULT_CHARS_PER_TOKEN", "4"))
+CALIBRATION_MIN_TOKENS = int(os.getenv("CALIBRATION_MIN_TOKENS", "2000"))
+# Arquiteturas em que generate(input_ids, attention_mask) equivale ao pipeline (sem pré/pós-processamento
+# próprio). LED fica de fora: o pipeline não é só tokenizar + generate (global_attention_mask)
+PRETOKENIZED_MODEL_TYPES = frozenset(
+    name.strip() for name in os.getenv("PRETOKENIZED_MODEL_TYPES", "bart,t5,mt5").split(",") if name.strip())
+
+
+class TokenizedInput(NamedTuple):
+    """Texto já truncado junto dos input_ids (com tokens especiais) que o modelo deve receber"""
+    text: str
+    input_ids: List[int]
+
+
+class _CharsPerTokenCalibration:
+    """Média de caracteres por token observada nos tokenizers reais"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chars = 0
+        self.tokens = 0
+
+    def observe(self, chars: int, tokens: int):
+        if tokens <= 0:
+            return
+        with self._lock:
+            self.chars += chars
+            self.tokens += tokens
+
+    @property
+    def ratio(self) -> float:
+        with self._lock:
+            if self.tokens < CALIBRATION_MIN_TOKENS:
+                return DEFAULT_CHARS_PER_TOKEN
+            return self.chars / self.tokens
+
+
+calibration = _CharsPerTokenCalibration()
+_count_cache: "OrderedDict[tuple, int]" = OrderedDict()
+_count_lock = threading.Lock()
+
+
+def _tokenizer_id(tokenizer) -> str:
+    return getattr(tokenizer, "name_or_path", None) or type(tokenizer).__name__
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, int(len(text) / calibration.ratio)) if text else 0
+
+
+def max_chars_for(max_tokens: int) -> int:
+    return int(max_tokens * calibration.ratio)
+
+
+def count_tokens(text: str, tokenizer) -> int:
+    """Número de tokens do texto (sem tokens especiais), memorizado por hash do texto"""
+    if tokenizer is None:
+        return estimate_tokens(text)
+    key = (_tokenizer_id(tokenizer), _text_hash(text))
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached is not None:
+            _count_cache.move_to_end(key)
+            return cached
+    count = len(tokenizer.encode(text, add_special_tokens=False))
+    _remember_count(key, len(text), count)
+    return count
+
+
+def _remember_count(key: tuple, chars: int, count: int):
+    calibration.observe(chars, count)
+    with _count_lock:
+        _count_cache[key] = count
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > TOKEN_COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
+
+def _char_truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_chars_for(max_tokens)
+    return text[:max_chars] if len(text) > max_chars else text
+
+
+def truncate_tokens(text: str, tokenizer, max_tokens: int = 400) -> TokenizedInput:
+    """Corta o texto original na posição do ``max_tokens``-ésimo token.
+
+    Com tokenizer "fast" uma única chamada devolve ids e offset mappings: o corte
+    é feito no próprio texto (sem decode) e os ids são reaproveitados pelo modelo.
+    """
+    if tokenizer is None:
+        return TokenizedInput(_char_truncate(text, max_tokens), [])
+
+    budget = max(1, max_tokens - tokenizer.num_special_tokens_to_add())
+    if not getattr(tokenizer, "is_fast", False):
+        # Tokenizer lento não tem offsets: mantém o caminho encode/decode
+        ids = tokenizer.encode(text, truncation=True, max_length=max_tokens)
+        return TokenizedInput(tokenizer.decode(ids, skip_special_tokens=True), ids)
+
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    ids = encoding["input_ids"]
+    _remember_count((_tokenizer_id(tokenizer), _text_hash(text)), len(text), len(ids))
+    if len(ids) > budget:
+        ids = ids[:budget]
+        text = text[:encoding["offset_mapping"][budget - 1][1]]
+    return TokenizedInput(text, tokenizer.build_inputs_with_special_tokens(ids))
+
+
+def token_cache_stats() -> Dict[str, Any]:
+    with _count_lock:
+        entries = len(_count_cache)
+    return {"entries": entries, "charsPerToken": round(calibration.ratio, 3),
+            "calibrationTokens": calibration.tokens}
+
+
+def generate_from_ids(pipe, inputs: List[TokenizedInput], output_key: str, **generate_kwargs) -> List[Dict[str, str]]:
+    """Gera direto de input_ids já calculados, sem o pipeline re-tokenizar o prompt"""
+    tokenizer = pipe.tokenizer
+    batch = tokenizer.pad({"input_ids": [item.input_ids for item in inputs]}, return_tensors="pt")
+    batch = {name: tensor.to(pipe.model.device) for name, tensor in batch.items()}
+    generate_kwargs.pop("truncation", None)
+    # Mesmo padrão do postprocess do pipeline (False): o texto sai igual ao do caminho por texto
+    clean_up = generate_kwargs.pop("clean_up_tokenization_spaces", False)
+    output_ids = pipe.model.generate(**batch, **generate_kwargs)
+    texts = tokenizer.batch_decode(output_ids, skip_special_tokens=True, clean_up_tokenization_spaces=clean_up)
+    return [{output_key: text} for text in texts]
+
+
+def accepts_token_ids(pipe) -> bool:
+    """Só arquiteturas verificadas (PRETOKENIZED_MODEL_TYPES) e sem prefixo de tarefa (ex.: T5 "summarize: ")"""
+    config = getattr(getattr(pipe, "model", None), "config", None)
+    return (getattr(pipe, "tokenizer", None) is not None and not getattr(config, "prefix", None)
+            and getattr(config, "model_type", None) in PRETOKENIZED_MODEL_TYPES)
@@ -0,0 +1,150 @@
+# warmup.py - Perfil de threads do torch e aquecimento dos modelos antes do readiness
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from logger import get_logger
+from model_registry import ModelEntry
+from tokenization import truncate_tokens
+
+logger = get_logger("warmup")
+
+# Roda entradas sintéticas em cada pipeline carregado antes de /readyz responder 200
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+# Tamanhos de entrada (tokens) e de batch aquecidos: cada forma nova paga alocação e escolha de kernel
+WARMUP_INPUT_TOKENS = [int(n) for n in os.getenv("WARMUP_INPUT_TOKENS", "32,128,400").split(",") if n.strip()]
+WARMUP_BATCH_SIZES = [int(n) for n in os.getenv("WARMUP_BATCH_SIZES", "1").split(",") if n.strip()]
+# Passos de decodificação por chamada de aquecimento (o custo do primeiro passo é o que importa)
+WARMUP_MAX_NEW_TOKENS = int(os.getenv("WARMUP_MAX_NEW_TOKENS", "8"))
+# Repetições por forma: a primeira é a fria, as demais mostram o regime estável
+WARMUP_REPEATS = int(os.getenv("WARMUP_REPEATS", "2"))
+
+# latency: uma requisição por vez com todos os núcleos; throughput: forwards simultâneos dividem os núcleos
+INFERENCE_THREAD_PROFILE = os.getenv("INFERENCE_THREAD_PROFILE", "latency").lower()
+# Sobrescrevem o perfil (0 = usa o valor do perfil)
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS", "0"))
+
+# Texto representativo (currículo em português) repetido até o tamanho pedido
+SYNTHETIC_TEXT = ("Desenvolvedora Python com 5 anos de experiência em APIs REST com FastAPI e Django, "
+                  "Docker, Kubernetes, PostgreSQL e AWS. Liderou a migração de monólito para microsserviços "
+                  "e reduziu a latência em 40%. Bacharel em Ciência da Computação.")
+
+# cpus -> (threads intra-op, threads inter-op)
+THREAD_PROFILES: Dict[str, Callable[[int], tuple]] = {
+    "latency": lambda cpus: (cpus, 1),
+    # Sumarizador e gerador rodam batches ao mesmo tempo: metade dos núcleos para cada
+    "throughput": lambda cpus: (max(1, cpus // 2), 2),
+}
+
+
+def _cpu_count() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def apply_thread_profile(profile: str = INFERENCE_THREAD_PROFILE) -> Dict[str, Any]:
+    """Configura as threads do torch no processo da API; precisa rodar antes da primeira inferência"""
+    applied: Dict[str, Any] = {"profile": profile, "numThreads": None, "interopThreads": None}
+    if profile not in THREAD_PROFILES:
+        logger.warning("INFERENCE_THREAD_PROFILE '%s' desconhecido (opções: %s); threads do torch inalteradas",
+                       profile, ", ".join(THREAD_PROFILES))
+        return applied
+    try:
+        import torch
+    except ImportError:
+        return applied
+    threads, interop = THREAD_PROFILES[profile](_cpu_count())
+    threads, interop = TORCH_NUM_THREADS or threads, TORCH_INTEROP_THREADS or interop
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(interop)
+    except RuntimeError:
+        # Só pode ser definido antes de qualquer trabalho paralelo no processo
+        logger.warning("Threads inter-op já inicializadas; mantendo %d", torch.get_num_interop_threads())
+    applied.update(numThreads=torch.get_num_threads(), interopThreads=torch.get_num_interop_threads())
+    logger.info("Perfil de threads '%s': %d intra-op, %d inter-op", profile,
+                applied["numThreads"], applied["interopThreads"])
+    return applied
+
+
+class WarmupReport:
+    """Estado do aquecimento (pending, running, done, skipped ou disabled) e tempos por forma"""
+
+    def __init__(self):
+        self.state = "pending" if WARMUP_ENABLED else "disabled"
+        self.thread_profile: Dict[str, Any] = {}
+        self.results: List[Dict[str, Any]] = []
+        self.seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "skipped", "disabled")
+
+    def add(self, results: List[Dict[str, Any]]):
+        with self._lock:
+            self.results.extend(results)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "threadProfile": self.thread_profile, "seconds": self.seconds,
+                    "results": list(self.results)}
+
+
+warmup_report = WarmupReport()
+
+
+def _synthetic_input(tokenizer, tokens: int):
+    text = " ".join([SYNTHETIC_TEXT] * (tokens // 20 + 1))
+    return truncate_tokens(text, tokenizer, tokens)
+
+
+def _warm_entry(entry: ModelEntry, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    tokenizer = entry.tokenizer_handle.get()
+    params = {**params, "max_new_tokens": WARMUP_MAX_NEW_TOKENS}
+    params.pop("min_new_tokens", None)
+    results = []
+    for tokens in WARMUP_INPUT_TOKENS:
+        prompt = _synthetic_input(tokenizer, tokens)
+        for batch_size in WARMUP_BATCH_SIZES:
+            timings = []
+            for _ in range(max(1, WARMUP_REPEATS)):
+                start = time.perf_counter()
+                # Mesmo caminho das requisições (runner do batcher), sem passar pela fila
+                entry.batcher.runner([prompt] * batch_size, params)
+                timings.append((time.perf_counter() - start) * 1000)
+            cold, warm = timings[0], min(timings[1:]) if len(timings) > 1 else None
+            logger.info("Aquecimento '%s': %d tokens x %d -> fria %.1f ms%s", entry.name, tokens, batch_size, cold,
+                        f", estável {warm:.1f} ms ({cold / warm:.1f}x)" if warm else "")
+            results.append({"model": entry.name, "inputTokens": tokens, "batchSize": batch_size,
+                            "coldMs": round(cold, 1), "warmMs": round(warm, 1) if warm is not None else None})
+    return results
+
+
+def run_warmup(entries: List[ModelEntry], params_for: Callable[[ModelEntry], Dict[str, Any]]):
+    """Aquece os modelos carregados em cada tamanho de entrada/batch; falha de um não bloqueia o readiness"""
+    if not WARMUP_ENABLED:
+        return
+    warmup_report.state = "running"
+    start = time.perf_counter()
+    for entry in entries:
+        if not entry.loaded:
+            continue
+        try:
+            results = _warm_entry(entry, params_for(entry))
+        except Exception as e:
+            logger.error("Aquecimento de '%s' falhou: %s", entry.name, e)
+            results = [{"model": entry.name, "error": str(e)}]
+        warmup_report.add(results)
+    warmup_report.seconds = round(time.perf_counter() - start, 3)
+    warmup_report.state = "done"
+    logger.info("Aquecimento concluído em %.1fs", warmup_report.seconds)
+
+
+def skip_warmup(reason: str):
+    if WARMUP_ENABLED:
+        warmup_report.state = "skipped"
+        logger.info("Aquecimento ignorado: %s", reason)
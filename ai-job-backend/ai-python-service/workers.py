@@ -0,0 +1,276 @@
+# workers.py - Processos de inferência que compartilham os pesos do processo da API
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from logger import get_logger
+
+logger = get_logger("workers")
+
+# 0 desliga: a inferência roda no próprio processo da API (threads do FastAPI)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "0"))
+# Threads intra-op do torch por worker; padrão = núcleos / workers
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "0"))
+# Fixa cada worker num bloco contíguo de núcleos (sched_setaffinity, só Linux)
+WORKER_CPU_AFFINITY = os.getenv("WORKER_CPU_AFFINITY", "0") == "1"
+# Move os tensores para memória compartilhada antes do fork (não depende só do copy-on-write)
+WORKER_SHARE_MEMORY = os.getenv("WORKER_SHARE_MEMORY", "1") == "1"
+WORKER_REQUEST_TIMEOUT = float(os.getenv("WORKER_REQUEST_TIMEOUT", "300"))
+# Espera máxima da thread de resultados antes de conferir se o pool está parando
+WORKER_CHECK_INTERVAL = float(os.getenv("WORKER_CHECK_INTERVAL", "1"))
+
+Runner = Callable[[List[Any], Dict[str, Any]], List[Any]]
+
+
+def _available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _worker_main(index: int, runners: Dict[str, Runner], conn: Connection, threads: int,
+                 cpus: Optional[List[int]]):
+    """Loop do processo worker: recebe batches pelo pipe, roda no modelo herdado do fork e devolve"""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Só pode ser definido antes de qualquer trabalho paralelo no processo
+            pass
+    except ImportError:
+        pass
+    logger.info("Worker %d (pid %d) pronto: %d threads, cpus=%s", index, os.getpid(), threads, cpus or "todas")
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        request_id, model, inputs, kwargs = message
+        try:
+            result = (request_id, True, runners[model](inputs, kwargs))
+        except Exception as e:
+            result = (request_id, False, f"{type(e).__name__}: {e}")
+        try:
+            conn.send(result)
+        except (TypeError, AttributeError, ValueError) as e:
+            # Resultado que não serializa volta como erro (e o worker continua vivo)
+            conn.send((request_id, False, f"resultado não serializável: {e}"))
+
+
+class _Worker:
+    """Processo e a ponta do pipe dele no processo da API (descartados juntos quando o worker morre)"""
+
+    def __init__(self, process: mp.Process, conn: Connection):
+        self.process = process
+        self.conn = conn
+
+
+class WorkerPool:
+    """Pool de N processos forkados depois que os modelos foram carregados.
+
+    Os pesos ficam compartilhados (memória compartilhada ou copy-on-write), cada
+    worker recebe um orçamento fixo de threads do torch e, opcionalmente, um
+    conjunto de núcleos. Cada worker tem um pipe próprio e roda um batch por vez:
+    sem filas compartilhadas, um worker morto (mesmo no meio de uma escrita) não
+    deixa lock preso para os outros nem para o substituto, que ganha pipe novo.
+    """
+
+    def __init__(self, processes: int = WORKER_PROCESSES, threads: int = WORKER_THREADS,
+                 pin_cpus: bool = WORKER_CPU_AFFINITY):
+        self.processes = processes
+        cpus = _available_cpus()
+        self.threads = threads or max(1, len(cpus) // max(1, processes))
+        self.pin_cpus = pin_cpus
+        self._cpus = cpus
+        self._ctx = mp.get_context("fork")
+        self._runners: Dict[str, Runner] = {}
+        self._workers: List[_Worker] = []
+        # Índices dos workers livres; o runner tira um, a thread de resultados devolve
+        self._idle: "queue.Queue[int]" = queue.Queue()
+        # índice do worker -> request_id do batch que ele está rodando
+        self._busy: Dict[int, int] = {}
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._stopping = False
+        self.dispatched = 0
+        self.failed = 0
+        self.restarts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, runners: Dict[str, Runner], models: List[Any] = ()):
+        """Faz o fork dos workers. Chamar depois de carregar os modelos e antes de qualquer inferência."""
+        if WORKER_SHARE_MEMORY:
+            for pipe in models:
+                model = getattr(pipe, "model", None)
+                if model is not None and hasattr(model, "share_memory"):
+                    model.share_memory()
+
+        self._runners = runners
+        self._stopping = False
+        self._workers = [self._spawn(index) for index in range(self.processes)]
+        for index in range(self.processes):
+            self._idle.put(index)
+
+        self._dispatcher = threading.Thread(target=self._collect_results, name="worker-results", daemon=True)
+        self._dispatcher.start()
+        logger.info("%d workers de inferência iniciados (%d threads cada)", self.processes, self.threads)
+
+    def _spawn(self, index: int) -> _Worker:
+        cpus = None
+        if self.pin_cpus:
+            block = self._cpus[index * self.threads:(index + 1) * self.threads]
+            cpus = block or None
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main, name=f"inference-worker-{index}", daemon=True,
+            args=(index, self._runners, child_conn, self.threads, cpus),
+        )
+        process.start()
+        # A ponta do filho só fica aberta no filho
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _collect_results(self):
+        while not self._stopping:
+            workers = list(enumerate(self._workers))
+            by_object = {}
+            for index, worker in workers:
+                by_object[worker.conn] = index
+                by_object[worker.process.sentinel] = index
+            ready = wait(list(by_object), timeout=WORKER_CHECK_INTERVAL)
+            if self._stopping:
+                break
+            dead = set()
+            for obj in ready:
+                index = by_object[obj]
+                worker = self._workers[index]
+                if obj is worker.process.sentinel:
+                    dead.add(index)
+                    continue
+                try:
+                    message = worker.conn.recv()
+                except Exception:
+                    # Pipe fechado ou mensagem cortada: o worker morreu (o sentinel confirma)
+                    dead.add(index)
+                    continue
+                self._handle(index, *message)
+            for index in sorted(dead):
+                self._replace(index)
+
+    def _handle(self, index: int, request_id: int, ok: bool, payload: Any):
+        with self._pending_lock:
+            self._busy.pop(index, None)
+            future = self._pending.pop(request_id, None)
+        self._idle.put(index)
+        if future is None:
+            return
+        if ok:
+            future.set_result(payload)
+        else:
+            self.failed += 1
+            future.set_exception(RuntimeError(payload))
+
+    def _replace(self, index: int):
+        """Falha na hora o batch do worker morto (sem esperar WORKER_REQUEST_TIMEOUT) e recria o processo"""
+        old = self._workers[index]
+        old.process.join(timeout=1)
+        if old.process.is_alive():
+            old.process.kill()
+            old.process.join()
+        exitcode = old.process.exitcode
+        old.conn.close()
+        logger.error("Worker %d encerrado (código %s), recriando", index, exitcode)
+        worker = self._spawn(index)
+        with self._pending_lock:
+            self._workers[index] = worker
+            request_id = self._busy.pop(index, None)
+            future = self._pending.pop(request_id, None) if request_id is not None else None
+        self.restarts += 1
+        if future is not None:
+            self.failed += 1
+            future.set_exception(RuntimeError(f"worker de inferência {index} encerrado (código {exitcode})"))
+        if request_id is not None:
+            # Livre, o índice já está na fila (ou com um runner que vai usar o pipe novo)
+            self._idle.put(index)
+
+    def runner(self, model: str) -> Runner:
+        """Runner para o MicroBatcher: manda o batch a um worker livre e espera o resultado"""
+        def run(inputs: List[Any], kwargs: Dict[str, Any]) -> List[Any]:
+            request_id = next(self._ids)
+            future: Future = Future()
+            try:
+                index = self._idle.get(timeout=WORKER_REQUEST_TIMEOUT)
+            except queue.Empty:
+                raise RuntimeError("nenhum worker de inferência livre")
+            # Worker já morto e ainda não recriado: espera o substituto em vez de perder o batch
+            while not self._workers[index].process.is_alive() and not self._stopping:
+                time.sleep(0.01)
+            with self._pending_lock:
+                self._pending[request_id] = future
+                self._busy[index] = request_id
+                conn = self._workers[index].conn
+                self.dispatched += 1
+            try:
+                conn.send((request_id, model, list(inputs), kwargs))
+            except OSError:
+                # Worker morreu antes de receber: _replace falha o future
+                pass
+            try:
+                return future.result(timeout=WORKER_REQUEST_TIMEOUT)
+            finally:
+                with self._pending_lock:
+                    self._pending.pop(request_id, None)
+        return run
+
+    def stop(self):
+        self._stopping = True
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            worker.conn.close()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=WORKER_CHECK_INTERVAL + 1)
+        self._workers = []
+        self._idle = queue.Queue()
+        self._busy = {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._pending_lock:
+            in_flight = len(self._pending)
+        return {
+            "processes": self.processes,
+            "threadsPerWorker": self.threads,
+            "pinned": self.pin_cpus,
+            "alive": sum(1 for worker in self._workers if worker.process.is_alive()),
+            "inFlight": in_flight,
+            "dispatched": self.dispatched,
+            "failed": self.failed,
+            "restarts": self.restarts,
+        }